@@ -5,42 +5,242 @@ Servidor Flask
 WebSockets para comunicación en tiempo real
 Con soporte para imágenes en preguntas
 """
-from flask import Flask, render_template, jsonify, request, send_from_directory
-from flask_socketio import SocketIO, emit
+from flask import Flask, Response, render_template, jsonify, request, send_file
+from werkzeug.security import safe_join
+from flask_socketio import SocketIO, emit, join_room
 import game_logic
+import bank_import
+import bank_merge
+import bank_lint
+import buzzgate
+import clocksync
+import export
+import pagecache
+import imagetiles
+import bank_compiled
+from bank_index import load_compiled_index
+from tournament import Tournament
+from offload import Offloader
+from outcomes import OutcomeStore
+from ratings import RatingEngine
+from ratelimit import InputLimiter
+from clocksync import BuzzArbiter, ClockSync
+from replay import EventRecorder
+import transport
+import functools
+import io
+import json
+import mimetypes
 import os
+import random
+import time
+import uuid
+import zipfile
 import tempfile
 from pathlib import Path
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret_2025'
-socketio = SocketIO(app, cors_allowed_origins="*")
+# JSON o MessagePack según PAINANI_TRANSPORTE (las páginas cargan el cliente que corresponde)
+SOCKET_TRANSPORT = transport.choose_transport()
+socketio = SocketIO(app, cors_allowed_origins="*", **transport.socketio_options(SOCKET_TRANSPORT))
 
 # Instancia global del juego
 game = game_logic.GameState()
 
+# Banco cargado, indexado para búsquedas y cambios de casilla
+USED_CSV_PATH = "data/usadas.csv"
+bank_index = None
+bank_index_pending = False  # El índice del último banco se está armando en un proceso
+bank_generation = 0  # Sube con cada carga; un índice de una carga anterior se descarta
+board_sampler = None  # Sortea otro tablero del mismo banco y forma (rondas del torneo)
+
+# Torneo activo (partidas simultáneas en salas propias)
+active_tournament = None
+DASHBOARD_ROOM = 'tournament_dashboard'
+DASHBOARD_STANDINGS_LIMIT = 50  # Posiciones enviadas en cada actualización en vivo
+
+# Hilos y procesos para el trabajo de disco/CPU fuera del bucle de eventos
+offloader = Offloader(sleep=socketio.sleep)
+
+# Historial de resultados por pregunta (data/outcomes/)
+outcome_store = OutcomeStore()
+current_bank = None
+
+def _record_outcome(outcome):
+    """Guarda el resultado de un intento y lo escribe a disco en un hilo"""
+    outcome_store.record(outcome, bank=current_bank)
+    offloader.submit_io(outcome_store.flush)
+
+game.outcome_listener = _record_outcome
+
+# Rating de equipos entre partidas (data/ratings.jsonl)
+rating_engine = RatingEngine()
+
+# Grabación de las partidas para reproducirlas (data/recordings/, ver replay.py)
+event_recorder = EventRecorder()
+
+def _recording_listener(key, state=None):
+    """Graba las transiciones de una partida y las escribe a disco en un hilo
+
+    Con ``state`` su estado actual queda como inicio de la grabación (el
+    juego principal arranca con el tablero de ejemplo, sin evento de carga).
+    """
+    record = event_recorder.listener(key, state)
+
+    def on_event(state, name, args):
+        record(state, name, args)
+        offloader.submit_io(event_recorder.flush)
+    return on_event
+
+game.event_listener = _recording_listener('main', game)
+
+# Cubetas por conexión y equipo delante de los eventos del juego
+input_limiter = InputLimiter()
+
+# Relojes de los clientes y orden justo de los timbres (ver clocksync.py)
+clock_sync = ClockSync()
+buzz_arbiter = BuzzArbiter()
+_clock_loop_started = False
+
+def _limited(event):
+    """Descarta sin respuesta los eventos que exceden el límite o se repiten"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args):
+            if not input_limiter.allow(request.sid, event, args[0] if args else None):
+                return None
+            return handler(*args)
+        return wrapper
+    return decorator
+
+def _split_list(raw):
+    """Acepta lista o texto separado por comas"""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        items = [item.strip() for item in raw.split(',')]
+    else:
+        items = [str(item).strip() for item in raw]
+    return [item for item in items if item] or None
+
+def _board_options(source):
+    """Extrae las opciones de forma del tablero (form o JSON)"""
+    options = {}
+
+    for key, target in (
+        ('max_categories', 'max_categories'), ('page', 'page'), ('page_size', 'page_size'), ('seed', 'selection_seed'),
+    ):
+        raw = source.get(key)
+        if raw not in (None, ''):
+            options[target] = int(raw)
+
+    include = _split_list(source.get('include'))
+    if include:
+        options['include_categories'] = include
+    exclude = _split_list(source.get('exclude'))
+    if exclude:
+        options['exclude_categories'] = exclude
+
+    values = _split_list(source.get('values'))
+    if values:
+        options['values_per_category'] = tuple(int(float(v)) for v in values)
+
+    weights = source.get('weights')
+    if isinstance(weights, str):
+        pairs = [item.split(':', 1) for item in _split_list(weights) or [] if ':' in item]
+        weights = {name.strip(): float(w) for name, w in pairs}
+    if isinstance(weights, dict) and weights:
+        options['category_weights'] = {str(k): float(v) for k, v in weights.items()}
+
+    if str(source.get('adaptive', '')).lower() in ('1', 'true', 'si', 'on'):
+        options['adaptive'] = True
+
+    return options
+
+# Semilla de la selección de categorías por banco y forma del tablero
+board_selection = {"key": None, "seed": None}
+
+def _keep_selection(bank, options):
+    """Usa la misma selección de categorías al pedir otra página del mismo banco y forma
+
+    Sin esto cada página saldría de un sorteo distinto y se enciman.
+    """
+    shape = {k: v for k, v in options.items() if k not in ('page', 'selection_seed', 'adaptive')}
+    key = (bank, json.dumps(shape, sort_keys=True, ensure_ascii=False))
+    if options.get('selection_seed') is None:
+        if board_selection["key"] == key and 'page' in options:
+            options['selection_seed'] = board_selection["seed"]
+        else:
+            options['selection_seed'] = random.getrandbits(32)
+    board_selection.update(key=key, seed=options['selection_seed'])
+
 # =====================
 # RUTAS HTTP
 # =====================
 
+# Página principal renderizada por versión del estado (ver pagecache.py)
+page_cache = pagecache.PageCache()
+
+# Imágenes por piezas (ver imagetiles.py); revelado en curso por sala
+tile_cache = imagetiles.TileCache()
+_clue_reveals = {}
+
 @app.route('/')
 def index():
-    """Página principal del juego"""
-    return render_template('index.html')
+    """Página principal del juego, con el tablero ya dibujado"""
+    state, room = _resolve_game(request.args)
+    if state is None:
+        return render_template('index.html', initial=None, view=None, **_transport_context())
+
+    key = pagecache.page_key(room, state, _mosaic_ready(state))
+    html, etag = page_cache.get(key, lambda: _render_index(state))
+    response = Response(html, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Revalidar siempre; sin cambios es un 304
+    return response.make_conditional(request)
+
+def _render_index(state):
+    board = state.get_board_state()
+    initial = {
+        'board': board,
+        'game_state': state.get_game_state(),
+        'images_folder': state.images_folder,
+        'mosaic_tiles': _mosaic_info(state),
+    }
+    return render_template('index.html', initial=initial, view=pagecache.board_view(board), **_transport_context())
+
+def _transport_context():
+    return {
+        'socket_transport': SOCKET_TRANSPORT,
+        'socketio_script': transport.CLIENT_SCRIPTS[SOCKET_TRANSPORT],
+    }
+
+@app.route('/api/transport')
+def get_transport():
+    """Serialización que usa Socket.IO (el cliente la compara al conectar)"""
+    return jsonify({"transport": SOCKET_TRANSPORT})
 
 @app.route('/api/board')
 def get_board():
     """Obtiene el estado del tablero"""
-    return jsonify(game.get_board_state())
+    state, _ = _resolve_game(request.args)
+    if state is None:
+        return jsonify({"error": "Partida no encontrada"}), 404
+    return jsonify(state.get_board_state())
 
 @app.route('/api/game-state')
 def get_game_state():
     """Obtiene el estado completo del juego"""
-    return jsonify(game.get_game_state())
+    state, _ = _resolve_game(request.args)
+    if state is None:
+        return jsonify({"error": "Partida no encontrada"}), 404
+    return jsonify(state.get_game_state())
 
 @app.route('/api/load-data', methods=['POST'])
 def load_data():
     """Carga datos desde JSON o CSV"""
+    global board_sampler, current_bank
     uploaded_path = None
     original_name = None
 
@@ -58,14 +258,18 @@ def load_data():
                 return jsonify({"error": "Formato no soportado"}), 400
 
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-            uploaded_file.save(temp_file.name)
             temp_file.close()
+            offloader.run_io(uploaded_file.save, temp_file.name)
 
             uploaded_path = temp_file.name
             file_type = 'csv' if ext == '.csv' else 'json'
             file_path = uploaded_path
+            options = _board_options(request.form)
         else:
             data = request.get_json(silent=True) or {}
+            options = _board_options(data)
+            if data.get('banks'):
+                return _load_merged_banks(bank_merge.parse_bank_specs(data['banks']), options)
             file_type = data.get('type', 'json')
             file_path = data.get('path', '')
             original_name = os.path.basename(file_path) if file_path else None
@@ -73,11 +277,38 @@ def load_data():
             if not file_path:
                 return jsonify({"error": "No se especificó archivo"}), 400
 
-        if file_type == 'csv':
-            game.data = game_logic.load_from_csv_sampled(
-                file_path,
-                used_csv_path="data/usadas.csv"
-            )
+        adaptive = options.pop('adaptive', False)
+        game.flush_outcomes()  # Los resultados pendientes son del banco anterior
+        current_bank = Path(original_name or file_path).stem
+        _keep_selection(current_bank, options)
+
+        if file_type == 'json' and offloader.run_io(game_logic.is_board_json, file_path):
+            # Tablero ya armado: se juega tal cual, sin sorteo ni búsqueda
+            game.data = offloader.run_io(game_logic.load_board_json, file_path)
+            game.images_folder = None
+            _drop_index()
+            board_sampler = None
+        elif file_type in ('csv', 'json'):
+            if adaptive:
+                options['question_weights'] = offloader.run_io(outcome_store.sampler_weights, bank=current_bank)
+            # CSV y JSON se compilan una vez; tablero e índice de búsqueda leen el mismo .pbank
+            compiled_path = offloader.run_cpu(bank_compiled.compile_bank, file_path)
+            if compiled_path is None:
+                game.data = game_logic.SAMPLE_DATA
+                _drop_index()
+                board_sampler = None
+            else:
+                sampler = functools.partial(
+                    bank_compiled.sample_compiled_board, compiled_path,
+                    used_csv_path=USED_CSV_PATH, bank_name=current_bank, **options
+                )
+                game.data = offloader.run_cpu(sampler)
+                board_sampler = sampler
+                if getattr(getattr(bank_index, 'questions', None), 'path', None) == compiled_path:
+                    # Otro tablero del mismo banco: el índice sigue sirviendo
+                    _mark_board_used(bank_index, game.data)
+                else:
+                    _index_in_background(load_compiled_index, compiled_path, USED_CSV_PATH, current_bank)
             
             # Establecer carpeta de imágenes basada en el NOMBRE ORIGINAL del archivo
             # La carpeta debe tener el mismo nombre que el archivo sin extensión
@@ -97,18 +328,16 @@ def load_data():
                 print(f"⚠️ No se encontró carpeta de imágenes: {images_folder}")
                 print(f"   Asegúrate de crear la carpeta: {images_folder}")
         else:
-            game.data = game_logic.load_data(file_path)
-            game.images_folder = None
-
-        game.reset_game()
+            return jsonify({"error": "Formato no soportado"}), 400
 
-        # Notificar a todos los clientes
-        socketio.emit('game_reset', game.get_board_state())
+        _board_loaded()
 
         display_name = original_name or os.path.basename(file_path)
         message = f"Datos cargados correctamente desde {display_name}"
         if game.images_folder:
             message += f" (con imágenes de data/{game.images_folder}/)"
+        if game.data.get("page_count"):
+            message += f" - tablero {game.data['page'] + 1} de {game.data['page_count']}"
         return jsonify({"success": True, "message": message})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -119,6 +348,200 @@ def load_data():
             except OSError:
                 pass
 
+def _load_merged_banks(specs, options):
+    """Arma el tablero con varios bancos a la vez y sus pesos (ver bank_merge.py)"""
+    global board_sampler, current_bank
+    adaptive = options.pop('adaptive', False)
+    game.flush_outcomes()  # Los resultados pendientes son del banco anterior
+    current_bank = '+'.join(name for _, _, name in specs)
+    _keep_selection(current_bank, options)
+    if adaptive:
+        options['question_weights'] = offloader.run_io(outcome_store.sampler_weights, bank=current_bank)
+
+    # Compilar y combinar una sola vez; tablero e índice de búsqueda salen después del índice guardado
+    summary = offloader.run_cpu(bank_merge.prepare_merged_bank, specs)
+    game.data = offloader.run_cpu(bank_merge.load_from_banks, specs, used_csv_path=USED_CSV_PATH, **options)
+    _index_in_background(bank_merge.load_indexed_banks, specs, USED_CSV_PATH)
+    board_sampler = functools.partial(bank_merge.load_from_banks, specs, used_csv_path=USED_CSV_PATH, **options)
+
+    # Cada pista trae la carpeta de su banco; el mosaico sale del primer banco con carpeta
+    folders = [bank['images_folder'] for bank in summary['banks'] if bank['images_folder']]
+    game.images_folder = folders[0] if folders else None
+    print(f"📚 Bancos combinados: {current_bank} ({summary['questions']} preguntas, {summary['duplicates']} repetidas omitidas)")
+
+    _board_loaded()
+
+    message = (
+        f"Datos cargados de {len(specs)} bancos: {summary['questions']} preguntas, "
+        f"{summary['duplicates']} repetidas omitidas"
+    )
+    if folders:
+        message += " (con imágenes de " + ", ".join(f"data/{folder}/" for folder in folders) + ")"
+    if game.data.get("page_count"):
+        message += f" - tablero {game.data['page'] + 1} de {game.data['page_count']}"
+    return jsonify({"success": True, "message": message, "banks": summary['banks']})
+
+def _drop_index():
+    """Olvida el índice del banco anterior (y el que se estuviera armando)"""
+    global bank_index, bank_index_pending, bank_generation
+    bank_index = None
+    bank_index_pending = False
+    bank_generation += 1
+    return bank_generation
+
+def _index_in_background(build, *args):
+    """Arma el índice de búsqueda en un proceso sin detener la respuesta de la carga
+
+    Mientras tanto la búsqueda y el cambio de casilla responden que el índice
+    se está armando; si se carga otro banco antes, este índice se descarta.
+    """
+    global bank_index_pending
+    generation = _drop_index()
+    bank_index_pending = True
+    future = offloader.submit_cpu(build, *args)
+
+    def install():
+        global bank_index, bank_index_pending
+        try:
+            index = offloader.wait(future)
+        except Exception as e:
+            index = None
+            print(f"⚠️ No se pudo indexar el banco: {e}")
+        if generation != bank_generation:
+            return  # Ya se cargó otro banco
+        bank_index_pending = False
+        bank_index = index
+        _mark_board_used(bank_index, game.data)
+
+    socketio.start_background_task(install)
+
+def _mark_board_used(index, board):
+    """Marca en el índice de búsqueda las preguntas que quedaron en el tablero"""
+    if index is None:
+        return
+    for cat in board["categories"]:
+        for clue in cat["clues"]:
+            if clue.get("idpregunta") is not None:
+                index.mark_used(clue["idpregunta"])
+
+def _board_loaded():
+    """Reinicia el juego principal con el tablero recién cargado y avisa a todos los clientes"""
+    game.reset_game()
+    game.clear_history()
+    _prepare_tiles(game)
+    socketio.emit('game_reset', game.get_board_state())
+
+@app.route('/api/import-banks', methods=['POST'])
+def import_banks():
+    """Importa un ZIP con varios bancos e imágenes sin bloquear las partidas
+
+    El cuerpo de la petición es el ZIP tal cual (no un formulario), así se
+    copia a disco por bloques conforme llega. Si algún banco o imagen ya
+    existe en data/ se responde 409 con la lista, salvo con ``?replace=1``.
+    """
+    total = request.content_length or 0
+    if total > bank_import.MAX_IMPORT_BYTES:
+        return jsonify({"error": f"El archivo supera el máximo de {bank_import.MAX_IMPORT_BYTES >> 20} MiB"}), 413
+    replace = str(request.args.get('replace', '')).lower() in ('1', 'true', 'si', 'on')
+
+    import_id = uuid.uuid4().hex[:8]
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
+    temp_file.close()
+
+    def on_chunk(written):
+        socketio.emit('import_progress', {
+            'import_id': import_id, 'stage': 'receiving', 'done': written, 'total': total
+        })
+        socketio.sleep(0)
+
+    try:
+        size = bank_import.stream_to_file(request.stream, temp_file.name, on_chunk=on_chunk)
+        if size == 0 or not zipfile.is_zipfile(temp_file.name):
+            raise ValueError("El cuerpo de la petición debe ser un ZIP con bancos CSV/XLSX")
+        conflicts = offloader.run_io(bank_import.archive_conflicts, temp_file.name, 'data')
+    except Exception as e:
+        os.remove(temp_file.name)
+        return jsonify({"error": str(e)}), 400
+
+    if conflicts and not replace:
+        os.remove(temp_file.name)
+        return jsonify({
+            "error": "El ZIP reemplazaría archivos que ya existen en data/",
+            "conflicts": conflicts[:50],
+            "conflict_count": len(conflicts),
+        }), 409
+
+    socketio.start_background_task(_run_bank_import, import_id, temp_file.name, replace)
+    return jsonify({"success": True, "import_id": import_id, "bytes": size}), 202
+
+def _run_bank_import(import_id, zip_path, replace=False):
+    """Extrae y valida los bancos en segundo plano reportando el avance"""
+    def progress(stage, done, total, name):
+        socketio.emit('import_progress', {
+            'import_id': import_id, 'stage': stage, 'done': done, 'total': total, 'file': name
+        })
+
+    try:
+        importer = bank_import.BankImporter(offloader)
+        result = importer.run(zip_path, 'data', progress, replace)
+    except Exception as e:
+        result = {"success": False, "error": str(e), "banks": []}
+    finally:
+        try:
+            os.remove(zip_path)
+        except OSError:
+            pass
+
+    result['import_id'] = import_id
+    socketio.emit('import_done', result)
+
+@app.route('/api/lint', methods=['POST'])
+def lint_bank():
+    """Revisa un banco (subido o por ruta) y devuelve el reporte de problemas"""
+    uploaded_path = None
+    try:
+        if request.files:
+            uploaded_file = request.files.get('file')
+            if not uploaded_file or uploaded_file.filename == '':
+                return jsonify({"error": "No se recibió archivo"}), 400
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=Path(uploaded_file.filename).suffix)
+            temp_file.close()
+            offloader.run_io(uploaded_file.save, temp_file.name)
+            uploaded_path = temp_file.name
+            file_path = uploaded_path
+            images_folder = Path(uploaded_file.filename).stem
+            source = request.form
+        else:
+            source = request.get_json(silent=True) or {}
+            file_path = source.get('path', '')
+            images_folder = None
+            if not file_path:
+                return jsonify({"error": "No se especificó archivo"}), 400
+
+        values = _split_list(source.get('values'))
+        threshold = float(source.get('threshold') or bank_lint.NEAR_DUPLICATE_THRESHOLD)
+        report = bank_lint.lint_bank(
+            file_path,
+            data_dir='data',
+            values_per_category=[int(float(v)) for v in values] if values else None,
+            threshold=threshold,
+            offloader=offloader,
+            images_folder=images_folder,
+        )
+        if images_folder:
+            report['bank'] = images_folder
+        return jsonify(report)
+    except FileNotFoundError:
+        return jsonify({"error": "Archivo no encontrado"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        if uploaded_path and os.path.exists(uploaded_path):
+            try:
+                os.remove(uploaded_path)
+            except OSError:
+                pass
+
 @app.route('/api/reset', methods=['POST'])
 def reset_game():
     """Reinicia el juego"""
@@ -126,207 +549,864 @@ def reset_game():
     socketio.emit('game_reset', game.get_board_state())
     return jsonify({"success": True})
 
+@app.route('/api/search')
+def search_bank():
+    """Busca preguntas en el banco cargado (sin distinguir acentos)"""
+    if bank_index is None:
+        if bank_index_pending:
+            return jsonify({"error": "El índice del banco se está armando, intenta en unos segundos"}), 503
+        return jsonify({"error": "No hay banco indexado"}), 404
+    started = time.perf_counter()
+    results = bank_index.search(
+        request.args.get('q', ''),
+        category=request.args.get('category') or None,
+        value=request.args.get('value', type=int),
+        limit=request.args.get('limit', default=20, type=int),
+    )
+    return jsonify({
+        "results": results,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+
+@app.route('/api/analytics')
+def get_analytics():
+    """Dificultad por valor y preguntas que nadie contesta (historial de resultados)"""
+    days = request.args.get('days', type=float)
+    since = time.time() - days * 86400 if days else None
+    bank = request.args.get('bank') or None
+    report = offloader.run_io(outcome_store.summary, since=since, bank=bank)
+    report['bank'] = bank
+    return jsonify(report)
+
+@app.route('/api/export')
+def export_history():
+    """Descarga partidas, resultados por pregunta y preguntas usadas (XLSX o CSV)
+
+    ``kinds`` elige las hojas (matches, outcomes, used); ``days`` y ``bank``
+    filtran igual que en ``/api/analytics``.
+    """
+    fmt = (request.args.get('format') or 'xlsx').lower()
+    days = request.args.get('days', type=float)
+    since = time.time() - days * 86400 if days else None
+
+    # Lo registrado hasta ahora entra al archivo
+    offloader.run_io(outcome_store.flush)
+    offloader.run_io(rating_engine.flush)
+
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'.{fmt}')
+    temp_file.close()
+    try:
+        result = offloader.run_io(
+            export.export_history,
+            temp_file.name,
+            export.parse_kinds(request.args.get('kinds')),
+            fmt,
+            outcome_store=outcome_store,
+            used_csv_path=USED_CSV_PATH,
+            since=since,
+            bank=request.args.get('bank') or None,
+        )
+    except Exception as e:
+        os.remove(temp_file.name)
+        return jsonify({"error": str(e)}), 500
+    if 'error' in result:
+        os.remove(temp_file.name)
+        return jsonify(result), 400
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    filename = f"painani_{time.strftime('%Y%m%d_%H%M')}.{fmt}"
+    return Response(
+        _stream_and_remove(temp_file.name),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+def _stream_and_remove(path, chunk_size=1 << 16):
+    """Envía el archivo por bloques y lo borra al terminar (o si se corta la descarga)"""
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+    finally:
+        os.remove(path)
+
+@app.route('/api/input-stats')
+def get_input_stats():
+    """Eventos aceptados y descartados por el límite de entrada"""
+    return jsonify(input_limiter.stats())
+
+@app.route('/api/buzzer-gateway')
+def get_buzzer_gateway():
+    """Pulsaciones recibidas de las cajas de timbres y latencia de arbitraje"""
+    if buzzer_gateway is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **buzzer_gateway.stats()})
+
+@app.route('/api/clock-sync')
+def get_clock_sync():
+    """Clientes sincronizados, ventana de arbitraje y timbres corregidos"""
+    return jsonify(clock_sync.stats())
+
+@app.route('/api/page-cache')
+def get_page_cache():
+    """Páginas principales en caché y aciertos"""
+    return jsonify(page_cache.stats())
+
 @app.route('/api/images-folder')
 def get_images_folder():
     """Obtiene la carpeta de imágenes actual"""
-    return jsonify({"images_folder": game.images_folder})
+    return jsonify({"images_folder": game.images_folder, "mosaic_tiles": _mosaic_info(game)})
+
+# =====================
+# IMÁGENES POR PIEZAS
+# =====================
+
+def _board_grid(state):
+    """Columnas x filas visibles del tablero (la cuadrícula del mosaico)"""
+    categories = state.data.get("categories", [])
+    return len(categories), len(pagecache.board_rows(categories))
+
+def _prepare_tiles(state):
+    """Corta en un hilo las imágenes del banco recién cargado"""
+    if not tile_cache.enabled:
+        return
+    folder = os.path.join('data', state.images_folder) if state.images_folder else None
+    jobs = imagetiles.bank_jobs(folder, state.data, _board_grid(state))
+    if not jobs:
+        return
+    offloader.submit_io(tile_cache.prepare, jobs)
+
+def _mosaic_tiles(state):
+    if not tile_cache.enabled or not state.images_folder:
+        return None
+    mosaic = imagetiles.find_mosaic(os.path.join('data', state.images_folder))
+    if mosaic is None:
+        return None
+    return offloader.run_io(tile_cache.tileset, mosaic, *_board_grid(state))
+
+def _mosaic_ready(state):
+    """Id de las piezas del mosaico si ya están listas (parte de la llave de la página)"""
+    if not tile_cache.enabled or not state.images_folder:
+        return None
+    mosaic = imagetiles.find_mosaic(os.path.join('data', state.images_folder))
+    return tile_cache.ready(mosaic, *_board_grid(state)) if mosaic else None
+
+def _mosaic_info(state):
+    """Cuadrícula del mosaico por piezas para el cliente (None: imagen completa)"""
+    tiles = _mosaic_tiles(state)
+    return tiles.to_dict() if tiles else None
+
+def _attach_clue_tiles(state, room, question_data):
+    """Si la pista tiene imagen, la manda por piezas: una visible y las demás con el tiempo"""
+    question = state.current_question
+    if question is None or not question.get('image') or not question.get('image_folder'):
+        return
+    reveal = _clue_reveals.get(room)
+    if reveal is None or reveal['question'] is not question:
+        path = os.path.join('data', question['image_folder'], question['image'])
+        tiles = offloader.run_io(tile_cache.tileset, path, *imagetiles.CLUE_GRID) if tile_cache.enabled else None
+        if tiles is None:
+            return
+        order = imagetiles.reveal_order(tiles.cols, tiles.rows, (tiles.id, question['cat_idx'], question['clue_idx']))
+        reveal = _clue_reveals[room] = {'question': question, 'tiles': tiles, 'order': order, 'shown': 1}
+        socketio.start_background_task(_reveal_clue_tiles, state, room, question)
+    question_data['tiles'] = {**reveal['tiles'].to_dict(), 'revealed': reveal['order'][:reveal['shown']]}
+
+def _reveal_clue_tiles(state, room, question):
+    """Revela una pieza por intervalo mientras la pista siga abierta y nadie tenga el turno"""
+    while True:
+        socketio.sleep(imagetiles.REVEAL_INTERVAL)
+        reveal = _clue_reveals.get(room)
+        if reveal is None or reveal['question'] is not question or state.current_question is not question:
+            if reveal is not None and reveal['question'] is question:
+                _clue_reveals.pop(room, None)
+            return
+        if state.current_buzzer is not None:
+            continue
+        tile = reveal['order'][reveal['shown']]
+        reveal['shown'] += 1
+        socketio.emit('image_tiles', {'id': reveal['tiles'].id, 'tiles': [tile]}, to=room)
+        if reveal['shown'] >= len(reveal['order']):
+            return
+
+def _tile_revealed(state, room, tiles, col, row):
+    reveal = _clue_reveals.get(room)
+    if reveal is not None and reveal['tiles'] is tiles:
+        return (col, row) in reveal['order'][:reveal['shown']]
+    mosaic = _mosaic_tiles(state)
+    if mosaic is not None and mosaic.id == tiles.id:
+        rows = pagecache.board_rows(state.data.get("categories", []))
+        return row < len(rows) and state.tile_state(col, rows[row]) != ''  # Contestada o usada
+    return False
+
+@app.route('/api/tiles/<tileset_id>/<int:col>/<int:row>')
+def serve_tile(tileset_id, col, row):
+    """Una pieza de imagen, solo si ya se reveló (pista en curso o casilla ya jugada)"""
+    state, room = _resolve_game(request.args)
+    tiles = tile_cache.get(tileset_id)
+    if state is None or tiles is None or tiles.filename(col, row) is None:
+        return "Pieza no encontrada", 404
+    if not _tile_revealed(state, room, tiles, col, row):
+        return "Pieza no revelada", 403
+    return _send_offloaded(str(tiles.directory), tiles.filename(col, row))
 
 @app.route('/manual')
 def manual():
     """Página del manual de usuario"""
     return render_template('manual.html')
 
+# =====================
+# TORNEO
+# =====================
+
+@app.route('/tournament')
+def tournament_dashboard():
+    """Tablero de posiciones del torneo en vivo"""
+    return render_template('tournament.html', **_transport_context())
+
+@app.route('/api/tournament', methods=['GET'])
+def get_tournament():
+    """Estado del torneo y tabla de posiciones"""
+    if active_tournament is None:
+        return jsonify({"error": "No hay torneo activo"}), 404
+    limit = request.args.get('limit', type=int)
+    return jsonify(active_tournament.to_dict(limit))
+
+@app.route('/api/tournament', methods=['POST'])
+def create_tournament():
+    """Crea un torneo con el tablero cargado y arranca la primera ronda"""
+    global active_tournament
+    data = request.get_json(silent=True) or {}
+    try:
+        rounds = data.get('rounds')
+        active_tournament = Tournament(
+            teams=_split_list(data.get('teams')) or [],
+            board=game.data,
+            tournament_format=data.get('format', 'swiss'),
+            teams_per_match=data.get('teams_per_match', 2),
+            rounds=int(rounds) if rounds not in (None, '') else None,
+            advance_per_match=data.get('advance_per_match', 1),
+            outcome_listener=_record_outcome,
+            event_listener_factory=_recording_listener,
+            images_folder=game.images_folder,
+            board_factory=_tournament_board if board_sampler is not None else None,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = active_tournament.start_round(_seeded_groups(data))
+    socketio.emit('leaderboard', active_tournament.to_dict(), to=DASHBOARD_ROOM)
+    return jsonify(result)
+
+def _tournament_board():
+    """Tablero nuevo para una ronda del torneo (mismo banco y forma que el juego principal)"""
+    board = offloader.run_io(board_sampler)
+    _mark_board_used(bank_index, board)
+    return board
+
+def _seeded_groups(data):
+    """Enfrentamientos sembrados por rating si la petición trae ``seeded``"""
+    if not data.get('seeded'):
+        return None
+    teams = active_tournament.alive if active_tournament.format == 'bracket' else active_tournament.teams
+    return rating_engine.seeded_matchups(teams, active_tournament.teams_per_match)
+
+@app.route('/api/tournament/round', methods=['POST'])
+def next_tournament_round():
+    """Genera la siguiente ronda cuando todas las partidas terminaron"""
+    if active_tournament is None:
+        return jsonify({"error": "No hay torneo activo"}), 404
+    result = active_tournament.start_round(_seeded_groups(request.get_json(silent=True) or {}))
+    if 'error' in result:
+        return jsonify(result), 400
+    socketio.emit('leaderboard', active_tournament.to_dict(), to=DASHBOARD_ROOM)
+    return jsonify(result)
+
+@app.route('/api/tournament/match/<match_id>/finish', methods=['POST'])
+def finish_tournament_match(match_id):
+    """Cierra una partida y asigna puntos de torneo"""
+    if active_tournament is None:
+        return jsonify({"error": "No hay torneo activo"}), 404
+    result = active_tournament.finish_match(match_id)
+    if 'error' in result:
+        return jsonify(result), 400
+    _push_standings(result['changes'])
+    match = result['match']
+    result['ratings'] = rating_engine.record_match(match['teams'], match['scores']).get('changes', [])
+    offloader.submit_io(rating_engine.flush)
+    socketio.emit('match_finished', match, to=match_id)
+    return jsonify(result)
+
+# =====================
+# RATING DE EQUIPOS
+# =====================
+
+@app.route('/api/ratings')
+def get_ratings():
+    """Ratings acumulados de todos los equipos"""
+    limit = request.args.get('limit', type=int)
+    return jsonify({"ratings": rating_engine.standings(limit)})
+
+@app.route('/api/ratings/match', methods=['POST'])
+def record_rated_match():
+    """Registra el resultado del juego principal (o uno externo) para el rating
+
+    ``teams`` nombra a los equipos en el orden del juego; si no se envían
+    ``scores`` se usan los puntajes actuales.
+    """
+    data = request.get_json(silent=True) or {}
+    teams = _split_list(data.get('teams')) or []
+    scores = data.get('scores')
+    if scores is None:
+        scores = game.player_scores[:len(teams)]
+    result = rating_engine.record_match(teams, scores)
+    if 'error' in result:
+        return jsonify(result), 400
+    offloader.submit_io(rating_engine.flush)
+    return jsonify(result)
+
+@app.route('/api/ratings/recompute', methods=['POST'])
+def recompute_ratings():
+    """Recalcula los ratings desde todo el historial (``period_days`` opcional)"""
+    data = request.get_json(silent=True) or {}
+    period_days = data.get('period_days')
+    period = float(period_days) * 86400 if period_days not in (None, '') else None
+    return jsonify(offloader.run_io(rating_engine.recompute, period))
+
+@app.route('/api/ratings/matchups')
+def get_seeded_matchups():
+    """Enfrentamientos sugeridos para la siguiente ronda según el rating"""
+    teams = _split_list(request.args.get('teams'))
+    if not teams and active_tournament is not None:
+        teams = active_tournament.alive if active_tournament.format == 'bracket' else active_tournament.teams
+    if not teams:
+        return jsonify({"error": "No se indicaron equipos"}), 400
+    per_match = request.args.get('teams_per_match', type=int)
+    if per_match is None:
+        per_match = active_tournament.teams_per_match if active_tournament else 2
+    groups = rating_engine.seeded_matchups(teams, per_match)
+    return jsonify({
+        "matchups": [[{"team": t, "rating": round(rating_engine.rating(t), 1)} for t in group] for group in groups]
+    })
+
 # =====================
 # WEBSOCKET EVENTS
 # =====================
 
+def _resolve_game(data):
+    """Devuelve (estado, sala) del evento: partida de torneo o juego principal"""
+    match_id = (data or {}).get('match') if isinstance(data, dict) else None
+    if not match_id:
+        return game, None
+    match = active_tournament.get_match(match_id) if active_tournament else None
+    if match is None:
+        return None, None
+    return match.game, match.match_id
+
+def _broadcast(event, payload, room=None):
+    """Emite a todos los clientes o solo a la sala de la partida"""
+    if room:
+        emit(event, payload, to=room)
+    else:
+        emit(event, payload, broadcast=True)
+
+def _push_standings(changes):
+    """Envía al tablero de posiciones los equipos que cambiaron y la parte alta de la tabla"""
+    socketio.emit('leaderboard_update', {
+        'changes': changes,
+        'standings': active_tournament.leaderboard.standings(DASHBOARD_STANDINGS_LIMIT)
+    }, to=DASHBOARD_ROOM)
+
+def _emit_scores(state, room):
+    """Envía puntajes y, si es partida de torneo, actualiza la tabla en vivo"""
+    _broadcast('scores_update', {'scores': state.player_scores}, room)
+    if room and active_tournament:
+        changes = active_tournament.record_scores(room)
+        if changes:
+            _push_standings(changes)
+
 @socketio.on('connect')
 def handle_connect():
     """Cliente se conecta"""
+    global _clock_loop_started
     print("Cliente conectado")
     emit('connected', {
         'board': game.get_board_state(),
-        'game_state': game.get_game_state()
+        'game_state': game.get_game_state(),
+        'images_folder': game.images_folder,
+        'mosaic_tiles': _mosaic_info(game)
     })
+    socketio.start_background_task(_clock_burst, request.sid)
+    if not _clock_loop_started:
+        _clock_loop_started = True
+        socketio.start_background_task(_clock_loop)
+
+def _clock_burst(sid):
+    """Varios pings seguidos al conectarse para tener desfase desde el primer timbre"""
+    for _ in range(clocksync.CLOCK_BURST):
+        socketio.emit('clock_ping', clock_sync.ping(sid), to=sid)
+        socketio.sleep(clocksync.CLOCK_BURST_SPACING)
+
+def _clock_loop():
+    """Ping periódico a cada conexión (la red cambia durante la partida)"""
+    while True:
+        socketio.sleep(clocksync.CLOCK_SYNC_INTERVAL)
+        for sid in clock_sync.sids():
+            socketio.emit('clock_ping', clock_sync.ping(sid), to=sid)
+
+@socketio.on('clock_pong')
+@_limited('clock_pong')
+def handle_clock_pong(data):
+    """Respuesta del cliente con su reloj"""
+    clock_sync.pong(request.sid, data)
+
+@socketio.on('join_match')
+def handle_join_match(data):
+    """Un cliente se une a la sala de una partida del torneo"""
+    state, room = _resolve_game(data)
+    if state is None or room is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+    join_room(room)
+    emit('connected', {
+        'board': state.get_board_state(),
+        'game_state': state.get_game_state(),
+        'images_folder': state.images_folder,
+        'mosaic_tiles': _mosaic_info(state),
+        'match': active_tournament.get_match(room).to_dict()
+    })
+
+@socketio.on('join_dashboard')
+def handle_join_dashboard(data=None):
+    """Un cliente se suscribe a la tabla de posiciones en vivo"""
+    join_room(DASHBOARD_ROOM)
+    emit('leaderboard', active_tournament.to_dict() if active_tournament else {})
 
 @socketio.on('open_question')
+@_limited('open_question')
 def handle_open_question(data):
     """Abre una pregunta del tablero"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
     cat_idx = data.get('cat_idx')
     clue_idx = data.get('clue_idx')
     
-    result = game.open_question(cat_idx, clue_idx)
+    result = state.open_question(cat_idx, clue_idx)
     
     if 'error' in result:
         emit('error', result, broadcast=False)
     else:
         # Enviar pregunta (con o sin respuestas según modo)
         question_data = result.copy()
-        if game.hide_answers:
+        if state.hide_answers:
             question_data.pop('answer', None)
             question_data.pop('choices', None)
+        _attach_clue_tiles(state, room, question_data)
         
-        emit('question_opened', question_data, broadcast=True)
+        _broadcast('question_opened', question_data, room)
 
 @socketio.on('buzzer_press')
+@_limited('buzzer_press')
 def handle_buzzer(data):
-    """Un jugador presiona su buzzer"""
+    """Un jugador presiona su buzzer (con la hora de su reloj en ``client_ts``)"""
+    arrival = time.monotonic()
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
+    if state.current_question is None or state.current_buzzer is not None:
+        # Timbre tardío o sin pregunta abierta: no hay nada que responder
+        input_limiter.shed('buzzer_press')
+        return
+
     player_idx = data.get('player')
-    
-    result = game.buzzer_press(player_idx)
-    
-    if 'error' in result:
-        emit('error', result, broadcast=False)
+    pressed_at, _ = clock_sync.correct(request.sid, data.get('client_ts'), arrival)
+    sid = request.sid
+
+    def reply(status, result):
+        if status == buzzgate.ACK_REJECTED:
+            socketio.emit('error', result, to=sid)
+
+    _queue_press(state, room, player_idx, pressed_at, reply)
+
+def _queue_press(state, room, player_idx, pressed_at, reply):
+    """Agrega la pulsación a la ronda de la pregunta; la primera programa el arbitraje"""
+    if not buzz_arbiter.submit(room, state.current_question, player_idx, pressed_at, reply):
+        return
+    window = clock_sync.window()
+    if window > 0:
+        socketio.start_background_task(_settle_presses, state, room, window)
     else:
-        emit('buzzer_activated', result, broadcast=True)
-        # Iniciar temporizador del lado del cliente
-        emit('start_timer', {'seconds': game_logic.TIME_LIMIT_SECONDS}, broadcast=True)
+        _settle_presses(state, room, 0)
+
+def _settle_presses(state, room, window):
+    """Tras la ventana, otorga el turno a la pulsación más temprana (en el reloj del servidor)"""
+    if window:
+        socketio.sleep(window)
+    question, presses = buzz_arbiter.settle(room)
+    for press in presses:
+        if state.current_question is not question or state.current_buzzer is not None:
+            press.reply(buzzgate.ACK_LATE, None)
+            continue
+        result = state.buzzer_press(press.player, press.pressed_at)
+        if 'error' in result:
+            press.reply(buzzgate.ACK_REJECTED, result)
+        else:
+            _announce_buzzer(result, room)
+            press.reply(buzzgate.ACK_AWARDED, result)
+
+def _announce_buzzer(result, room=None):
+    """Turno otorgado: avisa a los clientes e inicia su temporizador"""
+    socketio.emit('buzzer_activated', result, to=room)
+    socketio.emit('start_timer', {'seconds': game_logic.TIME_LIMIT_SECONDS}, to=room)
 
 @socketio.on('submit_answer')
+@_limited('submit_answer')
 def handle_submit_answer(data):
     """Jugador envía su respuesta"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
     player_idx = data.get('player')
     answer_idx = data.get('answer')
     
-    result = game.submit_answer(player_idx, answer_idx)
+    result = state.submit_answer(player_idx, answer_idx)
     
     if 'error' in result:
         emit('error', result, broadcast=False)
     else:
-        emit('answer_result', result, broadcast=True)
-        emit('stop_timer', {}, broadcast=True)
+        _broadcast('answer_result', result, room)
+        _broadcast('stop_timer', {}, room)
         
         # Actualizar scores
-        emit('scores_update', {'scores': game.player_scores}, broadcast=True)
+        _emit_scores(state, room)
         
         if result.get('close_question'):
-            emit('close_question', {}, broadcast=True)
+            _broadcast('close_question', {}, room)
 
 @socketio.on('moderator_correct')
+@_limited('moderator_correct')
 def handle_moderator_correct(data):
     """Moderador marca como correcta (modo ocultar respuestas)"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
     player_idx = data.get('player')
     
-    result = game.moderator_correct(player_idx)
+    result = state.moderator_correct(player_idx)
     
     if 'error' in result:
         emit('error', result, broadcast=False)
     else:
-        emit('answer_result', result, broadcast=True)
-        emit('stop_timer', {}, broadcast=True)
-        emit('scores_update', {'scores': game.player_scores}, broadcast=True)
-        emit('close_question', {}, broadcast=True)
+        _broadcast('answer_result', result, room)
+        _broadcast('stop_timer', {}, room)
+        _emit_scores(state, room)
+        _broadcast('close_question', {}, room)
 
 @socketio.on('moderator_incorrect')
+@_limited('moderator_incorrect')
 def handle_moderator_incorrect(data):
     """Moderador marca como incorrecta (modo ocultar respuestas)"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
     player_idx = data.get('player')
     
-    result = game.moderator_incorrect(player_idx)
+    result = state.moderator_incorrect(player_idx)
     
     if 'error' in result:
         emit('error', result, broadcast=False)
     else:
-        emit('answer_result', result, broadcast=True)
-        emit('stop_timer', {}, broadcast=True)
-        emit('scores_update', {'scores': game.player_scores}, broadcast=True)
+        _broadcast('answer_result', result, room)
+        _broadcast('stop_timer', {}, room)
+        _emit_scores(state, room)
         
         if result.get('close_question'):
-            emit('close_question', {}, broadcast=True)
+            _broadcast('close_question', {}, room)
 
 @socketio.on('cancel_question')
-def handle_cancel():
+@_limited('cancel_question')
+def handle_cancel(data=None):
     """Cancela la pregunta actual"""
-    result = game.cancel_question()
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
+    result = state.cancel_question()
     
     if 'error' in result:
         emit('error', result, broadcast=False)
     else:
-        emit('stop_timer', {}, broadcast=True)
-        emit('close_question', {}, broadcast=True)
+        _broadcast('stop_timer', {}, room)
+        _broadcast('close_question', {}, room)
 
 @socketio.on('timeout')
-def handle_timeout():
+@_limited('timeout')
+def handle_timeout(data=None):
     """Tiempo agotado"""
-    result = game.timeout()
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
+    result = state.timeout()
     
-    emit('answer_result', result, broadcast=True)
-    emit('scores_update', {'scores': game.player_scores}, broadcast=True)
+    _broadcast('answer_result', result, room)
+    _emit_scores(state, room)
     
     if result.get('close_question'):
-        emit('close_question', {}, broadcast=True)
+        _broadcast('close_question', {}, room)
 
 @socketio.on('toggle_hide_answers')
 def handle_toggle_hide(data):
     """Cambia el modo de ocultar/mostrar respuestas"""
-    game.hide_answers = data.get('hide', False)
-    emit('hide_answers_toggled', {'hide': game.hide_answers}, broadcast=True)
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
+    state.hide_answers = data.get('hide', False)
+    _broadcast('hide_answers_toggled', {'hide': state.hide_answers}, room)
 
 @socketio.on('adjust_score')
+@_limited('adjust_score')
 def handle_adjust_score(data):
     """Ajusta el puntaje de un jugador"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
     player_idx = data.get('player')
     delta = data.get('delta', 0)
     
-    result = game.adjust_score(player_idx, delta)
+    result = state.adjust_score(player_idx, delta)
     
     if 'error' in result:
         emit('error', result, broadcast=False)
     else:
-        emit('scores_update', {'scores': game.player_scores}, broadcast=True)
+        _emit_scores(state, room)
 
 @socketio.on('set_score')
+@_limited('set_score')
 def handle_set_score(data):
     """Establece el puntaje de un jugador directamente"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
     player_idx = data.get('player')
     score = data.get('score', 0)
 
-    result = game.set_score(player_idx, score)
+    result = state.set_score(player_idx, score)
 
     if 'error' in result:
         emit('error', result, broadcast=False)
     else:
-        emit('scores_update', {'scores': game.player_scores}, broadcast=True)
+        _emit_scores(state, room)
+
+def _history_step(data, action):
+    """Deshace o rehace en la partida del evento y envía el estado completo de una vez"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+
+    result = state.undo() if action == 'undo' else state.redo()
+
+    if 'error' in result:
+        emit('error', result, broadcast=False)
+        return
+
+    question = state.current_question
+    if question is not None:
+        hidden = ('answer', 'choices') if state.hide_answers else ()
+        question = {k: v for k, v in question.items() if k not in hidden}
+        _attach_clue_tiles(state, room, question)
+    _broadcast('state_restored', {
+        'board': state.get_board_state(),
+        'game_state': state.get_game_state(),
+        'action': action,
+        'question': question,
+        'undo_steps': result['undo_steps'],
+        'redo_steps': result['redo_steps']
+    }, room)
+    if room and active_tournament:
+        changes = active_tournament.record_scores(room)
+        if changes:
+            _push_standings(changes)
+
+@socketio.on('undo')
+@_limited('undo')
+def handle_undo(data=None):
+    """Deshace la última acción del moderador (puntajes, casillas y pregunta abierta)"""
+    _history_step(data, 'undo')
+
+@socketio.on('redo')
+@_limited('redo')
+def handle_redo(data=None):
+    """Vuelve a aplicar la última acción deshecha"""
+    _history_step(data, 'redo')
 
 @socketio.on('set_team_count')
 def handle_set_team_count(data):
     """Configura la cantidad de equipos disponibles"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+    if room:
+        emit('error', {'error': 'Los equipos de una partida los define el torneo'}, broadcast=False)
+        return
+
     count = data.get('count')
 
-    result = game.set_player_count(count)
+    result = state.set_player_count(count)
 
     if 'error' in result:
         emit('error', result, broadcast=False)
     else:
-        emit('team_count_updated', {
+        _broadcast('team_count_updated', {
             'player_count': result['player_count'],
-            'scores': game.player_scores,
+            'scores': state.player_scores,
             'current_buzzer': result.get('current_buzzer'),
             'tried_players': result.get('tried_players', []),
             'timer_active': result.get('timer_active', False)
-        }, broadcast=True)
-        emit('scores_update', {'scores': game.player_scores}, broadcast=True)
+        }, room)
+        _broadcast('scores_update', {'scores': state.player_scores}, room)
+
+@socketio.on('swap_tile')
+@_limited('swap_tile')
+def handle_swap_tile(data):
+    """Cambia la pregunta de una casilla por otra de la misma categoría y valor"""
+    state, room = _resolve_game(data)
+    if state is None:
+        emit('error', {'error': 'Partida no encontrada'}, broadcast=False)
+        return
+    if bank_index is None:
+        message = 'El índice del banco se está armando' if bank_index_pending else 'No hay banco indexado'
+        emit('error', {'error': message}, broadcast=False)
+        return
+
+    cat_idx = data.get('cat_idx')
+    clue_idx = data.get('clue_idx')
+    try:
+        category = state.data["categories"][cat_idx]
+        current = category["clues"][clue_idx]
+    except (IndexError, KeyError, TypeError):
+        emit('error', {'error': 'Casilla inválida'}, broadcast=False)
+        return
+
+    on_board = {c.get('idpregunta') for cat in state.data["categories"] for c in cat["clues"]}
+    pick = bank_index.pick_alternative(
+        category["name"], current["value"], exclude_ids=on_board, question_id=data.get('question_id')
+    )
+    if pick is None:
+        emit('error', {'error': 'No hay otra pregunta para esa casilla'}, broadcast=False)
+        return
+
+    result = state.replace_clue(cat_idx, clue_idx, game_logic.make_clue(pick))
+    if 'error' in result:
+        emit('error', result, broadcast=False)
+        return
+
+    if pick["idpregunta"] not in bank_index.used_ids:
+        bank_index.mark_used(pick["idpregunta"])
+        offloader.submit_io(game_logic._append_used_rows, USED_CSV_PATH, [{"bank": current_bank, **pick}])
+
+    _broadcast('tile_swapped', {
+        'cat_idx': cat_idx,
+        'clue_idx': clue_idx,
+        'board': state.get_board_state()
+    }, room)
+
+# =====================
+# CAJAS DE TIMBRES (UDP, ver buzzgate.py)
+# =====================
+
+buzzer_gateway = None
+
+def _gateway_press(player_idx, pressed_at, reply):
+    """Pulsación de una caja física: mismo arbitraje que 'buzzer_press' en el juego principal
+
+    La llegada ya está en el reloj del servidor; el acuse sale al cerrar la ronda.
+    """
+    if game.current_question is None or game.current_buzzer is not None:
+        input_limiter.shed('buzzer_press')
+        return buzzgate.ACK_LATE
+    _queue_press(game, None, player_idx, pressed_at, lambda status, result: reply(status))
+    return None
+
+def start_buzzer_gateway():
+    """Abre el puerto UDP de las cajas de timbres si PAINANI_TIMBRES lo pide"""
+    global buzzer_gateway
+    address = buzzgate.gateway_address()
+    if address is None or buzzer_gateway is not None:
+        return buzzer_gateway
+    host, port = address
+    gateway = buzzgate.BuzzerGateway(_gateway_press, host=host, port=port, wait=buzzgate.waiter_for(socketio.async_mode))
+    try:
+        gateway.bind()
+    except OSError as e:
+        print(f"⚠️  No se pudo abrir UDP {host}:{port} para cajas de timbres ({e})")
+        return None
+    buzzer_gateway = gateway
+    socketio.start_background_task(gateway.serve)
+    print(f"🔔 Cajas de timbres: UDP {host}:{port}")
+    return gateway
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Cliente se desconecta"""
+    input_limiter.forget(request.sid)
+    clock_sync.forget(request.sid)
     print("Cliente desconectado")
 
 # =====================
 # MANEJO DE ARCHIVOS ESTÁTICOS
 # =====================
 
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _send_offloaded(directory, filename):
+    """Como send_from_directory, pero la lectura del archivo ocurre en un hilo"""
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        return "Archivo no encontrado", 404
+    content = offloader.run_io(_read_file, path)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    return send_file(io.BytesIO(content), mimetype=mimetype, download_name=os.path.basename(path), max_age=3600)
+
 @app.route('/sounds/<path:filename>')
 def serve_sound(filename):
     """Sirve archivos de sonido"""
-    return send_from_directory('static/sounds', filename)
+    return _send_offloaded('static/sounds', filename)
 
 @app.route('/images/<folder>/<filename>')
 def serve_image(folder, filename):
     """Sirve imágenes de preguntas desde data/<folder>/<filename>"""
     try:
-        image_path = os.path.join('data', folder)
-        return send_from_directory(image_path, filename)
+        image_path = safe_join('data', folder)
+        if image_path is None:
+            return "Imagen no encontrada", 404
+        if tile_cache.is_tiled(os.path.join(image_path, filename)):
+            # Cortada en piezas: se entrega por /api/tiles conforme se revela
+            return "Imagen disponible solo por piezas", 403
+        return _send_offloaded(image_path, filename)
     except Exception as e:
         print(f"Error sirviendo imagen {folder}/{filename}: {e}")
         return "Imagen no encontrada", 404
@@ -362,5 +1442,7 @@ if __name__ == '__main__':
     print("\n⚡ WebSockets activos para tiempo real")
     print("="*50 + "\n")
     
+    start_buzzer_gateway()
+
     # Iniciar servidor con eventlet para mejor rendimiento
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formato binario compilado de bancos (``.pbank``)
+
+Un banco CSV/XLSX se compila una sola vez a ``data/compiled/<hash>.pbank``
+(el nombre es el resumen del contenido, así que un banco subido de nuevo
+reutiliza su versión compilada). El archivo se abre con ``mmap`` y solo se
+decodifican las filas que el sorteo elige: armar un tablero cuesta lo mismo
+con 500 que con 500 000 preguntas.
+
+Estructura (little-endian, secciones alineadas a 8 bytes)::
+
+    encabezado   HEADER
+    categorías   JSON con la lista de nombres
+    offsets      Q * (filas + 1)   inicio de cada fila en el bloque de filas
+    ids          q * filas         idpregunta de cada fila
+    cubetas      I * cubetas       categoría de la cubeta (índice)
+                 q * cubetas       valor de la cubeta
+                 I * (cubetas + 1) inicio de cada cubeta en ``filas por cubeta``
+    filas/cubeta I * filas         número de fila, agrupadas por (categoría, valor)
+    filas        JSON compacto de cada pregunta normalizada
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import game_logic
+
+COMPILED_DIR = "data/compiled"
+COMPILED_SUFFIX = ".pbank"
+MAX_COMPILED_BANKS = 16  # Se conservan los más recientes
+DIGEST_INDEX = "digests.json"
+MAX_DIGEST_ENTRIES = 64
+
+MAGIC = b"PBANK\x00\x00\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIIIQ")  # magic, versión, filas, cubetas, reservado, bytes de categorías
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def source_digest(path: str) -> str:
+    """Resumen del contenido del banco, leído por bloques"""
+    digest = blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_compiled_bank(questions: List[Dict[str, Any]], dest_path: str):
+    """Escribe preguntas ya normalizadas en formato ``.pbank``"""
+    categories = sorted({q["category"] for q in questions})
+    cat_index = {cat: idx for idx, cat in enumerate(categories)}
+
+    order = sorted(range(len(questions)), key=lambda i: (cat_index[questions[i]["category"]], questions[i]["value"]))
+    bucket_cats, bucket_values, bucket_starts = array("I"), array("q"), array("I")
+    last_key = None
+    for pos, row in enumerate(order):
+        key = (cat_index[questions[row]["category"]], questions[row]["value"])
+        if key != last_key:
+            bucket_cats.append(key[0])
+            bucket_values.append(key[1])
+            bucket_starts.append(pos)
+            last_key = key
+    bucket_starts.append(len(order))
+
+    offsets, ids = array("Q", [0]), array("q")
+    blobs = []
+    for q in questions:
+        blob = json.dumps(q, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        blobs.append(blob)
+        offsets.append(offsets[-1] + len(blob))
+        ids.append(q["idpregunta"])
+
+    cat_json = json.dumps(categories, ensure_ascii=False).encode("utf-8")
+    sections = [cat_json, offsets, ids, bucket_cats, bucket_values, bucket_starts, array("I", order)]
+
+    dest = Path(dest_path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(questions), len(bucket_cats), 0, len(cat_json)))
+            for section in sections:
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                f.write(section if isinstance(section, bytes) else section.tobytes())
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            for blob in blobs:
+                f.write(blob)
+        try:
+            os.replace(tmp, dest)
+        except PermissionError:
+            # Windows no reemplaza un archivo mapeado; el nombre es el resumen
+            # del contenido, así que el que ya está abierto es igual a este
+            if not dest.exists():
+                raise
+            os.remove(tmp)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class CompiledBank:
+    """Banco ``.pbank`` mapeado en memoria
+
+    Ofrece la interfaz de cubetas que usa ``game_logic.build_sampled_board``:
+    ``categories()``, ``bucket_ids(cat, val)`` y ``row(cat, val, pos)``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("Archivo compilado vacío")
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        magic, version, rows, buckets, _, cat_len = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Archivo compilado con formato desconocido")
+        view = memoryview(self._map)
+        pos = HEADER.size
+        self._categories: List[str] = json.loads(bytes(view[pos:pos + cat_len]).decode("utf-8"))
+        pos += cat_len
+
+        def section(code: str, count: int) -> memoryview:
+            nonlocal pos
+            pos = _align(pos)
+            size = count * struct.calcsize(code)
+            part = view[pos:pos + size].cast(code)
+            pos += size
+            return part
+
+        self._offsets = section("Q", rows + 1)
+        self._ids = section("q", rows)
+        bucket_cats = section("I", buckets)
+        bucket_values = section("q", buckets)
+        self._bucket_starts = section("I", buckets + 1)
+        self._bucket_rows = section("I", rows)
+        self._rows_start = _align(pos)
+        self._views = [self._offsets, self._ids, bucket_cats, bucket_values, self._bucket_starts, self._bucket_rows, view]
+        if self._rows_start + self._offsets[rows] > len(self._map):
+            raise ValueError("Archivo compilado incompleto")
+
+        self._buckets: Dict[Tuple[str, int], int] = {
+            (self._categories[cat], value): idx
+            for idx, (cat, value) in enumerate(zip(bucket_cats, bucket_values))
+        }
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __enter__(self) -> "CompiledBank":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in getattr(self, "_views", ()):
+            view.release()
+        self._views = []
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    # ---------------------
+    # Interfaz de cubetas
+    # ---------------------
+
+    def categories(self) -> List[str]:
+        return list(self._categories)
+
+    def _bucket_slice(self, category: str, value: int) -> Optional[memoryview]:
+        idx = self._buckets.get((category, value))
+        if idx is None:
+            return None
+        return self._bucket_rows[self._bucket_starts[idx]:self._bucket_starts[idx + 1]]
+
+    def bucket_ids(self, category: str, value: int) -> Sequence[int]:
+        """idpregunta de cada fila de la cubeta (sin decodificar las filas)"""
+        rows = self._bucket_slice(category, value)
+        if rows is None:
+            return []
+        return list(map(self._ids.__getitem__, rows))
+
+    def row(self, category: str, value: int, pos: int) -> Dict[str, Any]:
+        """Decodifica la fila ``pos`` de la cubeta"""
+        return self.decode(self._bucket_slice(category, value)[pos])
+
+    def decode(self, row: int) -> Dict[str, Any]:
+        start = self._rows_start + self._offsets[row]
+        stop = self._rows_start + self._offsets[row + 1]
+        return json.loads(self._map[start:stop].decode("utf-8"))
+
+
+def compiled_path_for(path: str, compiled_dir: str = COMPILED_DIR) -> str:
+    """Ruta del ``.pbank`` del banco
+
+    El resumen se recuerda por (ruta, tamaño, fecha de modificación) en
+    ``digests.json`` para no releer un banco que no cambió.
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    index_path = Path(compiled_dir) / DIGEST_INDEX
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    entry = index.get(key)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+        digest = entry[2]
+    else:
+        digest = source_digest(path)
+        index.pop(key, None)
+        index[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        while len(index) > MAX_DIGEST_ENTRIES:
+            index.pop(next(iter(index)))
+        _write_digest_index(index, index_path)
+    return str(Path(compiled_dir) / f"{digest}{COMPILED_SUFFIX}")
+
+
+def _write_digest_index(index: Dict[str, Any], index_path: Path):
+    """Guarda ``digests.json`` completo o nada (lo leen varios procesos a la vez)"""
+    tmp = None
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=index_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp, index_path)
+    except OSError:
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _prune_compiled(compiled_dir: Path, keep: int = MAX_COMPILED_BANKS):
+    banks = sorted(compiled_dir.glob(f"*{COMPILED_SUFFIX}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in banks[keep:]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def compile_bank(path: str, compiled_dir: str = COMPILED_DIR) -> Optional[str]:
+    """Ruta del ``.pbank`` del banco, compilándolo si hace falta
+
+    Devuelve None si el banco no se puede leer (igual que ``load_bank``). El
+    servidor compila una vez y luego el tablero y el índice de búsqueda abren
+    el mismo archivo, en vez de compilarlo los dos a la vez.
+    """
+    target = compiled_path_for(path, compiled_dir)
+    if os.path.exists(target):
+        try:
+            os.utime(target)  # Marca de uso para la limpieza
+            CompiledBank(target).close()
+            return target
+        except (OSError, ValueError, struct.error):
+            pass  # Archivo dañado: se vuelve a compilar
+
+    questions = game_logic.load_bank(path)
+    if questions is None:
+        return None
+    write_compiled_bank(questions, target)
+    _prune_compiled(Path(compiled_dir))
+    return target
+
+
+def open_compiled_bank(path: str, compiled_dir: str = COMPILED_DIR) -> Optional[CompiledBank]:
+    """Abre la versión compilada del banco, compilándola si hace falta"""
+    target = compile_bank(path, compiled_dir)
+    return CompiledBank(target) if target is not None else None
+
+
+def sample_compiled_board(compiled_path: str, **board_options) -> Dict[str, Any]:
+    """Tablero sorteado de un ``.pbank`` ya compilado (opciones de ``build_sampled_board``)"""
+    with CompiledBank(compiled_path) as bank:
+        return game_logic.build_sampled_board(bank, **board_options)
+
+
+class CompiledRows:
+    """Todas las filas de un ``.pbank`` como secuencia de preguntas
+
+    Cada acceso decodifica la fila desde el archivo mapeado, así que en
+    memoria solo queda lo que se está usando. Al mandarla a otro proceso
+    viaja únicamente la ruta y allá se vuelve a abrir.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._bank = CompiledBank(path)
+
+    def __getstate__(self) -> str:
+        return self.path
+
+    def __setstate__(self, path: str):
+        self.__init__(path)
+
+    def __len__(self) -> int:
+        return len(self._bank)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if not 0 <= row < len(self._bank):
+            raise IndexError(row)
+        return self._bank.decode(row)
+
+    def __iter__(self):
+        return map(self._bank.decode, range(len(self._bank)))
+
+    def close(self):
+        self._bank.close()
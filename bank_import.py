@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importación masiva de bancos de preguntas
+
+Recibe un ZIP con archivos CSV/XLSX/JSON y carpetas de imágenes, lo guarda en disco
+por bloques y valida cada banco en un grupo de procesos para no bloquear el
+servidor mientras hay partidas en curso. Los bancos o imágenes que ya existen
+en ``data/`` solo se reemplazan si se pide explícitamente, y el ZIP tiene
+límites de tamaño, de tamaño descomprimido y de número de entradas.
+"""
+import os
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Any, BinaryIO, Tuple
+
+import game_logic
+from offload import Offloader
+
+IMPORT_CHUNK_SIZE = 1 << 20  # 1 MiB por bloque al escribir la subida
+MAX_IMPORT_BYTES = 512 << 20  # Tamaño máximo del ZIP subido
+MAX_EXTRACTED_BYTES = 2 << 30  # Total descomprimido
+MAX_ARCHIVE_ENTRIES = 20000
+BANK_EXTENSIONS = (".csv", ".xlsx", ".json")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+RESERVED_NAMES = {"usadas.csv"}  # Nunca se sobrescriben desde un ZIP
+
+ProgressCallback = Callable[[str, int, int, Optional[str]], None]
+
+
+def stream_to_file(
+    stream: BinaryIO,
+    dest_path: str,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[int], None]] = None,
+    max_bytes: Optional[int] = MAX_IMPORT_BYTES,
+) -> int:
+    """Copia un flujo a disco por bloques y devuelve los bytes escritos
+
+    Lanza ``ValueError`` en cuanto el flujo pasa de ``max_bytes``.
+    """
+    written = 0
+    with open(dest_path, "wb") as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            written += len(chunk)
+            if max_bytes is not None and written > max_bytes:
+                raise ValueError(f"El archivo supera el máximo de {max_bytes >> 20} MiB")
+            out.write(chunk)
+            if on_chunk is not None:
+                on_chunk(written)
+    return written
+
+
+def _plan_extraction(zf: zipfile.ZipFile, base: Path) -> List[Tuple[zipfile.ZipInfo, Path, bool]]:
+    """(entrada, destino, es banco) de cada archivo a extraer
+
+    Solo se usan los nombres base de cada entrada, así que rutas con ``..``
+    no pueden escapar de ``base``. Lanza ``ValueError`` si el ZIP pasa de
+    ``MAX_ARCHIVE_ENTRIES`` entradas o de ``MAX_EXTRACTED_BYTES`` declarados.
+    """
+    infos = zf.infolist()
+    if len(infos) > MAX_ARCHIVE_ENTRIES:
+        raise ValueError(f"El ZIP tiene más de {MAX_ARCHIVE_ENTRIES} entradas")
+
+    plan = []
+    declared = 0
+    for info in infos:
+        if info.is_dir():
+            continue
+        parts = [p for p in info.filename.replace("\\", "/").split("/") if p and p not in (".", "..")]
+        if not parts or parts[-1].startswith("."):
+            continue
+        name = parts[-1]
+        ext = os.path.splitext(name)[1].lower()
+
+        if ext in BANK_EXTENSIONS:
+            if name.lower() in RESERVED_NAMES:
+                continue
+            plan.append((info, base / name, True))
+        elif ext in IMAGE_EXTENSIONS and len(parts) >= 2:
+            plan.append((info, base / parts[-2] / name, False))
+        else:
+            continue
+        declared += info.file_size
+
+    if declared > MAX_EXTRACTED_BYTES:
+        raise ValueError(f"El ZIP descomprimido pasa de {MAX_EXTRACTED_BYTES >> 20} MiB")
+    return plan
+
+
+def archive_conflicts(zip_path: str, data_dir: str = "data") -> List[str]:
+    """Archivos del ZIP que ya existen en ``data_dir`` (relativos a él)
+
+    También valida los límites del ZIP (ver ``_plan_extraction``).
+    """
+    base = Path(data_dir)
+    with zipfile.ZipFile(zip_path) as zf:
+        plan = _plan_extraction(zf, base)
+    return sorted(str(target.relative_to(base)) for _, target, _ in plan if target.exists())
+
+
+def extract_bank_archive(zip_path: str, data_dir: str = "data", replace: bool = False) -> List[str]:
+    """Extrae bancos e imágenes del ZIP y devuelve las rutas de los bancos
+
+    Los bancos quedan en ``data/<nombre>.<ext>`` y las imágenes en
+    ``data/<carpeta>/<archivo>``. Sin ``replace`` no se toca nada si algún
+    archivo ya existe. El tamaño descomprimido se vuelve a contar al
+    escribir (el declarado en el ZIP puede mentir); si se pasa, se borran
+    los archivos nuevos de esta extracción.
+    """
+    base = Path(data_dir)
+    base.mkdir(parents=True, exist_ok=True)
+    banks: List[str] = []
+    created: List[Path] = []
+    written = 0
+
+    with zipfile.ZipFile(zip_path) as zf:
+        plan = _plan_extraction(zf, base)
+        existing = [str(target.relative_to(base)) for _, target, _ in plan if target.exists()]
+        if existing and not replace:
+            raise ValueError(f"Ya existen en {data_dir}: {', '.join(existing[:10])}")
+
+        try:
+            for info, target, is_bank in plan:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if not target.exists():
+                    created.append(target)
+                with zf.open(info) as src, open(target, "wb") as out:
+                    while True:
+                        chunk = src.read(IMPORT_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        written += len(chunk)
+                        if written > MAX_EXTRACTED_BYTES:
+                            raise ValueError(f"El ZIP descomprimido pasa de {MAX_EXTRACTED_BYTES >> 20} MiB")
+                        out.write(chunk)
+                if is_bank:
+                    banks.append(str(target))
+        except BaseException:
+            for path in created:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            raise
+
+    return banks
+
+
+def validate_bank(path: str, data_dir: str = "data") -> Dict[str, Any]:
+    """Valida e indexa un banco; se ejecuta dentro de un proceso del grupo"""
+    report: Dict[str, Any] = {
+        "bank": Path(path).stem,
+        "path": path,
+        "rows": 0,
+        "valid_rows": 0,
+        "categories": [],
+        "buckets": {},
+        "errors": [],
+        "missing_images": [],
+    }
+
+    try:
+        rows = list(game_logic._read_question_rows(path))
+    except Exception as e:
+        report["errors"].append(f"No se pudo leer el archivo: {e}")
+        return report
+
+    images_dir = Path(data_dir) / Path(path).stem
+    buckets: Dict[str, int] = {}
+    categories = set()
+
+    for line, raw_row in enumerate(rows, start=2):
+        report["rows"] += 1
+        parsed = game_logic.parse_question_row(raw_row)
+        if parsed is None:
+            report["errors"].append(f"Fila {line}: id o valor inválido")
+            continue
+        report["valid_rows"] += 1
+        categories.add(parsed["category"])
+        key = f"{parsed['category']}|{parsed['value']}"
+        buckets[key] = buckets.get(key, 0) + 1
+        if parsed["image"] and not (images_dir / parsed["image"]).is_file():
+            report["missing_images"].append(parsed["image"])
+
+    report["categories"] = sorted(categories)
+    report["buckets"] = buckets
+    return report
+
+
+class BankImporter:
+    """Orquesta una importación: extracción y validación en paralelo
+
+    Usa un ``offload.Offloader`` para que la espera ceda el control al bucle
+    del servidor mientras los procesos trabajan.
+    """
+
+    def __init__(self, offloader: Offloader):
+        self.offloader = offloader
+
+    def run(self, zip_path: str, data_dir: str, progress: ProgressCallback, replace: bool = False) -> Dict[str, Any]:
+        progress("extracting", 0, 1, None)
+        banks = self.offloader.run_io(extract_bank_archive, zip_path, data_dir, replace)
+        progress("extracting", 1, 1, None)
+
+        if not banks:
+            return {"success": False, "error": "El archivo no contiene bancos CSV/XLSX/JSON", "banks": []}
+
+        futures = {self.offloader.submit_cpu(validate_bank, path, data_dir): path for path in banks}
+        reports: List[Dict[str, Any]] = []
+        progress("validating", 0, len(futures), None)
+
+        for future in self.offloader.as_completed(futures):
+            path = futures[future]
+            try:
+                reports.append(future.result())
+            except Exception as e:
+                reports.append({"bank": Path(path).stem, "path": path, "errors": [str(e)]})
+            progress("validating", len(reports), len(futures), Path(path).name)
+
+        reports.sort(key=lambda r: r["bank"])
+        return {"success": True, "banks": reports}
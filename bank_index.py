@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice invertido del banco cargado
+
+Permite buscar preguntas sin distinguir acentos ni mayúsculas y elegir
+alternativas de la misma casilla (categoría, valor) para cambiar una
+pregunta del tablero sin releer el archivo. Con un banco compilado las
+preguntas se quedan en el ``.pbank`` (``CompiledRows``): el índice solo
+guarda posiciones e ids.
+"""
+import random
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import game_logic
+from bank_compiled import CompiledRows
+
+MAX_PREFIX_TERMS = 200  # Términos que puede abarcar el prefijo de la última palabra
+SEARCH_LIMIT = 20
+
+
+class BankIndex:
+    """Índice en memoria: posiciones por término, por id y por casilla"""
+
+    def __init__(self, questions: Sequence[Dict[str, Any]], used_ids: Optional[Iterable[int]] = None):
+        self.questions = questions
+        self.used_ids: Set[int] = set(used_ids or ())
+        self.ids = array("q")
+        self.positions_by_id: Dict[int, int] = {}
+        self.buckets: Dict[Tuple[str, int], List[int]] = {}
+        self.postings: Dict[str, array] = {}
+
+        for pos, q in enumerate(questions):
+            self.ids.append(q["idpregunta"])
+            self.positions_by_id.setdefault(q["idpregunta"], pos)
+            self.buckets.setdefault((q["category"], q["value"]), []).append(pos)
+            text = " ".join([q["question"], q["category"], *q["choices"]])
+            for token in set(game_logic.normalize_text(text).split()):
+                posting = self.postings.get(token)
+                if posting is None:
+                    posting = self.postings[token] = array("I")
+                posting.append(pos)
+
+        self.vocabulary: List[str] = sorted(self.postings)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def _prefix_positions(self, prefix: str) -> Set[int]:
+        """Posiciones de todos los términos que empiezan con ``prefix``"""
+        result: Set[int] = set()
+        start = bisect_left(self.vocabulary, prefix)
+        for term in self.vocabulary[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            result.update(self.postings[term])
+        return result
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        value: Optional[int] = None,
+        limit: int = SEARCH_LIMIT,
+    ) -> List[Dict[str, Any]]:
+        """Preguntas que contienen todas las palabras (la última como prefijo)"""
+        tokens = game_logic.normalize_text(query).split()
+        if tokens:
+            sets = [set(self.postings.get(t, ())) for t in tokens[:-1]]
+            sets.append(self._prefix_positions(tokens[-1]))
+            sets.sort(key=len)
+            matches = sets[0].intersection(*sets[1:])
+        elif category is not None:
+            matches = set(range(len(self.questions)))
+        else:
+            return []
+
+        cat_key = game_logic.normalize_text(category) if category else None
+        results = []
+        for pos in sorted(matches):
+            q = self.questions[pos]
+            if cat_key is not None and game_logic.normalize_text(q["category"]) != cat_key:
+                continue
+            if value is not None and q["value"] != value:
+                continue
+            results.append(self._summary(q))
+            if len(results) >= limit:
+                break
+        return results
+
+    def _summary(self, q: Dict[str, Any]) -> Dict[str, Any]:
+        return {**q, "used": q["idpregunta"] in self.used_ids}
+
+    def get(self, question_id: Any) -> Optional[Dict[str, Any]]:
+        try:
+            pos = self.positions_by_id.get(int(question_id))
+        except (TypeError, ValueError):
+            return None
+        return self.questions[pos] if pos is not None else None
+
+    def pick_alternative(
+        self,
+        category: str,
+        value: int,
+        exclude_ids: Iterable[Any] = (),
+        question_id: Any = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Pregunta elegida (si es de la misma casilla) o sorteada entre las no usadas"""
+        bucket = self.buckets.get((category, value), [])
+        if question_id is not None:
+            q = self.get(question_id)
+            if q is None or q["category"] != category or q["value"] != value:
+                return None
+            return q
+
+        excluded = set(exclude_ids)
+        candidates = [p for p in bucket if self.ids[p] not in excluded]
+        fresh = [p for p in candidates if self.ids[p] not in self.used_ids]
+        if fresh:
+            return self.questions[random.choice(fresh)]
+        if candidates:
+            return {**self.questions[random.choice(candidates)], "reused": True}
+        return None
+
+    def mark_used(self, question_id: int):
+        self.used_ids.add(question_id)
+
+
+def load_compiled_index(
+    compiled_path: str,
+    used_csv_path: str = "data/usadas.csv",
+    bank_name: Optional[str] = None,
+) -> BankIndex:
+    """Índice de un banco ya compilado (pensado para ejecutarse en un proceso)
+
+    Cada fila se decodifica una vez para armar los términos; las preguntas
+    se siguen leyendo del ``.pbank`` (``index.questions``). Las usadas son
+    las de ``bank_name`` en usadas.csv.
+    """
+    return BankIndex(CompiledRows(compiled_path), game_logic._read_used_ids(used_csv_path, bank_name))
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Revisión de bancos de preguntas antes de jugar
+
+Detecta ids repetidos, respuestas fuera de rango, opciones vacías, imágenes
+faltantes, casillas (categoría, valor) sin preguntas y preguntas casi
+idénticas (MinHash sobre pares de palabras con LSH por bandas). Las filas se
+revisan por bloques en paralelo.
+
+Uso:
+    python bank_lint.py data/question.csv [--values 100,200,300] [--json]
+"""
+import argparse
+import json
+import sys
+import time
+from array import array
+from hashlib import blake2b
+from operator import eq
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import game_logic
+from offload import Offloader
+
+LINT_CHUNK_ROWS = 5000
+MINHASH_PERMUTATIONS = 32  # Un resumen blake2b de 64 bytes = 32 valores de 16 bits
+MINHASH_BANDS = 8  # 8 bandas de 4 filas: candidatos desde ~60% de similitud
+NEAR_DUPLICATE_THRESHOLD = 0.7
+MAX_LSH_BUCKET = 200  # Cubetas más grandes se ignoran (texto genérico)
+
+VALID_ANSWERS = {"a", "b", "c", "d", "0", "1", "2", "3"}
+
+
+def _issue(line: int, code: str, message: str, qid: Any = None) -> Dict[str, Any]:
+    return {"row": line, "id": qid, "code": code, "message": message}
+
+
+def shingles(text: str) -> Set[str]:
+    """Pares de palabras consecutivas del texto normalizado"""
+    words = game_logic.normalize_text(text).split()
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(grams: Iterable[str], cache: Optional[Dict[str, bytes]] = None) -> Tuple[int, ...]:
+    """Firma MinHash: mínimo por posición de 32 hashes de 16 bits por par
+
+    Cada par aporta un resumen blake2b de 64 bytes; leído como arreglo de
+    enteros, la posición ``j`` de cada resumen hace de permutación ``j``.
+    """
+    digests = []
+    for gram in grams:
+        digest = cache.get(gram) if cache is not None else None
+        if digest is None:
+            digest = blake2b(gram.encode("utf-8"), digest_size=64).digest()
+            if cache is not None:
+                cache[gram] = digest
+        digests.append(digest)
+    values = array("H", b"".join(digests))
+    k = MINHASH_PERMUTATIONS
+    return tuple([min(values[j::k]) for j in range(k)])
+
+
+def _lint_chunk(rows: List[Tuple[int, Dict[str, Any]]], images_dir: str) -> Dict[str, Any]:
+    """Revisa un bloque de filas (se ejecuta en un proceso del grupo)"""
+    images = Path(images_dir)
+    existing_images = {p.name for p in images.iterdir()} if images.is_dir() else set()
+    issues: List[Dict[str, Any]] = []
+    records: List[Tuple[int, int, str, int]] = []
+    signatures: List[Tuple[int, int, Tuple[int, ...]]] = []
+    digest_cache: Dict[str, bytes] = {}
+
+    for line, raw in rows:
+        parsed = game_logic.parse_question_row(raw)
+        if parsed is None:
+            issues.append(_issue(line, "invalid_row", "id o valor no numérico", raw.get("idpregunta")))
+            continue
+
+        qid = parsed["idpregunta"]
+        records.append((line, qid, parsed["category"], parsed["value"]))
+
+        answer_raw = str(raw.get("answer", "")).strip().lower()
+        if answer_raw not in VALID_ANSWERS:
+            issues.append(_issue(line, "answer_out_of_range", f"respuesta '{answer_raw}' fuera de A-D / 0-3", qid))
+
+        if not parsed["question"]:
+            issues.append(_issue(line, "blank_question", "pregunta vacía", qid))
+
+        blank = [chr(ord("A") + i) for i, c in enumerate(parsed["choices"]) if not c]
+        if blank:
+            issues.append(_issue(line, "blank_choice", f"opciones vacías: {', '.join(blank)}", qid))
+
+        if str(raw.get("image") or "").strip().lower() == "si":
+            name = parsed["image"]
+            if not name:
+                issues.append(_issue(line, "missing_image_name", "image=si sin nombre_imagen", qid))
+            elif name not in existing_images:
+                issues.append(_issue(line, "missing_image", f"no existe {images / name}", qid))
+
+        grams = shingles(parsed["question"])
+        if grams:
+            signatures.append((line, qid, minhash(grams, digest_cache)))
+
+    return {"issues": issues, "records": records, "signatures": signatures}
+
+
+def find_near_duplicates(
+    signatures: List[Tuple[int, int, Tuple[int, ...]]],
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """Pares de preguntas con firmas parecidas (LSH por bandas + verificación)"""
+    rows_per_band = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    band_buckets: List[Dict[Tuple[int, ...], List[int]]] = []
+    for band in range(MINHASH_BANDS):
+        start, stop = band * rows_per_band, (band + 1) * rows_per_band
+        buckets: Dict[Tuple[int, ...], List[int]] = {}
+        for idx, (_, _, sig) in enumerate(signatures):
+            key = sig[start:stop]
+            members = buckets.get(key)
+            if members is None:
+                buckets[key] = [idx]
+            else:
+                members.append(idx)
+        band_buckets.append(buckets)
+
+    seen = set()
+    pairs = []
+    for members in (m for buckets in band_buckets for m in buckets.values() if len(m) > 1):
+        if len(members) > MAX_LSH_BUCKET:
+            continue
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if (a, b) in seen:
+                    continue
+                seen.add((a, b))
+                sig_a, sig_b = signatures[a][2], signatures[b][2]
+                similarity = sum(map(eq, sig_a, sig_b)) / MINHASH_PERMUTATIONS
+                if similarity >= threshold:
+                    pairs.append({
+                        "rows": [signatures[a][0], signatures[b][0]],
+                        "ids": [signatures[a][1], signatures[b][1]],
+                        "similarity": round(similarity, 3),
+                    })
+
+    pairs.sort(key=lambda p: (-p["similarity"], p["rows"]))
+    return pairs
+
+
+def lint_bank(
+    path: str,
+    data_dir: str = "data",
+    values_per_category: Optional[Sequence[int]] = None,
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+    offloader: Optional[Offloader] = None,
+    images_folder: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Revisa un banco completo y devuelve un reporte estructurado
+
+    ``values_per_category`` define qué casillas debe poder llenar cada
+    categoría; por omisión se usan los valores presentes en el banco.
+    """
+    started = time.perf_counter()
+    own_offloader = offloader is None
+    if own_offloader:
+        offloader = Offloader()
+
+    try:
+        raw_rows = offloader.run_io(lambda: list(game_logic._read_question_rows(path)))
+        numbered = list(enumerate(raw_rows, start=2))
+        images_dir = str(Path(data_dir) / (images_folder or Path(path).stem))
+
+        futures = [
+            offloader.submit_cpu(_lint_chunk, numbered[i:i + LINT_CHUNK_ROWS], images_dir)
+            for i in range(0, len(numbered), LINT_CHUNK_ROWS)
+        ]
+        issues: List[Dict[str, Any]] = []
+        records: List[Tuple[int, int, str, int]] = []
+        signatures: List[Tuple[int, int, Tuple[int, ...]]] = []
+        for future in offloader.as_completed(futures):
+            part = future.result()
+            issues.extend(part["issues"])
+            records.extend(part["records"])
+            signatures.extend(part["signatures"])
+
+        signatures.sort()
+        near_duplicates = offloader.run_cpu(find_near_duplicates, signatures, threshold)
+    finally:
+        if own_offloader:
+            offloader.shutdown()
+
+    records.sort()
+
+    first_row_by_id: Dict[int, int] = {}
+    bucket_counts: Dict[Tuple[str, int], int] = {}
+    for line, qid, cat, val in records:
+        if qid in first_row_by_id:
+            issues.append(_issue(line, "duplicate_id", f"id repetido (primera vez en fila {first_row_by_id[qid]})", qid))
+        else:
+            first_row_by_id[qid] = line
+        bucket_counts[(cat, val)] = bucket_counts.get((cat, val), 0) + 1
+
+    categories = sorted({cat for cat, _ in bucket_counts})
+    values = sorted(values_per_category or {val for _, val in bucket_counts})
+    empty_buckets = [
+        {"category": cat, "value": val}
+        for cat in categories for val in values
+        if not bucket_counts.get((cat, val))
+    ]
+
+    issues.sort(key=lambda i: (i["row"], i["code"]))
+
+    summary: Dict[str, int] = {}
+    for issue in issues:
+        summary[issue["code"]] = summary.get(issue["code"], 0) + 1
+    if empty_buckets:
+        summary["empty_bucket"] = len(empty_buckets)
+    if near_duplicates:
+        summary["near_duplicate"] = len(near_duplicates)
+
+    return {
+        "bank": Path(path).stem,
+        "rows": len(raw_rows),
+        "valid_rows": len(records),
+        "categories": categories,
+        "values": values,
+        "ok": not issues and not empty_buckets and not near_duplicates,
+        "summary": summary,
+        "issues": issues,
+        "empty_buckets": empty_buckets,
+        "near_duplicates": near_duplicates,
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def _print_report(report: Dict[str, Any]):
+    print(f"📋 Banco {report['bank']}: {report['valid_rows']}/{report['rows']} filas válidas "
+          f"en {report['elapsed']} s")
+    if report["ok"]:
+        print("✅ Sin problemas")
+        return
+    for code, count in sorted(report["summary"].items()):
+        print(f"   - {code}: {count}")
+    for issue in report["issues"][:50]:
+        print(f"   Fila {issue['row']} (id {issue['id']}): {issue['message']}")
+    for bucket in report["empty_buckets"][:50]:
+        print(f"   Sin pregunta para {bucket['category']} {bucket['value']}")
+    for pair in report["near_duplicates"][:50]:
+        print(f"   Casi duplicadas: filas {pair['rows'][0]} y {pair['rows'][1]} ({pair['similarity']:.0%})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Revisa un banco de preguntas CSV/XLSX")
+    parser.add_argument("path")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--values", help="Valores por categoría, p. ej. 100,200,300,400,500")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte como JSON")
+    args = parser.parse_args(argv)
+
+    values = [int(v) for v in args.values.split(",")] if args.values else None
+    report = lint_bank(args.path, data_dir=args.data_dir, values_per_category=values, threshold=args.threshold)
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        _print_report(report)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tableros armados con varios bancos a la vez
+
+Cada banco se abre desde su versión compilada (``bank_compiled``) y un índice
+combinado (``data/compiled/<hash>.pmerge``) junta sus cubetas (categoría,
+valor) sin preguntas repetidas: dos preguntas son la misma si su texto y
+opciones normalizados (``game_logic.normalize_text``) tienen el mismo
+resumen; se queda la del primer banco de la lista. El índice depende solo
+del contenido de los bancos y de su orden, así que se arma una vez y las
+cargas siguientes solo leen unos arreglos: agregar bancos no multiplica el
+tiempo de carga.
+
+El peso de cada banco es su parte esperada del tablero: en cada casilla se
+sortea primero el banco (entre los que tienen preguntas sin usar) y luego la
+pregunta. Las imágenes de cada pregunta se buscan en la carpeta de su banco
+(``data/<nombre del banco>/``).
+
+Dos bancos suelen numerar sus preguntas desde 1, así que en un tablero
+combinado cada id lleva el nombre de su banco (``merged_question_id``): es
+el que va al tablero y al índice de búsqueda. En ``usadas.csv`` cada
+pregunta queda con su banco y su id en el archivo, igual que al cargar el
+banco solo, así que las usadas valen en los dos modos.
+
+Uso:
+    python bank_merge.py data/question.csv data/question2.csv:0.5 [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from array import array
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import game_logic
+from bank_compiled import COMPILED_DIR, CompiledBank, open_compiled_bank
+from bank_index import BankIndex
+
+DATA_DIR = "data"
+MERGE_SUFFIX = ".pmerge"
+MERGE_VERSION = 2
+MAX_MERGED_INDEXES = 16  # Se conservan los más recientes
+MAX_BANKS = 16
+
+BankSpec = Tuple[str, float, str]  # (ruta, peso, nombre del banco)
+
+
+def parse_bank_specs(items: Any) -> List[BankSpec]:
+    """Bancos pedidos como ``["ruta:peso", ...]`` o ``[{"path", "weight", "name"}]``
+
+    El nombre (y la carpeta de imágenes) sale del nombre del archivo; los
+    bancos con peso 0 se omiten y una ruta repetida se toma una sola vez.
+    """
+    if isinstance(items, str):
+        items = [item.strip() for item in items.split(",") if item.strip()]
+    specs: List[BankSpec] = []
+    seen = set()
+    for item in items or ():
+        if isinstance(item, dict):
+            path, weight, name = item.get("path") or "", item.get("weight", 1), item.get("name")
+        else:
+            path, weight, name = str(item), 1, None
+            head, sep, tail = path.rpartition(":")
+            if sep and head:
+                try:
+                    path, weight = head, float(tail)
+                except ValueError:
+                    pass  # Los dos puntos son parte de la ruta
+        try:
+            weight = float(weight)
+        except (TypeError, ValueError):
+            raise ValueError(f"Peso inválido para {path}")
+        if not path:
+            raise ValueError("Banco sin ruta")
+        key = os.path.realpath(path)
+        if weight <= 0 or key in seen:
+            continue
+        seen.add(key)
+        specs.append((path, weight, name or Path(path).stem))
+    if not specs:
+        raise ValueError("No se especificó ningún banco")
+    if len(specs) > MAX_BANKS:
+        raise ValueError(f"A lo más {MAX_BANKS} bancos por tablero")
+    return specs
+
+
+def bank_image_folder(name: str, data_dir: str = DATA_DIR) -> Optional[str]:
+    """Carpeta de imágenes del banco (relativa a ``data``) si existe"""
+    return name if os.path.isdir(os.path.join(data_dir, name)) else None
+
+
+def merged_question_id(bank_name: str, qid: int) -> int:
+    """Id de una pregunta dentro de un tablero combinado: banco + id del archivo
+
+    Estable mientras el banco conserve su nombre y dentro del rango seguro de
+    JavaScript, como los ids generados de los bancos JSON.
+    """
+    key = f"{bank_name}\x1f{qid}".encode("utf-8")
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), "big") & game_logic.JSON_ID_MASK
+
+
+def question_key(q: Dict[str, Any]) -> bytes:
+    """Resumen del texto normalizado de la pregunta, sus opciones y su imagen"""
+    parts = [game_logic.normalize_text(q["question"])]
+    parts.extend(game_logic.normalize_text(choice) for choice in q["choices"])
+    parts.append(str(q.get("image") or "").casefold())
+    return blake2b("\x1f".join(parts).encode("utf-8"), digest_size=12).digest()
+
+
+# ---------------------
+# Índice combinado
+# ---------------------
+
+class MergedIndex:
+    """Cubetas de los bancos combinados: (id, banco, fila) de cada pregunta"""
+
+    __slots__ = ("categories", "buckets", "ids", "banks", "rows", "duplicates")
+
+    def __init__(self, categories: List[str], buckets: Dict[Tuple[str, int], Tuple[int, int]],
+                 ids: array, banks: array, rows: array, duplicates: int):
+        self.categories = categories
+        self.buckets = buckets  # (categoría, valor) -> (inicio, fin) en ids/banks/rows
+        self.ids = ids
+        self.banks = banks
+        self.rows = rows
+        self.duplicates = duplicates
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def to_bytes(self) -> bytes:
+        header = {
+            "version": MERGE_VERSION,
+            "byteorder": sys.byteorder,
+            "categories": self.categories,
+            "buckets": [[cat, value, start, stop] for (cat, value), (start, stop) in self.buckets.items()],
+            "count": len(self.ids),
+            "duplicates": self.duplicates,
+        }
+        head = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return head + b"\n" + self.ids.tobytes() + self.banks.tobytes() + self.rows.tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "MergedIndex":
+        head, _, body = blob.partition(b"\n")
+        header = json.loads(head.decode("utf-8"))
+        if header.get("version") != MERGE_VERSION or header.get("byteorder") != sys.byteorder:
+            raise ValueError("Índice combinado con formato desconocido")
+        count = header["count"]
+        ids, banks, rows = array("q"), array("H"), array("I")
+        pos = 0
+        for arr in (ids, banks, rows):
+            size = count * arr.itemsize
+            arr.frombytes(body[pos:pos + size])
+            pos += size
+        if len(rows) != count:
+            raise ValueError("Índice combinado incompleto")
+        buckets = {(cat, value): (start, stop) for cat, value, start, stop in header["buckets"]}
+        return cls(header["categories"], buckets, ids, banks, rows, header["duplicates"])
+
+
+def build_merged_index(banks: Sequence[CompiledBank], names: Sequence[str]) -> MergedIndex:
+    """Decodifica una vez cada banco y junta sus preguntas sin repetidas
+
+    Las repetidas dentro de un mismo banco se conservan (ya estaban así en
+    el banco); solo se descartan las que aparecen en un banco anterior. Un
+    id combinado que resulte igual en dos bancos se rechaza con ValueError.
+    """
+    seen = set()
+    owners: Dict[int, int] = {}  # id combinado -> banco
+    entries: Dict[Tuple[str, int], List[Tuple[int, int, int]]] = {}
+    duplicates = 0
+    for bank_no, (bank, name) in enumerate(zip(banks, names)):
+        keys = set()
+        for row in range(len(bank)):
+            q = bank.decode(row)
+            key = question_key(q)
+            if key in seen:
+                duplicates += 1
+                continue
+            keys.add(key)
+            qid = merged_question_id(name, q["idpregunta"])
+            owner = owners.setdefault(qid, bank_no)
+            if owner != bank_no:
+                raise ValueError(
+                    f"La pregunta {q['idpregunta']} de {name} choca con una de {names[owner]}; renombra uno de los bancos"
+                )
+            entries.setdefault((q["category"], q["value"]), []).append((qid, bank_no, row))
+        seen |= keys
+
+    ids, bank_nos, rows = array("q"), array("H"), array("I")
+    buckets: Dict[Tuple[str, int], Tuple[int, int]] = {}
+    for bucket in sorted(entries):
+        start = len(ids)
+        for qid, bank_no, row in entries[bucket]:
+            ids.append(qid)
+            bank_nos.append(bank_no)
+            rows.append(row)
+        buckets[bucket] = (start, len(ids))
+    categories = sorted({cat for cat, _ in entries})
+    return MergedIndex(categories, buckets, ids, bank_nos, rows, duplicates)
+
+
+def merged_path_for(compiled_paths: Sequence[str], names: Sequence[str], compiled_dir: str = COMPILED_DIR) -> str:
+    """Ruta del ``.pmerge``: resumen de los bancos compilados y sus nombres, en orden"""
+    key = "|".join(f"{Path(p).stem}:{name}" for p, name in zip(compiled_paths, names))
+    digest = blake2b(f"{MERGE_VERSION}|{key}".encode("utf-8"), digest_size=16).hexdigest()
+    return str(Path(compiled_dir) / f"{digest}{MERGE_SUFFIX}")
+
+
+def _write_merged_index(index: MergedIndex, dest_path: str):
+    dest = Path(dest_path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(index.to_bytes())
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _prune_merged(compiled_dir: Path, keep: int = MAX_MERGED_INDEXES):
+    indexes = sorted(compiled_dir.glob(f"*{MERGE_SUFFIX}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in indexes[keep:]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+class MergedBank:
+    """Varios ``CompiledBank`` vistos como uno solo
+
+    Ofrece la interfaz de cubetas de ``game_logic.build_sampled_board`` y
+    además ``pick_weights`` para repartir el sorteo según el peso de cada
+    banco.
+    """
+
+    def __init__(self, specs: Sequence[BankSpec], banks: List[CompiledBank], index: MergedIndex, built: bool = False):
+        self.specs = list(specs)
+        self.weights = [weight for _, weight, _ in specs]
+        self.names = [name for _, _, name in specs]
+        self.image_folders = [bank_image_folder(name) for name in self.names]
+        self._banks = banks
+        self.index = index
+        self.built = built  # True si el índice se armó en esta apertura
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __enter__(self) -> "MergedBank":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for bank in self._banks:
+            bank.close()
+        self._banks = []
+
+    # ---------------------
+    # Interfaz de cubetas
+    # ---------------------
+
+    def categories(self) -> List[str]:
+        return list(self.index.categories)
+
+    def _bucket(self, category: str, value: int) -> Tuple[int, int]:
+        return self.index.buckets.get((category, value), (0, 0))
+
+    def bucket_ids(self, category: str, value: int) -> Sequence[int]:
+        start, stop = self._bucket(category, value)
+        return self.index.ids[start:stop].tolist()
+
+    def row(self, category: str, value: int, pos: int) -> Dict[str, Any]:
+        start, _ = self._bucket(category, value)
+        return self._decode(start + pos)
+
+    def pick_weights(self, category: str, value: int, positions: Sequence[int]) -> List[float]:
+        """Peso de cada posición: el del banco repartido entre sus candidatas"""
+        start, _ = self._bucket(category, value)
+        per_bank: Dict[int, int] = {}
+        for pos in positions:
+            bank_no = self.index.banks[start + pos]
+            per_bank[bank_no] = per_bank.get(bank_no, 0) + 1
+        return [self.weights[self.index.banks[start + pos]] / per_bank[self.index.banks[start + pos]] for pos in positions]
+
+    def _decode(self, entry: int) -> Dict[str, Any]:
+        bank_no = self.index.banks[entry]
+        q = self._banks[bank_no].decode(self.index.rows[entry])
+        q["bank"], q["bank_id"] = self.names[bank_no], q["idpregunta"]
+        q["idpregunta"] = self.index.ids[entry]
+        folder = self.image_folders[bank_no]
+        if q.get("image") and folder:
+            q["image_folder"] = folder
+        return q
+
+    def used_ids(self, ledger: Dict[str, Set[int]]) -> Set[int]:
+        """Ids combinados ya usados, a partir de las usadas de cada banco
+
+        ``ledger`` es ``game_logic._read_used_ledger``; las filas sin banco
+        cuentan para todos (y cubren las que ya traían el id combinado).
+        """
+        shared = ledger.get("", set())
+        used = set(shared)
+        for name in self.names:
+            used.update(merged_question_id(name, qid) for qid in shared | ledger.get(name, set()))
+        return used
+
+    # ---------------------
+    # Resúmenes
+    # ---------------------
+
+    def questions(self) -> List[Dict[str, Any]]:
+        """Todas las preguntas combinadas (para el índice de búsqueda)"""
+        return [self._decode(entry) for entry in range(len(self.index))]
+
+    def category_weights(self) -> Optional[Dict[str, float]]:
+        """Peso de cada categoría: suma de los pesos de los bancos que la tienen
+
+        None si todas pesan igual (el sorteo de categorías queda uniforme).
+        """
+        banks_by_category: Dict[str, set] = {}
+        for (cat, _), (start, stop) in self.index.buckets.items():
+            banks_by_category.setdefault(cat, set()).update(self.index.banks[start:stop])
+        weights = {cat: sum(self.weights[b] for b in banks) for cat, banks in banks_by_category.items()}
+        return weights if len(set(weights.values())) > 1 else None
+
+    def summary(self) -> Dict[str, Any]:
+        counts = [0] * len(self.specs)
+        for bank_no in self.index.banks:
+            counts[bank_no] += 1
+        return {
+            "banks": [
+                {"name": name, "weight": weight, "questions": count, "images_folder": folder}
+                for name, weight, count, folder in zip(self.names, self.weights, counts, self.image_folders)
+            ],
+            "questions": len(self.index),
+            "duplicates": self.index.duplicates,
+            "categories": len(self.index.categories),
+            "index_built": self.built,
+        }
+
+
+def open_merged_bank(specs: Sequence[BankSpec], compiled_dir: str = COMPILED_DIR) -> MergedBank:
+    """Abre los bancos compilados y su índice combinado (armándolo si hace falta)"""
+    banks: List[CompiledBank] = []
+    try:
+        for path, _, name in specs:
+            bank = open_compiled_bank(path, compiled_dir)
+            if bank is None:
+                raise ValueError(f"No se pudo leer el banco {name}")
+            banks.append(bank)
+
+        names = [name for _, _, name in specs]
+        target = merged_path_for([bank.path for bank in banks], names, compiled_dir)
+        index, built = None, False
+        if os.path.exists(target):
+            try:
+                os.utime(target)  # Marca de uso para la limpieza
+                with open(target, "rb") as f:
+                    index = MergedIndex.from_bytes(f.read())
+            except (OSError, ValueError, KeyError):
+                index = None  # Archivo dañado: se vuelve a armar
+        if index is None:
+            index, built = build_merged_index(banks, names), True
+            _write_merged_index(index, target)
+            _prune_merged(Path(compiled_dir))
+    except BaseException:
+        for bank in banks:
+            bank.close()
+        raise
+    return MergedBank(specs, banks, index, built)
+
+
+def prepare_merged_bank(specs: Sequence[BankSpec], compiled_dir: str = COMPILED_DIR) -> Dict[str, Any]:
+    """Compila los bancos y arma el índice combinado si faltan (pensado para un proceso)"""
+    with open_merged_bank(specs, compiled_dir) as merged:
+        return merged.summary()
+
+
+# ---------------------
+# Carga
+# ---------------------
+
+def load_from_banks(
+    specs: Sequence[BankSpec],
+    used_csv_path: str = "data/usadas.csv",
+    category_weights: Optional[Dict[str, float]] = None,
+    **board_options,
+) -> Dict[str, Any]:
+    """Arma un tablero con varios bancos (mismas opciones que ``load_from_csv_sampled``)
+
+    Sin ``category_weights`` las categorías se sortean según los pesos de
+    los bancos que las tienen.
+    """
+    with open_merged_bank(specs) as merged:
+        if category_weights is None:
+            category_weights = merged.category_weights()
+        return game_logic.build_sampled_board(
+            merged,
+            used_csv_path=used_csv_path,
+            category_weights=category_weights,
+            **board_options,
+        )
+
+
+def load_indexed_banks(specs: Sequence[BankSpec], used_csv_path: str = "data/usadas.csv") -> BankIndex:
+    """Índice de búsqueda de las preguntas combinadas (pensado para un proceso)"""
+    with open_merged_bank(specs) as merged:
+        questions = merged.questions()
+        used_ids = merged.used_ids(game_logic._read_used_ledger(used_csv_path))
+    return BankIndex(questions, used_ids)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Combina bancos y muestra el índice resultante")
+    parser.add_argument("banks", nargs="+", help="Rutas de los bancos, opcionalmente con peso (ruta:peso)")
+    parser.add_argument("--compiled-dir", default=COMPILED_DIR)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        specs = parse_bank_specs(args.banks)
+        started = time.perf_counter()
+        summary = prepare_merged_bank(specs, args.compiled_dir)
+        opened = time.perf_counter() - started
+        started = time.perf_counter()
+        prepare_merged_bank(specs, args.compiled_dir)
+        reopened = time.perf_counter() - started
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    summary["open_ms"] = {"first": round(opened * 1000, 2), "cached": round(reopened * 1000, 2)}
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+    for bank in summary["banks"]:
+        folder = f"data/{bank['images_folder']}/" if bank["images_folder"] else "sin imágenes"
+        print(f"📚 {bank['name']}: {bank['questions']} preguntas · peso {bank['weight']:g} · {folder}")
+    print(
+        f"🔀 {summary['questions']} preguntas en {summary['categories']} categorías · "
+        f"{summary['duplicates']} repetidas omitidas"
+    )
+    how = "armando el índice" if summary["index_built"] else "con el índice guardado"
+    print(f"⏱️ Apertura: {summary['open_ms']['first']} ms ({how}), {summary['open_ms']['cached']} ms al reabrir")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
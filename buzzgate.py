@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Entrada directa para timbres físicos (UDP)
+
+Los timbres del navegador viajan por Socket.IO, que puede seguir en
+long-polling: cada pulsación es una petición HTTP completa. Las cajas de
+timbres mandan en cambio un datagrama UDP de 10 bytes; ``BuzzerGateway`` lo
+recibe, le pone la hora de llegada y lo pasa directo al arbitraje del timbre
+en ``app.py``. La caja recibe un acuse con el resultado (turno otorgado,
+tarde, rechazado) para encender su luz.
+
+Paquete de pulsación (red, big-endian)::
+
+    "PB"  versión(1)  equipo(1, desde 0)  dispositivo(2)  secuencia(4)
+
+Acuse::
+
+    "PA"  versión(1)  equipo(1)  dispositivo(2)  secuencia(4)  estado(1)
+
+Una caja que no recibe acuse reenvía la misma secuencia; el reenvío no se
+vuelve a arbitrar, solo se repite el acuse. La entrada está apagada salvo
+que se defina ``PAINANI_TIMBRES``: ``on`` (127.0.0.1:5005), un puerto
+(``5006``) o interfaz y puerto (``192.168.1.10:5005``) para escuchar las
+cajas en la red del salón. ``0`` u ``off`` la dejan apagada.
+
+Uso (caja de software para pruebas y comparación con la ruta HTTP):
+    python buzzgate.py press 2 [--host 127.0.0.1] [--port 5005]
+    python buzzgate.py bench [--presses 2000]
+"""
+import argparse
+import json
+import os
+import select
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+GATEWAY_ENV = "PAINANI_TIMBRES"
+GATEWAY_HOST = "127.0.0.1"  # Solo local salvo que se indique la interfaz
+GATEWAY_PORT = 5005
+
+PROTOCOL_VERSION = 1
+PRESS_MAGIC = b"PB"
+ACK_MAGIC = b"PA"
+PRESS_FORMAT = "!2sBBHI"
+ACK_FORMAT = "!2sBBHIB"
+
+# Estados del acuse
+ACK_AWARDED = 1  # El equipo tiene el turno
+ACK_LATE = 2  # Otro equipo ya lo tenía o no hay pregunta abierta
+ACK_REJECTED = 3  # Equipo inválido o que ya intentó
+ACK_NAMES = {ACK_AWARDED: "awarded", ACK_LATE: "late", ACK_REJECTED: "rejected"}
+
+WAIT_TIMEOUT = 0.5  # Para revisar ``stop`` aunque no lleguen paquetes
+LATENCY_SAMPLES = 1024  # Latencias recientes guardadas para las estadísticas
+DEVICE_TIMEOUT = 0.05
+DEVICE_RETRIES = 5
+BENCH_PRESSES = 2000
+
+_PRESS = struct.Struct(PRESS_FORMAT)
+_ACK = struct.Struct(ACK_FORMAT)
+
+
+def gateway_address(value: Optional[str] = None) -> Optional[Tuple[str, int]]:
+    """Interfaz y puerto configurados (``None`` si la entrada está desactivada)"""
+    raw = (value if value is not None else os.environ.get(GATEWAY_ENV, "")).strip().lower()
+    if raw in ("", "0", "off", "no"):
+        return None
+    if raw in ("1", "on", "si", "sí"):
+        return GATEWAY_HOST, GATEWAY_PORT
+    host, _, port = raw.rpartition(":")
+    host = host.strip("[]") or GATEWAY_HOST
+    try:
+        port_number = int(port)
+    except ValueError:
+        print(f"⚠️  {GATEWAY_ENV}={raw!r} no es un puerto ni interfaz:puerto; cajas de timbres desactivadas")
+        return None
+    if not 0 < port_number < 65536:
+        print(f"⚠️  {GATEWAY_ENV}={raw!r} fuera de rango; cajas de timbres desactivadas")
+        return None
+    return host, port_number
+
+
+def encode_press(team: int, device: int, sequence: int) -> bytes:
+    return _PRESS.pack(PRESS_MAGIC, PROTOCOL_VERSION, team, device, sequence)
+
+
+def decode_press(packet: bytes) -> Optional[Tuple[int, int, int]]:
+    """(equipo, dispositivo, secuencia) o ``None`` si el paquete no es válido"""
+    if len(packet) != _PRESS.size:
+        return None
+    magic, version, team, device, sequence = _PRESS.unpack(packet)
+    if magic != PRESS_MAGIC or version != PROTOCOL_VERSION:
+        return None
+    return team, device, sequence
+
+
+def encode_ack(team: int, device: int, sequence: int, status: int) -> bytes:
+    return _ACK.pack(ACK_MAGIC, PROTOCOL_VERSION, team, device, sequence, status)
+
+
+def decode_ack(packet: bytes) -> Optional[Tuple[int, int, int, int]]:
+    if len(packet) != _ACK.size:
+        return None
+    magic, version, team, device, sequence, status = _ACK.unpack(packet)
+    if magic != ACK_MAGIC or version != PROTOCOL_VERSION:
+        return None
+    return team, device, sequence, status
+
+
+def select_waiter(sock: socket.socket, timeout: float) -> bool:
+    """Espera a que haya datos (hilos normales)"""
+    return bool(select.select([sock], [], [], timeout)[0])
+
+
+def waiter_for(async_mode: str) -> Callable[[socket.socket, float], bool]:
+    """Función de espera que no bloquea el bucle del servidor de Socket.IO"""
+    if async_mode == "eventlet":
+        from eventlet.hubs import trampoline
+
+        def eventlet_waiter(sock: socket.socket, timeout: float) -> bool:
+            try:
+                trampoline(sock, read=True, timeout=timeout, timeout_exc=socket.timeout)
+            except socket.timeout:
+                return False
+            return True
+        return eventlet_waiter
+    return select_waiter
+
+
+class BuzzerGateway:
+    """Recibe pulsaciones UDP y las entrega a ``on_press(equipo, llegada, responder)``
+
+    ``on_press`` regresa un estado de acuse (``ACK_AWARDED``...) o ``None``
+    si lo decidirá después, y entonces llama ``responder(estado)``. La llegada
+    se mide con ``clock`` (``time.monotonic``, igual que ``GameState``).
+    """
+
+    def __init__(
+        self,
+        on_press: Callable[[int, float, Callable[[int], None]], Optional[int]],
+        host: str = GATEWAY_HOST,
+        port: int = GATEWAY_PORT,
+        wait: Callable[[socket.socket, float], bool] = select_waiter,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.on_press = on_press
+        self.host = host
+        self.port = port
+        self.wait = wait
+        self.clock = clock
+        self.sock: Optional[socket.socket] = None
+        self.counts: Counter = Counter()
+        self._last: Dict[Tuple[Any, int], Tuple[int, Optional[int]]] = {}  # (dirección, dispositivo) -> (secuencia, estado)
+        self._latencies: List[float] = []
+        self._stop = False
+
+    def bind(self) -> "BuzzerGateway":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((self.host, self.port))
+        sock.setblocking(False)
+        self.port = sock.getsockname()[1]
+        self.sock = sock
+        return self
+
+    def serve(self):
+        """Atiende paquetes hasta ``stop``; cada ráfaga se vacía completa"""
+        if self.sock is None:
+            self.bind()
+        sock = self.sock
+        while not self._stop:
+            if not self.wait(sock, WAIT_TIMEOUT):
+                continue
+            while True:
+                try:
+                    packet, addr = sock.recvfrom(64)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    if self._stop:
+                        return
+                    break
+                self.handle(packet, addr, self.clock())
+
+    def handle(self, packet: bytes, addr: Any, arrived: float):
+        press = decode_press(packet)
+        if press is None:
+            self.counts["malformed"] += 1
+            return
+        team, device, sequence = press
+        last = self._last.get((addr, device))
+        if last is not None and last[0] == sequence:
+            # Reenvío de una pulsación ya arbitrada: solo se repite el acuse (si ya lo hay)
+            self.counts["duplicate"] += 1
+            if last[1] is not None:
+                self._send_ack(addr, team, device, sequence, last[1])
+            return
+        self._last[(addr, device)] = (sequence, None)
+
+        def reply(status: int):
+            self.reply(addr, team, device, sequence, arrived, status)
+        status = self.on_press(team, arrived, reply)
+        if status is not None:
+            reply(status)
+
+    def reply(self, addr: Any, team: int, device: int, sequence: int, arrived: float, status: int):
+        """Acusa el resultado de una pulsación (en el momento o cuando se arbitró)"""
+        key = (addr, device)
+        if self._last.get(key, (None,))[0] == sequence:
+            self._last[key] = (sequence, status)
+        self.counts[ACK_NAMES.get(status, "rejected")] += 1
+        self._latencies.append(self.clock() - arrived)
+        if len(self._latencies) > LATENCY_SAMPLES:
+            del self._latencies[:LATENCY_SAMPLES // 2]
+        self._send_ack(addr, team, device, sequence, status)
+
+    def _send_ack(self, addr: Any, team: int, device: int, sequence: int, status: int):
+        try:
+            self.sock.sendto(encode_ack(team, device, sequence, status), addr)
+        except OSError:
+            self.counts["ack_failed"] += 1
+
+    def stop(self):
+        self._stop = True
+        if self.sock is not None:
+            self.sock.close()
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "port": self.port,
+            "packets": sum(self.counts.values()),
+            **{name: self.counts[name] for name in ("awarded", "late", "rejected", "duplicate", "malformed")},
+            "devices": len(self._last),
+            "award_us_p50": round(latencies[len(latencies) // 2] * 1e6, 1) if latencies else None,
+            "award_us_p99": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1) if latencies else None,
+        }
+
+
+class SoftBuzzer:
+    """Caja de timbres de software: manda pulsaciones y espera el acuse"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = GATEWAY_PORT, device: int = 1):
+        self.address = (host, port)
+        self.device = device
+        self.sequence = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def press(self, team: int, timeout: float = DEVICE_TIMEOUT, retries: int = DEVICE_RETRIES) -> Tuple[Optional[int], float]:
+        """(estado del acuse o ``None`` sin respuesta, segundos desde el primer envío)"""
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        packet = encode_press(team, self.device, self.sequence)
+        started = time.perf_counter()
+        for _ in range(retries):
+            self.sock.sendto(packet, self.address)
+            deadline = time.perf_counter() + timeout
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not select.select([self.sock], [], [], remaining)[0]:
+                    break
+                ack = decode_ack(self.sock.recv(64))
+                if ack is not None and ack[1] == self.device and ack[2] == self.sequence:
+                    return ack[3], time.perf_counter() - started
+        return None, time.perf_counter() - started
+
+    def close(self):
+        self.sock.close()
+
+
+# ---------------------
+# Comparación con la ruta HTTP
+# ---------------------
+
+def _bench_arbiter(teams: int = 5) -> Callable[..., int]:
+    """Arbitraje real de ``GameState``: cada pulsación abre una pregunta nueva"""
+    import contextlib
+    import io
+    import game_logic
+
+    state = game_logic.GameState()
+    state.set_player_count(teams)
+    quiet = io.StringIO()
+
+    def on_press(team: int, arrived: float, reply: Optional[Callable[[int], None]] = None) -> int:
+        with contextlib.redirect_stdout(quiet):
+            state.cancel_question()
+            state.open_question(0, 0)
+            result = state.buzzer_press(team, arrived)
+        quiet.seek(0)
+        quiet.truncate()
+        return ACK_REJECTED if "error" in result else ACK_AWARDED
+    return on_press
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+        "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 1),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+    }
+
+
+def bench_udp(presses: int) -> Dict[str, Any]:
+    gateway = BuzzerGateway(_bench_arbiter(), host="127.0.0.1", port=0).bind()
+    thread = threading.Thread(target=gateway.serve, daemon=True)
+    thread.start()
+    device = SoftBuzzer("127.0.0.1", gateway.port)
+    try:
+        samples = []
+        for i in range(presses):
+            status, elapsed = device.press(i % 5)
+            if status == ACK_AWARDED:
+                samples.append(elapsed)
+    finally:
+        device.close()
+        gateway.stop()
+    return {"awarded": len(samples), **_percentiles(samples), "gateway": gateway.stats()}
+
+
+def bench_http(presses: int) -> Dict[str, Any]:
+    """Una petición POST por pulsación, como Engine.IO en long-polling"""
+    import http.client
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    on_press = _bench_arbiter()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            status = on_press(body["player"], time.monotonic())
+            reply = json.dumps({"status": status}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    conn.connect()
+    conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Sin Nagle, como un navegador
+    try:
+        samples = []
+        for i in range(presses):
+            started = time.perf_counter()
+            conn.request("POST", "/socket.io/", json.dumps({"player": i % 5}), {"Content-Type": "application/json"})
+            if json.loads(conn.getresponse().read())["status"] == ACK_AWARDED:
+                samples.append(time.perf_counter() - started)
+    finally:
+        conn.close()
+        server.shutdown()
+    return {"awarded": len(samples), **_percentiles(samples)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Caja de timbres de software y comparación de latencia")
+    sub = parser.add_subparsers(dest="command", required=True)
+    press = sub.add_parser("press", help="Manda una pulsación a un servidor en marcha")
+    press.add_argument("team", type=int, help="Equipo (1-10)")
+    host, port = gateway_address() or (GATEWAY_HOST, GATEWAY_PORT)
+    press.add_argument("--host", default="127.0.0.1" if host == "0.0.0.0" else host)
+    press.add_argument("--port", type=int, default=port)
+    press.add_argument("--device", type=int, default=1)
+    bench = sub.add_parser("bench", help="Latencia pulsación-turno: UDP contra POST HTTP")
+    bench.add_argument("--presses", type=int, default=BENCH_PRESSES)
+    bench.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "press":
+        device = SoftBuzzer(args.host, args.port, args.device)
+        status, elapsed = device.press(args.team - 1)
+        device.close()
+        if status is None:
+            print(f"❌ Sin acuse de {args.host}:{args.port}")
+            return 1
+        print(f"🔔 Equipo {args.team}: {ACK_NAMES.get(status, status)} ({elapsed * 1000:.2f} ms)")
+        return 0 if status == ACK_AWARDED else 2
+
+    results = {"udp": bench_udp(args.presses), "http": bench_http(args.presses)}
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for name, label in (("udp", "UDP (caja de timbres)"), ("http", "POST HTTP (long-polling)")):
+            r = results[name]
+            print(f"{label:<26} p50 {r['p50_us']:>8} µs · p99 {r['p99_us']:>8} µs · media {r['mean_us']:>8} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
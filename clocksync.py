@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sincronización de relojes por cliente para timbres justos
+
+Un equipo con peor conexión pierde carreras de timbre que ganó: su
+``buzzer_press`` llega después aunque haya tocado antes. Al conectarse y
+cada tanto, el servidor manda ``clock_ping`` y el cliente contesta con su
+reloj; como en NTP, de la muestra con menor ida y vuelta sale el desfase
+entre relojes. ``buzzer_press`` lleva la hora del cliente; el servidor la
+pasa a su reloj, la acota contra la llegada (no puede ser posterior ni
+más antigua que la menor ida y vuelta, con un margen corto por variación de
+red) y ``BuzzArbiter`` junta
+durante una ventana corta las pulsaciones de la misma pregunta para otorgar
+el turno a la más temprana.
+
+Uso (carreras simuladas con latencia y variación de red):
+    python clocksync.py [--races 20000] [--jitter 0,20,50] [--json]
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CLOCK_SAMPLES = 8  # Muestras recientes por cliente (se usa la de menor ida y vuelta)
+CLOCK_BURST = 4  # Pings al conectarse
+CLOCK_BURST_SPACING = 0.05
+CLOCK_SYNC_INTERVAL = 15.0  # Segundos entre pings periódicos
+PING_TIMEOUT = 5.0  # Un pong más tardío se descarta
+
+CLOCK_TOLERANCE_MS = 10.0  # Margen por deriva y redondeo del reloj del cliente
+MAX_EXTRA_LAG_MS = 40.0  # Atraso permitido además de la menor ida y vuelta
+RTT_OUTLIER_FACTOR = 2.0  # Se descartan muestras con ida y vuelta mayor a
+RTT_OUTLIER_MS = 20.0  # RTT_OUTLIER_FACTOR × la menor + RTT_OUTLIER_MS
+MAX_WINDOW_MS = 120.0  # Espera máxima antes de otorgar el turno
+
+PRESS_CORRECTED = "corrected"
+PRESS_UNSYNCED = "unsynced"
+PRESS_OUT_OF_BOUNDS = "out_of_bounds"
+
+
+def server_ms(now: Optional[float] = None) -> float:
+    """Reloj del servidor en milisegundos (``time.monotonic``)"""
+    return (time.monotonic() if now is None else now) * 1000.0
+
+
+class ClientClock:
+    """Desfase y ida y vuelta estimados para una conexión"""
+
+    __slots__ = ("samples", "offset", "rtt", "pending")
+
+    def __init__(self):
+        self.samples: deque = deque(maxlen=CLOCK_SAMPLES)  # (ida y vuelta, desfase) en ms
+        self.offset: Optional[float] = None  # Reloj del cliente menos reloj del servidor
+        self.rtt: Optional[float] = None
+        self.pending: Dict[int, float] = {}  # id del ping -> envío en ms del servidor
+
+    def add_sample(self, rtt: float, offset: float):
+        """Agrega una muestra y se queda con las cercanas a la menor ida y vuelta
+
+        Un pong retenido a propósito (hasta ``PING_TIMEOUT``) no cambia el
+        desfase ni amplía el margen con que se acepta una hora antigua.
+        """
+        self.samples.append((rtt, offset))
+        self.rtt, self.offset = min(self.samples)
+        limit = self.rtt * RTT_OUTLIER_FACTOR + RTT_OUTLIER_MS
+        if any(sample_rtt > limit for sample_rtt, _ in self.samples):
+            self.samples = deque((s for s in self.samples if s[0] <= limit), maxlen=CLOCK_SAMPLES)
+
+
+class ClockSync:
+    """Relojes de todas las conexiones, indexados por ``sid``"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._clients: Dict[Any, ClientClock] = {}
+        self._next_id = 0
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def ping(self, sid: Any, now: Optional[float] = None) -> Dict[str, Any]:
+        """Contenido de un ``clock_ping`` para ``sid``"""
+        sent = server_ms(self.clock() if now is None else now)
+        with self._lock:
+            client = self._clients.setdefault(sid, ClientClock())
+            self._next_id += 1
+            ping_id = self._next_id
+            # Pings viejos sin respuesta ya no sirven
+            client.pending = {k: v for k, v in client.pending.items() if sent - v < PING_TIMEOUT * 1000}
+            client.pending[ping_id] = sent
+        return {"id": ping_id}
+
+    def pong(self, sid: Any, data: Any, now: Optional[float] = None) -> bool:
+        """Registra la respuesta del cliente; False si no corresponde a un ping"""
+        received = server_ms(self.clock() if now is None else now)
+        try:
+            ping_id = int(data["id"])
+            client_time = float(data["client"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        with self._lock:
+            client = self._clients.get(sid)
+            sent = client.pending.pop(ping_id, None) if client else None
+            if sent is None:
+                return False
+            rtt = received - sent
+            client.add_sample(rtt, client_time - (sent + rtt / 2))
+            self.counts["samples"] += 1
+        return True
+
+    def correct(self, sid: Any, client_ts: Any, arrival: float) -> Tuple[float, str]:
+        """Momento de la pulsación en el reloj del servidor (segundos) y cómo se obtuvo
+
+        Sin sincronizar, sin hora del cliente o fuera de límites se usa la
+        llegada. El límite inferior sale de la menor ida y vuelta (la misma
+        muestra del desfase) más ``MAX_EXTRA_LAG_MS``: retrasar un pong no
+        permite adelantar la hora de una pulsación.
+        """
+        client = self._clients.get(sid)
+        if client is None or client.offset is None or client_ts is None:
+            self.counts[PRESS_UNSYNCED] += 1
+            return arrival, PRESS_UNSYNCED
+        try:
+            pressed = float(client_ts) - client.offset
+        except (TypeError, ValueError):
+            self.counts[PRESS_UNSYNCED] += 1
+            return arrival, PRESS_UNSYNCED
+        arrived = server_ms(arrival)
+        if pressed > arrived + CLOCK_TOLERANCE_MS or pressed < arrived - client.rtt - MAX_EXTRA_LAG_MS:
+            self.counts[PRESS_OUT_OF_BOUNDS] += 1
+            return arrival, PRESS_OUT_OF_BOUNDS
+        self.counts[PRESS_CORRECTED] += 1
+        return min(pressed, arrived) / 1000.0, PRESS_CORRECTED
+
+    def window(self) -> float:
+        """Segundos a esperar por pulsaciones de clientes más lejanos
+
+        La ida de la conexión más lenta (media ida y vuelta, con margen),
+        hasta ``MAX_WINDOW_MS``. Con todos los clientes en la red local es
+        de unos milisegundos.
+        """
+        one_way = [c.rtt / 2 for c in self._clients.values() if c.rtt is not None]
+        if not one_way:
+            return 0.0
+        return min(MAX_WINDOW_MS, max(one_way) * 1.5) / 1000.0
+
+    def forget(self, sid: Any):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def sids(self) -> List[Any]:
+        return list(self._clients)
+
+    def stats(self) -> Dict[str, Any]:
+        synced = [c for c in self._clients.values() if c.offset is not None]
+        return {
+            "clients": len(self._clients),
+            "synced": len(synced),
+            "window_ms": round(self.window() * 1000, 1),
+            "max_rtt_ms": round(max((c.rtt for c in synced), default=0.0), 1),
+            "presses": {k: self.counts[k] for k in (PRESS_CORRECTED, PRESS_UNSYNCED, PRESS_OUT_OF_BOUNDS)},
+        }
+
+
+class PendingPress:
+    __slots__ = ("player", "pressed_at", "reply")
+
+    def __init__(self, player: Any, pressed_at: float, reply: Optional[Callable[[Dict], None]]):
+        self.player = player
+        self.pressed_at = pressed_at
+        self.reply = reply
+
+
+class BuzzArbiter:
+    """Junta las pulsaciones de una pregunta durante la ventana y las ordena
+
+    Una ronda por sala (``None`` es el juego principal) y pregunta abierta.
+    """
+
+    def __init__(self):
+        self._rounds: Dict[Any, Tuple[Any, Dict[Any, PendingPress]]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, room: Any, question: Any, player: Any, pressed_at: float,
+               reply: Optional[Callable[[Dict], None]] = None) -> bool:
+        """Agrega una pulsación; True si abrió la ronda (hay que programar ``settle``)"""
+        with self._lock:
+            current = self._rounds.get(room)
+            opened = current is None or current[0] is not question
+            if opened:
+                current = self._rounds[room] = (question, {})
+            presses = current[1]
+            previous = presses.get(player)
+            if previous is None or pressed_at < previous.pressed_at:
+                presses[player] = PendingPress(player, pressed_at, reply)
+            return opened
+
+    def settle(self, room: Any) -> Tuple[Any, List[PendingPress]]:
+        """(pregunta, pulsaciones de la más temprana a la más tardía) y cierra la ronda"""
+        with self._lock:
+            question, presses = self._rounds.pop(room, (None, {}))
+        return question, sorted(presses.values(), key=lambda p: p.pressed_at)
+
+
+# ---------------------
+# Simulación
+# ---------------------
+
+TEAM_LATENCIES_MS = (3.0, 15.0, 35.0, 70.0, 120.0)  # Ida base de cada equipo
+REACTION_SPREAD_MS = 60.0  # Los equipos tocan dentro de este intervalo
+SIM_RACES = 20000
+
+
+def simulate(jitter_ms: float, races: int = SIM_RACES, seed: int = 0,
+             latencies: Tuple[float, ...] = TEAM_LATENCIES_MS) -> Dict[str, Any]:
+    """Porcentaje de carreras que gana quien tocó primero: por llegada y corregido
+
+    Cada equipo tiene su latencia base, una variación exponencial de media
+    ``jitter_ms`` en cada sentido y un reloj desfasado al azar.
+    """
+    rng = random.Random(seed)
+    sync = ClockSync()
+    offsets = [rng.uniform(-5e6, 5e6) for _ in latencies]
+
+    def delay(team: int) -> float:
+        return latencies[team] + (rng.expovariate(1.0 / jitter_ms) if jitter_ms > 0 else 0.0)
+
+    now = 1000.0  # ms del servidor
+    for _ in range(CLOCK_SAMPLES):
+        for team in range(len(latencies)):
+            payload = sync.ping(team, now / 1000.0)
+            at_client = now + delay(team)
+            back = at_client + delay(team)
+            sync.pong(team, {"id": payload["id"], "client": at_client + offsets[team]}, back / 1000.0)
+        now += 1000.0
+
+    window_ms = sync.window() * 1000.0
+    by_arrival = by_clock = 0
+    for _ in range(races):
+        now += 5000.0
+        pressed = [now + rng.uniform(0, REACTION_SPREAD_MS) for _ in latencies]
+        arrivals = [pressed[t] + delay(t) for t in range(len(latencies))]
+        winner = min(range(len(latencies)), key=pressed.__getitem__)
+
+        first = min(arrivals)
+        by_arrival += min(range(len(latencies)), key=arrivals.__getitem__) == winner
+        # Solo entran las pulsaciones que llegan dentro de la ventana
+        candidates = []
+        for t in range(len(latencies)):
+            if arrivals[t] <= first + window_ms:
+                corrected, _ = sync.correct(t, pressed[t] + offsets[t], arrivals[t] / 1000.0)
+                candidates.append((corrected, t))
+        by_clock += min(candidates)[1] == winner
+
+    return {
+        "jitter_ms": jitter_ms,
+        "races": races,
+        "window_ms": round(window_ms, 1),
+        "fair_by_arrival": round(by_arrival / races * 100, 1),
+        "fair_corrected": round(by_clock / races * 100, 1),
+        "presses": dict(sync.counts),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simula carreras de timbre con y sin sincronizar relojes")
+    parser.add_argument("--races", type=int, default=SIM_RACES)
+    parser.add_argument("--jitter", default="0,10,25,50", help="Variación media de red en ms, separada por comas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    results = [simulate(float(j), args.races, args.seed) for j in args.jitter.split(",")]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    print(f"Latencias base por equipo: {', '.join(f'{l:g}' for l in TEAM_LATENCIES_MS)} ms")
+    print(f"{'variación':>10} {'ventana':>9} {'por llegada':>12} {'corregido':>10}")
+    for r in results:
+        print(f"{r['jitter_ms']:>8g} ms {r['window_ms']:>6} ms {r['fair_by_arrival']:>11}% {r['fair_corrected']:>9}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportación de resultados e historial a XLSX o CSV
+
+Genera hojas con las partidas (``data/ratings.jsonl``), los resultados por
+pregunta (``data/outcomes/``) y las preguntas usadas (``data/usadas.csv``).
+Las filas se leen y escriben por tandas: el XLSX se arma con ``zipfile``
+escribiendo cada hoja directo dentro del ZIP, así que la memoria no crece
+con el historial (solo la tabla de textos compartidos, que tiene tope).
+
+Uso:
+    python export.py resultados.xlsx [--kinds matches,outcomes,used] [--days 30]
+    python export.py resultados.csv --kinds outcomes
+"""
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+from xml.sax.saxutils import escape
+
+from outcomes import OUTCOMES_DIR, RESULTS, OutcomeStore
+from ratings import RATINGS_PATH
+
+EXPORT_KINDS = ("matches", "outcomes", "used")
+EXPORT_FORMATS = ("xlsx", "csv")
+SHEET_TITLES = {"matches": "Partidas", "outcomes": "Resultados", "used": "Usadas"}
+RESULT_LABELS = dict(zip(RESULTS, ("correcta", "incorrecta", "tiempo agotado", "cancelada")))
+
+MAX_SHARED_STRINGS = 50000  # Textos distintos que se comparten; los demás van en línea
+MAX_SHARED_LENGTH = 80  # Textos largos (preguntas) casi nunca se repiten
+ROWS_PER_WRITE = 1000
+ZIP_LEVEL = 1  # Compresión rápida: la hoja ya es muy repetitiva
+EXCEL_EPOCH_DAYS = 25569  # 1970-01-01 en la numeración de fechas de Excel
+
+# Caracteres de control que XML 1.0 no admite
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+class Date(float):
+    """Marca de tiempo (``time.time()``) que se escribe como fecha"""
+
+    __slots__ = ()
+
+
+@lru_cache(maxsize=4096)
+def _utc_offset(hour: int) -> float:
+    """Diferencia con UTC de la hora local (una consulta por hora, no por fila)"""
+    local = time.localtime(hour * 3600)
+    return float(local.tm_gmtoff)
+
+
+def excel_serial(ts: float) -> float:
+    """Fecha y hora local en días desde 1899-12-30, como las guarda Excel"""
+    return (ts + _utc_offset(int(ts // 3600))) / 86400 + EXCEL_EPOCH_DAYS
+
+
+def format_date(ts: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+
+
+def _xml_text(text: str) -> str:
+    return escape(_XML_INVALID.sub("", text))
+
+
+# ---------------------
+# Escritor XLSX
+# ---------------------
+
+class XlsxStreamWriter:
+    """Libro XLSX escrito fila por fila
+
+    Cada hoja se escribe completa dentro del ZIP con ``add_sheet`` (una a la
+    vez); el índice de textos compartidos, el libro y sus relaciones se
+    agregan al cerrar.
+    """
+
+    def __init__(self, target):
+        self._zip = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL)
+        self._sheets: List[str] = []
+        self._shared: Dict[str, int] = {}
+        self._shared_refs = 0
+
+    def __enter__(self) -> "XlsxStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._zip.close()
+
+    def _cell(self, value: Any) -> str:
+        """XML de una celda; sin referencia ``r`` porque las celdas van seguidas"""
+        kind = type(value)
+        if kind is int or kind is float:
+            return f"<c><v>{value!r}</v></c>"
+        if kind is Date:
+            return f'<c s="1"><v>{excel_serial(value)!r}</v></c>'
+        if value is None or value == "":
+            return "<c/>"
+        if kind is bool:
+            value = int(value)
+            return f"<c><v>{value}</v></c>"
+        text = str(value)
+        if len(text) <= MAX_SHARED_LENGTH:
+            idx = self._shared.get(text)
+            if idx is None and len(self._shared) < MAX_SHARED_STRINGS:
+                idx = self._shared[text] = len(self._shared)
+            if idx is not None:
+                self._shared_refs += 1
+                return f'<c t="s"><v>{idx}</v></c>'
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{_xml_text(text)}</t></is></c>'
+
+    def add_sheet(self, title: str, header: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+        """Escribe una hoja completa y devuelve cuántas filas de datos tuvo"""
+        number = len(self._sheets) + 1
+        self._sheets.append(title[:31])
+        cell = self._cell
+        count = 0
+        with self._zip.open(f"xl/worksheets/sheet{number}.xml", "w", force_zip64=True) as raw:
+            out = _Utf8Writer(raw)
+            out.write(
+                f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<worksheet xmlns="{MAIN_NS}"><sheetViews><sheetView workbookViewId="0">'
+                f'<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                f'</sheetView></sheetViews><sheetData>'
+            )
+            out.write("<row>" + "".join(map(cell, header)) + "</row>")
+            buffer = []
+            for count, row in enumerate(rows, start=1):
+                buffer.append("<row>")
+                buffer.extend(map(cell, row))
+                buffer.append("</row>")
+                if count % ROWS_PER_WRITE == 0:
+                    out.write("".join(buffer))
+                    buffer.clear()
+            out.write("".join(buffer))
+            out.write("</sheetData></worksheet>")
+        return count
+
+    def close(self):
+        z = self._zip
+        sheets = "".join(
+            f'<sheet name="{_xml_text(title)}" sheetId="{idx}" r:id="rId{idx}"/>'
+            for idx, title in enumerate(self._sheets, start=1)
+        )
+        styles_rel = len(self._sheets) + 1
+        z.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            '<Override PartName="/xl/sharedStrings.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{idx}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for idx in range(1, len(self._sheets) + 1)
+            )
+            + '</Types>'
+        ))
+        z.writestr("_rels/.rels", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{PKG_REL_NS}">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ))
+        z.writestr("xl/workbook.xml", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>{sheets}</sheets></workbook>'
+        ))
+        z.writestr("xl/_rels/workbook.xml.rels", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{PKG_REL_NS}">'
+            + "".join(
+                f'<Relationship Id="rId{idx}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{idx}.xml"/>'
+                for idx in range(1, len(self._sheets) + 1)
+            )
+            + f'<Relationship Id="rId{styles_rel}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/>'
+            f'<Relationship Id="rId{styles_rel + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+            'Target="sharedStrings.xml"/></Relationships>'
+        ))
+        # Estilo 1: fecha y hora (formato integrado 22)
+        z.writestr("xl/styles.xml", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<styleSheet xmlns="{MAIN_NS}">'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+            '</styleSheet>'
+        ))
+        with z.open("xl/sharedStrings.xml", "w") as raw:
+            out = _Utf8Writer(raw)
+            out.write(
+                f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<sst xmlns="{MAIN_NS}" count="{self._shared_refs}" uniqueCount="{len(self._shared)}">'
+            )
+            batch = []
+            for text in self._shared:
+                batch.append(f'<si><t xml:space="preserve">{_xml_text(text)}</t></si>')
+                if len(batch) >= ROWS_PER_WRITE:
+                    out.write("".join(batch))
+                    batch.clear()
+            out.write("".join(batch) + "</sst>")
+        z.close()
+
+
+class _Utf8Writer:
+    """Escribe texto en un flujo binario del ZIP"""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def write(self, text: str):
+        self.raw.write(text.encode("utf-8"))
+
+
+# ---------------------
+# Fuentes de filas
+# ---------------------
+
+MATCH_HEADER = ("fecha", "partida", "equipo", "puntaje", "lugar", "equipos")
+OUTCOME_HEADER = ("fecha", "banco", "idpregunta", "categoria", "valor", "equipo", "resultado", "timbre_ms", "rebotes")
+
+
+def match_rows(path: str = RATINGS_PATH, since: Optional[float] = None) -> Iterator[tuple]:
+    """Una fila por equipo y partida, leyendo el historial línea por línea"""
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        number = 0
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Línea cortada por un cierre inesperado
+            teams, scores = entry.get("teams") or [], entry.get("scores") or []
+            if len(teams) < 2 or len(teams) != len(scores):
+                continue
+            number += 1
+            ts = entry.get("ts") or 0
+            if since and ts < since:
+                continue
+            for team, score in zip(teams, scores):
+                place = 1 + sum(other > score for other in scores)
+                yield (Date(ts), number, team, score, place, len(teams))
+
+
+def outcome_rows(store: OutcomeStore, since: Optional[float] = None, bank: Optional[str] = None) -> Iterator[tuple]:
+    """Intentos por pregunta; equipo de 1 a N y celdas vacías donde se guardó -1"""
+    labels = [RESULT_LABELS[name] for name in RESULTS]
+    for ts, bank_name, qid, category, value, team, result, buzz_ms, rebounds in store.iter_rows(since, bank):
+        yield (
+            Date(ts),
+            bank_name,
+            qid if qid >= 0 else None,
+            category,
+            value,
+            team + 1 if team >= 0 else None,
+            labels[result],
+            buzz_ms if buzz_ms >= 0 else None,
+            rebounds,
+        )
+
+
+def used_rows(path: str = "data/usadas.csv") -> Tuple[List[str], Iterator[list]]:
+    """Encabezado y filas de usadas.csv tal como están en el archivo"""
+    try:
+        f = open(path, encoding="utf-8", newline="")
+    except FileNotFoundError:
+        return [], iter(())
+    reader = csv.reader(f)
+    header = next(reader, [])
+
+    def rows():
+        with f:
+            for row in reader:
+                yield [_numeric(cell) for cell in row]
+
+    return header, rows()
+
+
+def _numeric(text: str) -> Any:
+    """Enteros como número para que la hoja permita ordenar y sumar"""
+    if text.isdigit() and len(text) < 16:
+        return int(text)
+    return text
+
+
+def export_sources(
+    kinds: Sequence[str],
+    outcome_store: Optional[OutcomeStore] = None,
+    ratings_path: str = RATINGS_PATH,
+    used_csv_path: str = "data/usadas.csv",
+    since: Optional[float] = None,
+    bank: Optional[str] = None,
+) -> Iterator[Tuple[str, Sequence[str], Iterable[Sequence[Any]]]]:
+    """(tipo, encabezado, filas) de cada tipo pedido, en orden"""
+    for kind in kinds:
+        if kind == "matches":
+            yield kind, MATCH_HEADER, match_rows(ratings_path, since)
+        elif kind == "outcomes":
+            store = outcome_store if outcome_store is not None else OutcomeStore(OUTCOMES_DIR)
+            yield kind, OUTCOME_HEADER, outcome_rows(store, since, bank)
+        elif kind == "used":
+            header, rows = used_rows(used_csv_path)
+            yield kind, header, rows
+
+
+# ---------------------
+# Exportación
+# ---------------------
+
+def write_csv(out: TextIO, header: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    writer = csv.writer(out)
+    writer.writerow(header)
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([format_date(v) if isinstance(v, Date) else ("" if v is None else v) for v in row])
+    return count
+
+
+def parse_kinds(kinds: Any) -> List[str]:
+    """``"matches,outcomes"`` o lista -> tipos válidos sin repetir (todos si viene vacío)"""
+    if isinstance(kinds, str):
+        kinds = kinds.split(",")
+    selected = [k.strip().lower() for k in (kinds or ()) if k and k.strip()]
+    return list(dict.fromkeys(selected)) or list(EXPORT_KINDS)
+
+
+def export_history(
+    dest: str,
+    kinds: Sequence[str] = EXPORT_KINDS,
+    fmt: str = "xlsx",
+    outcome_store: Optional[OutcomeStore] = None,
+    ratings_path: str = RATINGS_PATH,
+    used_csv_path: str = "data/usadas.csv",
+    since: Optional[float] = None,
+    bank: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Escribe el historial en ``dest``: un libro con una hoja por tipo, o un CSV
+
+    Un CSV solo tiene una tabla, así que en ese formato se pide un único tipo.
+    """
+    started = time.perf_counter()
+    kinds = parse_kinds(kinds)
+    unknown = [k for k in kinds if k not in EXPORT_KINDS]
+    if unknown:
+        return {"error": f"Tipo de exportación desconocido: {', '.join(unknown)}"}
+    if fmt not in EXPORT_FORMATS:
+        return {"error": "Formato no soportado"}
+    if fmt == "csv" and len(kinds) != 1:
+        return {"error": "El CSV se exporta de un tipo a la vez (matches, outcomes o used)"}
+
+    sources = export_sources(kinds, outcome_store, ratings_path, used_csv_path, since, bank)
+    rows: Dict[str, int] = {}
+    if fmt == "csv":
+        # utf-8-sig para que Excel reconozca los acentos al abrirlo
+        with open(dest, "w", encoding="utf-8-sig", newline="") as f:
+            for kind, header, data in sources:
+                rows[kind] = write_csv(f, header, data)
+    else:
+        with XlsxStreamWriter(dest) as book:
+            for kind, header, data in sources:
+                rows[kind] = book.add_sheet(SHEET_TITLES[kind], header, data)
+
+    return {"success": True, "rows": rows, "elapsed": round(time.perf_counter() - started, 3)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Exporta partidas, resultados y preguntas usadas")
+    parser.add_argument("dest", help="Archivo de salida (.xlsx o .csv)")
+    parser.add_argument("--kinds", default="", help="matches,outcomes,used (por omisión todos)")
+    parser.add_argument("--days", type=float, help="Solo los últimos N días")
+    parser.add_argument("--bank", help="Solo resultados de este banco")
+    args = parser.parse_args(argv)
+
+    fmt = Path(args.dest).suffix.lower().lstrip(".")
+    since = time.time() - args.days * 86400 if args.days else None
+    result = export_history(args.dest, parse_kinds(args.kinds), fmt, since=since, bank=args.bank)
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        return 1
+    for kind, count in result["rows"].items():
+        print(f"   {SHEET_TITLES[kind]}: {count} filas")
+    print(f"✅ Exportado a {args.dest} en {result['elapsed']} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,15 +5,28 @@ Lógica del juego - Con soporte para imágenes
 """
 import json
 import csv
+import time
+import re
+import sys
 import random
+import unicodedata
 import hashlib
 import zipfile
+import zlib
+import inspect
+import itertools
+import tempfile
+from array import array
+from collections import deque
+from functools import lru_cache, wraps
 from pathlib import Path
 from xml.etree import ElementTree as ET
-from typing import Dict, List, Set, Tuple, Optional, Any, Iterable
+from typing import Dict, List, Set, Tuple, Optional, Any, Iterable, Callable
 import os
 
 TIME_LIMIT_SECONDS = 10
+MAX_BOARD_CATEGORIES = 20  # Columnas máximas por tablero; bancos más anchos se paginan
+JSON_CHUNK_SIZE = 1 << 16  # Lectura incremental de bancos JSON
 
 # Dataset de respaldo
 SAMPLE_DATA = {
@@ -58,44 +71,324 @@ SAMPLE_DATA = {
 }
 
 
+UNDO_LIMIT = 5000  # Pasos que se pueden deshacer por partida
+_STATE_VERSIONS = itertools.count(1)  # Versiones únicas entre todas las partidas
+_OUTCOME_SEQ = itertools.count(1)  # Orden de los resultados pendientes de enviar
+
+# Códigos de estado por casilla (un byte por casilla en GameState)
+TILE_EMPTY = 0
+TILE_CORRECT = 1
+TILE_USED = 2
+TILE_STATUS_NAMES = ("", "correct", "used")
+
+
+class BoardLayout:
+    """Metadatos internados del tablero: nombres, desplazamientos y claves por casilla"""
+
+    __slots__ = ("names", "offsets", "sizes", "tile_keys", "tile_coords")
+
+    def __init__(self, data: Dict[str, Any]):
+        categories = data.get("categories", []) if isinstance(data, dict) else []
+        sizes = tuple(len(cat.get("clues", [])) for cat in categories)
+        self.names: Tuple[str, ...] = tuple(sys.intern(str(cat.get("name", ""))) for cat in categories)
+        self.sizes: Tuple[int, ...] = sizes
+        self.offsets, self.tile_keys, self.tile_coords = _layout_tables(sizes)
+
+    @property
+    def total(self) -> int:
+        return len(self.tile_keys)
+
+    def index(self, cat_idx: Any, clue_idx: Any) -> Optional[int]:
+        """Devuelve la posición plana de la casilla o None si no existe"""
+        if not isinstance(cat_idx, int) or not isinstance(clue_idx, int):
+            return None
+        if not (0 <= cat_idx < len(self.sizes)) or not (0 <= clue_idx < self.sizes[cat_idx]):
+            return None
+        return self.offsets[cat_idx] + clue_idx
+
+
+@lru_cache(maxsize=64)
+def _layout_tables(sizes: Tuple[int, ...]) -> Tuple[Tuple[int, ...], Tuple[str, ...], Tuple[Tuple[int, int], ...]]:
+    """Tablas compartidas por todos los tableros con la misma forma"""
+    offsets: List[int] = []
+    keys: List[str] = []
+    coords: List[Tuple[int, int]] = []
+    offset = 0
+    for cat_idx, size in enumerate(sizes):
+        offsets.append(offset)
+        for clue_idx in range(size):
+            keys.append(sys.intern(f"{cat_idx},{clue_idx}"))
+            coords.append((cat_idx, clue_idx))
+        offset += size
+    return tuple(offsets), tuple(keys), tuple(coords)
+
+
+def _transition(method):
+    """Guarda el paso para deshacerlo y avisa a ``event_listener`` (si hay)
+
+    Los pasos rechazados (``{"error": ...}``) no entran al historial ni
+    llegan al oyente, y los que no cambian nada tampoco se guardan. El oyente
+    recibe el estado, el nombre del método y sus argumentos (los nombrados ya
+    como posicionales); con eso ``replay.EventRecorder`` graba la partida.
+    """
+    name = method.__name__
+    signature = inspect.signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        before = self._snapshot()
+        result = method(self, *args, **kwargs)
+        if isinstance(result, dict) and "error" in result:
+            return result
+        if not self._matches(before):
+            self._undo.append(before)
+            self._redo.clear()
+            self.version = next(_STATE_VERSIONS)
+        if self.event_listener is not None:
+            if kwargs:
+                args = signature.bind(self, *args, **kwargs).args[1:]
+            self.event_listener(self, name, args)
+        return result
+
+    return wrapper
+
+
 class GameState:
-    """Gestiona el estado completo del juego"""
-    
+    """Gestiona el estado completo del juego
+
+    La representación es compacta para poder mantener muchas salas en memoria:
+    un byte por casilla para su estado, un arreglo de enteros para los puntajes
+    y una máscara de bits para los equipos que ya intentaron.
+    """
+
+    __slots__ = (
+        "_data", "_layout", "_tiles", "_scores", "_tried_mask",
+        "player_count", "current_buzzer", "current_question",
+        "timer_active", "hide_answers", "images_folder",
+        "outcome_listener", "event_listener", "_opened_at", "_buzzed_at",
+        "_undo", "_redo", "version", "_pending_outcomes", "_sent_outcome",
+    )
+
     def __init__(self):
-        self.data = SAMPLE_DATA
+        self.outcome_listener: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.event_listener: Optional[Callable[["GameState", str, tuple], None]] = None
+        self._undo: deque = deque(maxlen=UNDO_LIMIT)
+        self._redo: List[tuple] = []
+        self.version = 0  # Cambia con cada transición (llave del caché de páginas)
+        self._pending_outcomes: tuple = ()  # (secuencia, resultado) aún corregibles con deshacer
+        self._sent_outcome = 0  # Secuencia del último resultado enviado al oyente
+        self._opened_at = 0.0
+        self._buzzed_at = 0.0
         self.player_count = 5
-        self.player_scores = [0] * self.player_count
-        self.used_questions: Set[Tuple[int, int]] = set()
-        self.tile_status: Dict[Tuple[int, int], str] = {}  # 'correct' | 'used'
+        self._scores = array("q", [0] * self.player_count)
+        self._tried_mask = 0
         self.current_buzzer: Optional[int] = None
-        self.tried_players: Set[int] = set()
         self.current_question: Optional[Dict] = None
         self.timer_active = False
         self.hide_answers = False
         self.images_folder = None  # Carpeta donde buscar imágenes
-        
+        self.data = SAMPLE_DATA
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        return self._data
+
+    @data.setter
+    def data(self, value: Dict[str, Any]):
+        """Reemplaza el tablero y reconstruye el arreglo de estados"""
+        self._data = value
+        self._layout = BoardLayout(value)
+        self._tiles = bytearray(self._layout.total)
+        self.clear_history()
+        self.version = next(_STATE_VERSIONS)
+        if self.event_listener is not None:
+            self.event_listener(self, "load", (value,))
+
+    @property
+    def player_scores(self) -> List[int]:
+        """Puntajes como lista (serializable a JSON)"""
+        return self._scores.tolist()
+
+    @property
+    def tried_players(self) -> Set[int]:
+        return {i for i in range(self.player_count) if self._tried_mask >> i & 1}
+
+    @property
+    def used_questions(self) -> Set[Tuple[int, int]]:
+        coords = self._layout.tile_coords
+        return {coords[i] for i, code in enumerate(self._tiles) if code}
+
+    @property
+    def tile_status(self) -> Dict[Tuple[int, int], str]:
+        coords = self._layout.tile_coords
+        return {coords[i]: TILE_STATUS_NAMES[code] for i, code in enumerate(self._tiles) if code}
+
+    def tile_state(self, cat_idx: Any, clue_idx: Any) -> str:
+        """Estado de una casilla: "", "correct" o "used" """
+        idx = self._layout.index(cat_idx, clue_idx)
+        return "" if idx is None else TILE_STATUS_NAMES[self._tiles[idx]]
+
+    def fingerprint(self) -> int:
+        """Resumen del estado jugable (casillas, puntajes, turno y pregunta abierta)"""
+        question = self.current_question
+        extra = (
+            f"{self.player_count},{self.current_buzzer},{self._tried_mask},"
+            f"{question['cat_idx'] if question else ''},{question['clue_idx'] if question else ''}"
+        )
+        return zlib.crc32(extra.encode(), zlib.crc32(self._scores.tobytes(), zlib.crc32(self._tiles)))
+
+    # ---------------------
+    # Deshacer / rehacer
+    # ---------------------
+
+    def _snapshot(self) -> tuple:
+        """Estado jugable como tupla inmutable
+
+        Tablero, distribución y pregunta abierta se comparten por referencia
+        (nunca se modifican en su lugar), y las casillas y los puntajes
+        reutilizan los objetos del paso anterior si no cambiaron. Un paso que
+        cierra una casilla sí copia las casillas completas (un byte por
+        casilla); con tableros de este tamaño no vale la pena compartirlas
+        por partes.
+        """
+        prev = self._undo[-1] if self._undo else None
+        tiles = prev[2] if prev is not None and prev[2] == self._tiles else bytes(self._tiles)
+        scores = prev[3] if prev is not None and prev[3] == self._scores else array("q", self._scores)
+        return (
+            self._data, self._layout, tiles, scores, self.player_count, self._tried_mask,
+            self.current_buzzer, self.current_question, self.timer_active, self._opened_at, self._buzzed_at,
+            self._pending_outcomes,
+        )
+
+    def _matches(self, snap: tuple) -> bool:
+        """True si el estado actual es igual al de ``snap`` (paso sin efecto)"""
+        return (
+            snap[0] is self._data and snap[2] == self._tiles and snap[3] == self._scores
+            and snap[4] == self.player_count and snap[5] == self._tried_mask
+            and snap[6] == self.current_buzzer and snap[7] is self.current_question
+            and snap[8] == self.timer_active and snap[11] is self._pending_outcomes
+        )
+
+    def _restore(self, snap: tuple):
+        (self._data, self._layout, tiles, scores, self.player_count, self._tried_mask,
+         self.current_buzzer, self.current_question, self.timer_active, self._opened_at, self._buzzed_at,
+         pending) = snap
+        self._tiles = bytearray(tiles)
+        self._scores = array("q", scores)
+        # Lo ya enviado no se puede retirar: no se vuelve a mandar
+        self._pending_outcomes = tuple(item for item in pending if item[0] > self._sent_outcome)
+
+    def clear_history(self):
+        self.flush_outcomes()
+        self._undo.clear()
+        self._redo.clear()
+
+    def history_info(self) -> Dict[str, int]:
+        return {"undo_steps": len(self._undo), "redo_steps": len(self._redo)}
+
+    def undo(self) -> Dict:
+        """Regresa al estado anterior a la última acción (casillas incluidas)"""
+        if not self._undo:
+            return {"error": "No hay acciones para deshacer"}
+        current = self._snapshot()
+        self._restore(self._undo.pop())
+        self._redo.append(current)
+        self.version = next(_STATE_VERSIONS)
+        if self.event_listener is not None:
+            self.event_listener(self, "undo", ())
+        return {"success": True, **self.history_info()}
+
+    def redo(self) -> Dict:
+        """Vuelve a aplicar la última acción deshecha"""
+        if not self._redo:
+            return {"error": "No hay acciones para rehacer"}
+        current = self._snapshot()
+        self._restore(self._redo.pop())
+        self._undo.append(current)
+        self.version = next(_STATE_VERSIONS)
+        if self.event_listener is not None:
+            self.event_listener(self, "redo", ())
+        return {"success": True, **self.history_info()}
+
+    def _tried_list(self) -> List[int]:
+        mask = self._tried_mask
+        return [i for i in range(self.player_count) if mask >> i & 1]
+
+    def _remaining_players(self) -> List[int]:
+        mask = self._tried_mask
+        return [i for i in range(self.player_count) if not mask >> i & 1]
+
+    def _notify_outcome(self, result: str, player_idx: Optional[int]):
+        """Guarda el resultado de un intento para el oyente (si hay)
+
+        Los resultados de la última pregunta quedan pendientes, como parte
+        del estado que se deshace: si el moderador corrige un fallo, el
+        intento deshecho nunca llega al oyente. Se envían al abrir la
+        siguiente pregunta, al reiniciar o al cargar otro tablero
+        (``flush_outcomes``).
+        """
+        if self.outcome_listener is None or self.current_question is None:
+            return
+        buzz_ms = -1
+        if player_idx is not None and self._buzzed_at:
+            buzz_ms = int((self._buzzed_at - self._opened_at) * 1000)
+        outcome = {
+            "question_id": self.current_question.get("idpregunta"),
+            "category": self.current_question["category"],
+            "value": self.current_question["value"],
+            "team": -1 if player_idx is None else player_idx,
+            "result": result,
+            "buzz_ms": buzz_ms,
+            "rebounds": bin(self._tried_mask).count("1"),
+        }
+        self._pending_outcomes = self._pending_outcomes + ((next(_OUTCOME_SEQ), outcome),)
+
+    def flush_outcomes(self):
+        """Envía al oyente los resultados pendientes; ya no se pueden deshacer"""
+        pending, self._pending_outcomes = self._pending_outcomes, ()
+        if not pending:
+            return
+        self._sent_outcome = pending[-1][0]
+        if self.outcome_listener is not None:
+            for _, outcome in pending:
+                self.outcome_listener(outcome)
+
+    def _close_tile(self, code: int):
+        """Marca la casilla de la pregunta actual con el código indicado"""
+        idx = self._layout.index(self.current_question["cat_idx"], self.current_question["clue_idx"])
+        if idx is not None:
+            self._tiles[idx] = code
+
+    @_transition
     def reset_game(self):
         """Reinicia el juego completo"""
-        self.player_scores = [0] * self.player_count
-        self.used_questions.clear()
-        self.tile_status.clear()
+        self.flush_outcomes()
+        self._scores = array("q", [0] * self.player_count)
+        self._tiles = bytearray(self._layout.total)
         self.current_buzzer = None
-        self.tried_players.clear()
+        self._tried_mask = 0
         self.current_question = None
         self.timer_active = False
         
+    @_transition
     def open_question(self, cat_idx: int, clue_idx: int) -> Dict:
         """Abre una pregunta del tablero"""
-        if (cat_idx, clue_idx) in self.used_questions:
+        idx = self._layout.index(cat_idx, clue_idx)
+        if idx is None:
+            return {"error": "Casilla inválida"}
+
+        if self._tiles[idx]:
             return {"error": "Pregunta ya usada"}
-            
+
+        self.flush_outcomes()  # La pregunta anterior ya no se corrige
         cat = self.data["categories"][cat_idx]
         clue = cat["clues"][clue_idx]
         
         self.current_question = {
+            "idpregunta": clue.get("idpregunta"),
             "cat_idx": cat_idx,
             "clue_idx": clue_idx,
-            "category": cat["name"],
+            "category": self._layout.names[cat_idx],
             "value": clue["value"],
             "question": clue["question"],
             "choices": clue["choices"],
@@ -105,17 +398,25 @@ class GameState:
         # Agregar información de imagen si existe
         if "image" in clue and clue["image"]:
             image_name = clue["image"]
-            # Construir ruta relativa para el cliente
-            if self.images_folder:
+            # Construir ruta relativa para el cliente (con varios bancos, la carpeta del banco de la pista)
+            image_folder = clue.get("image_folder") or self.images_folder
+            if image_folder:
                 self.current_question["image"] = image_name
-                self.current_question["image_folder"] = self.images_folder
+                self.current_question["image_folder"] = image_folder
         
-        self.tried_players.clear()
+        self._tried_mask = 0
+        self._opened_at = time.monotonic()
+        self._buzzed_at = 0.0
         
         return self.current_question
         
-    def buzzer_press(self, player_idx: int) -> Dict:
-        """Un jugador presiona su buzzer"""
+    @_transition
+    def buzzer_press(self, player_idx: int, pressed_at: Optional[float] = None) -> Dict:
+        """Un jugador presiona su buzzer
+
+        ``pressed_at`` es la llegada (``time.monotonic``) cuando el timbre se
+        recibió antes de procesarse, como en las cajas de ``buzzgate``.
+        """
         if self.current_question is None:
             return {"error": "No hay pregunta activa"}
 
@@ -125,11 +426,12 @@ class GameState:
         if self.current_buzzer is not None:
             return {"error": "Ya hay un jugador respondiendo"}
             
-        if player_idx in self.tried_players:
+        if self._tried_mask >> player_idx & 1:
             return {"error": "Este jugador ya intentó"}
             
         self.current_buzzer = player_idx
         self.timer_active = True
+        self._buzzed_at = time.monotonic() if pressed_at is None else pressed_at
         
         return {
             "success": True,
@@ -137,6 +439,7 @@ class GameState:
             "message": f"Equipo {player_idx + 1} tiene el turno"
         }
         
+    @_transition
     def submit_answer(self, player_idx: int, answer_idx: int) -> Dict:
         """Procesa una respuesta del jugador"""
         if self.current_question is None:
@@ -154,9 +457,6 @@ class GameState:
         except (ValueError, TypeError):
             answer_idx = -1
             
-        cat_idx = self.current_question["cat_idx"]
-        clue_idx = self.current_question["clue_idx"]
-        value = self.current_question["value"]
         correct_answer = int(self.current_question["answer"])
         
         print(f"🔍 Comparando respuestas:")
@@ -167,56 +467,62 @@ class GameState:
         print(f"   ¿Es correcta? {is_correct}")
         
         if is_correct:
-            # Respuesta correcta
-            self.player_scores[player_idx] += value
-            self.used_questions.add((cat_idx, clue_idx))
-            self.tile_status[(cat_idx, clue_idx)] = 'correct'
-            self.current_question = None
-            self.current_buzzer = None
-            self.tried_players.clear()
-            self.timer_active = False
-            
+            return self._mark_correct(player_idx)
+        return self._mark_incorrect(player_idx)
+
+    def _mark_correct(self, player_idx: int) -> Dict:
+        """Suma el valor de la pregunta y la cierra"""
+        self._notify_outcome("correct", player_idx)
+        self._scores[player_idx] += self.current_question["value"]
+        self._close_tile(TILE_CORRECT)
+        self.current_question = None
+        self.current_buzzer = None
+        self._tried_mask = 0
+        self.timer_active = False
+
+        return {
+            "result": "correct",
+            "player": player_idx,
+            "new_score": self._scores[player_idx],
+            "close_question": True
+        }
+
+    def _mark_incorrect(self, player_idx: int, outcome: str = "incorrect") -> Dict:
+        """Resta el valor de la pregunta y habilita el rebote si quedan equipos"""
+        self._notify_outcome(outcome, player_idx)
+        self._scores[player_idx] -= self.current_question["value"]
+        self._tried_mask |= 1 << player_idx
+        self.current_buzzer = None
+        self.timer_active = False
+
+        # ¿Quedan jugadores?
+        remaining = self._remaining_players()
+
+        if remaining:
+            # Rebote
             return {
-                "result": "correct",
+                "result": "incorrect",
                 "player": player_idx,
-                "new_score": self.player_scores[player_idx],
-                "close_question": True
+                "new_score": self._scores[player_idx],
+                "close_question": False,
+                "rebote": True,
+                "remaining_players": remaining
             }
-        else:
-            # Respuesta incorrecta
-            self.player_scores[player_idx] -= value
-            self.tried_players.add(player_idx)
-            self.current_buzzer = None
-            self.timer_active = False
-            
-            # ¿Quedan jugadores?
-            remaining = [i for i in range(self.player_count) if i not in self.tried_players]
-            
-            if remaining:
-                # Rebote
-                return {
-                    "result": "incorrect",
-                    "player": player_idx,
-                    "new_score": self.player_scores[player_idx],
-                    "close_question": False,
-                    "rebote": True,
-                    "remaining_players": remaining
-                }
-            else:
-                # Sin intentos restantes
-                self.used_questions.add((cat_idx, clue_idx))
-                self.tile_status[(cat_idx, clue_idx)] = 'used'
-                self.current_question = None
-                self.tried_players.clear()
-                
-                return {
-                    "result": "incorrect",
-                    "player": player_idx,
-                    "new_score": self.player_scores[player_idx],
-                    "close_question": True,
-                    "rebote": False
-                }
+
+        # Sin intentos restantes
+        self._close_tile(TILE_USED)
+        self.current_question = None
+        self._tried_mask = 0
+
+        return {
+            "result": "incorrect",
+            "player": player_idx,
+            "new_score": self._scores[player_idx],
+            "close_question": True,
+            "rebote": False
+        }
                 
+    @_transition
     def moderator_correct(self, player_idx: int) -> Dict:
         """Moderador marca como correcta (modo respuestas ocultas)"""
         if self.current_question is None:
@@ -228,25 +534,9 @@ class GameState:
         if self.current_buzzer != player_idx:
             return {"error": "No es el turno de este jugador"}
             
-        cat_idx = self.current_question["cat_idx"]
-        clue_idx = self.current_question["clue_idx"]
-        value = self.current_question["value"]
-        
-        self.player_scores[player_idx] += value
-        self.used_questions.add((cat_idx, clue_idx))
-        self.tile_status[(cat_idx, clue_idx)] = 'correct'
-        self.current_question = None
-        self.current_buzzer = None
-        self.tried_players.clear()
-        self.timer_active = False
-        
-        return {
-            "result": "correct",
-            "player": player_idx,
-            "new_score": self.player_scores[player_idx],
-            "close_question": True
-        }
+        return self._mark_correct(player_idx)
         
+    @_transition
     def moderator_incorrect(self, player_idx: int) -> Dict:
         """Moderador marca como incorrecta (modo respuestas ocultas)"""
         if self.current_question is None:
@@ -258,94 +548,111 @@ class GameState:
         if self.current_buzzer != player_idx:
             return {"error": "No es el turno de este jugador"}
             
-        cat_idx = self.current_question["cat_idx"]
-        clue_idx = self.current_question["clue_idx"]
-        value = self.current_question["value"]
-        
-        self.player_scores[player_idx] -= value
-        self.tried_players.add(player_idx)
-        self.current_buzzer = None
-        self.timer_active = False
-        
-        remaining = [i for i in range(self.player_count) if i not in self.tried_players]
-        
-        if remaining:
-            return {
-                "result": "incorrect",
-                "player": player_idx,
-                "new_score": self.player_scores[player_idx],
-                "close_question": False,
-                "rebote": True,
-                "remaining_players": remaining
-            }
-        else:
-            self.used_questions.add((cat_idx, clue_idx))
-            self.tile_status[(cat_idx, clue_idx)] = 'used'
-            self.current_question = None
-            self.tried_players.clear()
-            
-            return {
-                "result": "incorrect",
-                "player": player_idx,
-                "new_score": self.player_scores[player_idx],
-                "close_question": True,
-                "rebote": False
-            }
+        return self._mark_incorrect(player_idx)
     
+    @_transition
+    def replace_clue(self, cat_idx: int, clue_idx: int, clue: Dict[str, Any]) -> Dict:
+        """Cambia la pregunta de una casilla sin tocar el resto del tablero
+
+        Copia solo la categoría afectada para no alterar tableros compartidos
+        (por ejemplo, las partidas de un torneo).
+        """
+        idx = self._layout.index(cat_idx, clue_idx)
+        if idx is None:
+            return {"error": "Casilla inválida"}
+        if self._tiles[idx]:
+            return {"error": "Pregunta ya usada"}
+        if self.current_question is not None and (
+            self.current_question["cat_idx"], self.current_question["clue_idx"]
+        ) == (cat_idx, clue_idx):
+            return {"error": "La pregunta está abierta"}
+
+        categories = list(self._data["categories"])
+        category = dict(categories[cat_idx])
+        clues = list(category["clues"])
+        clues[clue_idx] = clue
+        category["clues"] = clues
+        categories[cat_idx] = category
+        self._data = {**self._data, "categories": categories}
+
+        return {"success": True, "cat_idx": cat_idx, "clue_idx": clue_idx, "clue": clue}
+
+    @_transition
     def cancel_question(self) -> Dict:
         """Cancela la pregunta actual sin afectar puntajes"""
         if self.current_question is None:
             return {"error": "No hay pregunta activa"}
             
+        self._notify_outcome("skipped", None)
         self.current_question = None
         self.current_buzzer = None
-        self.tried_players.clear()
+        self._tried_mask = 0
         self.timer_active = False
         
         return {"success": True, "message": "Pregunta cancelada"}
         
+    @_transition
     def timeout(self) -> Dict:
         """Procesa un timeout (tiempo agotado)"""
-        if self.current_buzzer is not None:
-            return self.submit_answer(self.current_buzzer, -1)  # Respuesta inválida
+        if self.current_buzzer is not None and self.current_question is not None:
+            return self._mark_incorrect(self.current_buzzer, outcome="timeout")
         return {"error": "No hay jugador activo"}
         
+    @_transition
     def adjust_score(self, player_idx: int, delta: int):
         """Ajusta el puntaje de un jugador manualmente"""
-        if 0 <= player_idx < self.player_count:
-            self.player_scores[player_idx] += delta
-            return {"success": True, "new_score": self.player_scores[player_idx]}
+        if isinstance(player_idx, int) and 0 <= player_idx < self.player_count:
+            try:
+                self._scores[player_idx] += int(delta)
+            except (TypeError, ValueError, OverflowError):
+                return {"error": "Puntaje inválido"}
+            return {"success": True, "new_score": self._scores[player_idx]}
         return {"error": "Índice de jugador inválido"}
 
+    @_transition
     def set_score(self, player_idx: int, score: int):
         """Establece el puntaje de un jugador directamente"""
-        if 0 <= player_idx < self.player_count:
-            self.player_scores[player_idx] = score
-            return {"success": True, "new_score": self.player_scores[player_idx]}
+        if isinstance(player_idx, int) and 0 <= player_idx < self.player_count:
+            try:
+                self._scores[player_idx] = int(score)
+            except (TypeError, ValueError, OverflowError):
+                return {"error": "Puntaje inválido"}
+            return {"success": True, "new_score": self._scores[player_idx]}
         return {"error": "Índice de jugador inválido"}
         
     def get_board_state(self) -> Dict:
         """Obtiene el estado actual del tablero"""
+        coords = self._layout.tile_coords
+        keys = self._layout.tile_keys
+        used: List[Tuple[int, int]] = []
+        tile_status: Dict[str, str] = {}
+        if any(self._tiles):
+            for i, code in enumerate(self._tiles):
+                if code:
+                    used.append(coords[i])
+                    tile_status[keys[i]] = TILE_STATUS_NAMES[code]
         return {
             "categories": self.data["categories"],
-            "used": list(self.used_questions),
-            "tile_status": {f"{k[0]},{k[1]}": v for k, v in self.tile_status.items()},
-            "scores": self.player_scores,
-            "player_count": self.player_count
+            "used": used,
+            "tile_status": tile_status,
+            "scores": self._scores.tolist(),
+            "player_count": self.player_count,
+            "version": self.version
         }
 
     def get_game_state(self) -> Dict:
         """Obtiene el estado completo del juego"""
         return {
-            "scores": self.player_scores,
+            "scores": self._scores.tolist(),
             "current_buzzer": self.current_buzzer,
-            "tried_players": list(self.tried_players),
+            "tried_players": self._tried_list(),
             "timer_active": self.timer_active,
             "hide_answers": self.hide_answers,
             "has_question": self.current_question is not None,
             "player_count": self.player_count
         }
 
+    @_transition
     def set_player_count(self, count: int) -> Dict:
         """Configura la cantidad de equipos permitidos"""
         try:
@@ -355,46 +662,84 @@ class GameState:
 
         count = max(2, min(10, count))
 
-        if count == self.player_count:
-            return {
-                "success": True,
-                "player_count": self.player_count,
-                "scores": self.player_scores,
-                "current_buzzer": self.current_buzzer,
-                "tried_players": list(self.tried_players),
-                "timer_active": self.timer_active
-            }
-
-        # Ajustar puntajes existentes
-        if count > self.player_count:
-            self.player_scores.extend([0] * (count - self.player_count))
-        else:
-            self.player_scores = self.player_scores[:count]
+        if count != self.player_count:
+            # Ajustar puntajes existentes
+            if count > self.player_count:
+                self._scores.extend([0] * (count - self.player_count))
+            else:
+                del self._scores[count:]
 
-        self.player_count = count
+            self.player_count = count
 
-        # Limpiar estados que referencian jugadores eliminados
-        self.tried_players = {i for i in self.tried_players if i < count}
-        if self.current_buzzer is not None and self.current_buzzer >= count:
-            self.current_buzzer = None
-            self.timer_active = False
+            # Limpiar estados que referencian jugadores eliminados
+            self._tried_mask &= (1 << count) - 1
+            if self.current_buzzer is not None and self.current_buzzer >= count:
+                self.current_buzzer = None
+                self.timer_active = False
 
         return {
             "success": True,
             "player_count": self.player_count,
-            "scores": self.player_scores,
+            "scores": self._scores.tolist(),
             "current_buzzer": self.current_buzzer,
-            "tried_players": list(self.tried_players),
+            "tried_players": self._tried_list(),
             "timer_active": self.timer_active
         }
 
 
 # Funciones de carga de datos (reutilizadas del código original)
 
-def load_data(path: str = "data/questions.json") -> Dict[str, Any]:
-    """Carga datos desde JSON"""
+def load_data(
+    path: str = "data/questions.json",
+    used_csv_path: str = "data/usadas.csv",
+    **board_options,
+) -> Dict[str, Any]:
+    """Carga un tablero JSON, o un banco JSON con el mismo sorteo que un CSV
+
+    Un tablero ya armado (``{"categories": [{"name", "clues"}]}``) se carga tal
+    cual: mismas columnas, valores y orden, sin tocar usadas.csv. Las
+    preguntas planas (``[{...}]`` o ``{"questions": [...]}``, con las mismas
+    columnas que el CSV) se sortean; ver ``_iter_json_rows``.
+    """
+    if is_board_json(path):
+        return load_board_json(path)
+    return load_from_csv_sampled(path, used_csv_path=used_csv_path, **board_options)
+
+
+def is_board_json(path: str) -> bool:
+    """True si el JSON es un tablero ya armado y no un banco de preguntas
+
+    Solo se lee hasta la primera categoría, así que un banco grande no se
+    recorre completo.
+    """
     try:
-        with open(path, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            stream = _JsonStream(f)
+            if stream.peek() != "{":
+                return False
+            stream.pos += 1
+            while stream.peek() not in ("}", ""):
+                key = str(stream.value()).lower()
+                stream.expect(":")
+                if key in JSON_LIST_KEYS and stream.peek() == "[":
+                    first = next(iter(stream.array_items()), None)
+                    return (
+                        key == "categories"
+                        and isinstance(first, dict)
+                        and any(isinstance(first.get(k), list) for k in JSON_CLUE_KEYS)
+                    )
+                stream.value()
+                if stream.peek() == ",":
+                    stream.pos += 1
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+def load_board_json(path: str) -> Dict[str, Any]:
+    """Carga un tablero JSON tal como está escrito"""
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
             data = json.load(f)
         if not isinstance(data, dict) or "categories" not in data:
             return SAMPLE_DATA
@@ -403,12 +748,19 @@ def load_data(path: str = "data/questions.json") -> Dict[str, Any]:
         return SAMPLE_DATA
 
 
-def _read_used_ids(used_csv_path: str) -> Set[int]:
-    """Lee usadas.csv y devuelve conjunto de IDs ya utilizados"""
-    used = set()
+USED_FIELDS = ["idpregunta", "category", "value", "question", "choice_a", "choice_b", "choice_c", "choice_d", "answer", "image", "banco"]
+
+
+def _read_used_ledger(used_csv_path: str) -> Dict[str, Set[int]]:
+    """Lee usadas.csv y devuelve los IDs ya utilizados de cada banco
+
+    La clave es la columna ``banco``; las filas sin banco (anteriores a la
+    columna) quedan en ``""`` y cuentan para cualquier banco.
+    """
+    ledger: Dict[str, Set[int]] = {}
     p = Path(used_csv_path)
     if not p.exists():
-        return used
+        return ledger
     try:
         with p.open("r", encoding="utf-8", newline="") as f:
             r = csv.DictReader(f)
@@ -416,27 +768,61 @@ def _read_used_ids(used_csv_path: str) -> Set[int]:
                 raw = (row.get("idpregunta") or row.get("id") or "").strip()
                 if raw:
                     try:
-                        used.add(int(raw))
+                        ledger.setdefault((row.get("banco") or "").strip(), set()).add(int(raw))
                     except ValueError:
                         pass
     except Exception:
         pass
-    return used
+    return ledger
+
+
+def _read_used_ids(used_csv_path: str, bank_name: Optional[str] = None) -> Set[int]:
+    """IDs ya utilizados del banco ``bank_name`` (de todos los bancos si es None)"""
+    ledger = _read_used_ledger(used_csv_path)
+    if bank_name is None:
+        return set().union(*ledger.values())
+    return ledger.get("", set()) | ledger.get(bank_name, set())
+
+
+def _upgrade_used_header(p: Path):
+    """Agrega la columna ``banco`` a un usadas.csv anterior a ella"""
+    with p.open("r", encoding="utf-8", newline="") as f:
+        rows = [row for row in csv.reader(f) if row]
+    if not rows or "banco" in rows[0]:
+        return
+    for row in rows:
+        row.append("")
+    rows[0][-1] = "banco"
+    fd, tmp = tempfile.mkstemp(dir=p.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerows(rows)
+        os.replace(tmp, p)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
 
 
 def _append_used_rows(used_csv_path: str, rows: List[dict]):
-    """Anexa filas a usadas.csv"""
+    """Anexa filas a usadas.csv
+
+    Cada fila guarda el id de la pregunta en su archivo (``bank_id`` si la
+    pregunta viene de un tablero combinado) y el nombre de su banco
+    (``bank``), así un banco cargado solo o combinado ve las mismas usadas.
+    """
     p = Path(used_csv_path)
     exists = p.exists()
     try:
+        if exists:
+            _upgrade_used_header(p)
         with p.open("a", encoding="utf-8", newline="") as f:
-            fieldnames = ["idpregunta", "category", "value", "question", "choice_a", "choice_b", "choice_c", "choice_d", "answer", "image"]
-            w = csv.DictWriter(f, fieldnames=fieldnames)
+            w = csv.DictWriter(f, fieldnames=USED_FIELDS)
             if not exists:
                 w.writeheader()
             for row in rows:
                 w.writerow({
-                    "idpregunta": row.get("idpregunta"),
+                    "idpregunta": row.get("bank_id", row.get("idpregunta")),
                     "category": row.get("category", ""),
                     "value": row.get("value", 0),
                     "question": row.get("question", ""),
@@ -446,6 +832,7 @@ def _append_used_rows(used_csv_path: str, rows: List[dict]):
                     "choice_d": (row.get("choices", ["", "", "", ""])[3] if "choices" in row else row.get("choice_d", "")),
                     "answer": row.get("answer", 0),
                     "image": row.get("image", ""),
+                    "banco": row.get("bank") or "",
                 })
     except Exception as e:
         print(f"Error guardando en usadas.csv: {e}")
@@ -455,87 +842,173 @@ def load_from_csv_sampled(
     path: str,
     used_csv_path: str = "data/usadas.csv",
     values_per_category=(100, 200, 300, 400, 500),
-    rng_seed: Optional[int] = None
+    rng_seed: Optional[int] = None,
+    max_categories: Optional[int] = None,
+    include_categories: Optional[Iterable[str]] = None,
+    exclude_categories: Optional[Iterable[str]] = None,
+    category_weights: Optional[Dict[str, float]] = None,
+    page: int = 0,
+    page_size: int = MAX_BOARD_CATEGORIES,
+    question_weights: Optional[Dict[int, float]] = None,
+    selection_seed: Optional[int] = None,
+    bank_name: Optional[str] = None,
 ) -> dict:
-    """Carga CSV con muestreo aleatorio excluyendo usadas y soporte para imágenes"""
-    if rng_seed is not None:
-        random.seed(rng_seed)
-
-    used_ids = _read_used_ids(used_csv_path)
+    """Carga CSV con muestreo aleatorio excluyendo usadas y soporte para imágenes
+
+    El banco se lee desde su versión compilada (``bank_compiled``), así que
+    solo se decodifican las preguntas que quedan en el tablero. Si el banco
+    tiene muchas categorías se eligen ``max_categories`` (al azar o
+    ponderadas con ``category_weights``), respetando las listas de inclusión y
+    exclusión. Las categorías resultantes se reparten en páginas de
+    ``page_size`` columnas y solo se arma el tablero de ``page``.
+    """
+    # Importación local: bank_compiled usa load_bank de este módulo
+    from bank_compiled import open_compiled_bank
+
+    bank = open_compiled_bank(path)
+    if bank is None:
+        return SAMPLE_DATA
 
+    with bank:
+        return build_sampled_board(
+            bank,
+            used_csv_path=used_csv_path,
+            values_per_category=values_per_category,
+            rng_seed=rng_seed,
+            max_categories=max_categories,
+            include_categories=include_categories,
+            exclude_categories=exclude_categories,
+            category_weights=category_weights,
+            page=page,
+            page_size=page_size,
+            question_weights=question_weights,
+            selection_seed=selection_seed,
+            bank_name=bank_name or Path(path).stem,
+        )
+
+
+def load_bank(path: str) -> Optional[List[Dict[str, Any]]]:
+    """Lee y normaliza todas las preguntas válidas del banco (None si no se puede leer)"""
     try:
         rows = list(_read_question_rows(path))
     except UnicodeDecodeError as e:
-        print(f"Error leyendo CSV: {e}")
-        return SAMPLE_DATA
+        print(f"Error leyendo banco: {e}")
+        return None
     except FileNotFoundError:
         raise
     except Exception as e:
-        print(f"Error leyendo CSV: {e}")
-        return SAMPLE_DATA
-
-    bucket: Dict[Tuple[str, int], List[dict]] = {}
+        print(f"Error leyendo banco: {e}")
+        return None
 
+    questions = []
     for raw_row in rows:
-        try:
-            qid = int(str(raw_row.get("idpregunta", "")).strip())
-        except ValueError:
-            continue
+        parsed = parse_question_row(raw_row)
+        if parsed is not None:
+            questions.append(parsed)
+    return questions
 
-        cat = (raw_row.get("category") or "General").strip()
-        try:
-            val = int(float(str(raw_row.get("value", "0")).strip() or "0"))
-        except ValueError:
-            continue
 
-        question = (raw_row.get("question") or "").strip()
-        choices = [
-            (raw_row.get("choice_a") or "").strip(),
-            (raw_row.get("choice_b") or "").strip(),
-            (raw_row.get("choice_c") or "").strip(),
-            (raw_row.get("choice_d") or "").strip(),
-        ]
-
-        ans_raw = str(raw_row.get("answer", "")).strip().lower()
-        if ans_raw in ("a", "b", "c", "d"):
-            answer = "abcd".index(ans_raw)
-        else:
-            try:
-                answer = int(ans_raw)
-            except Exception:
-                answer = 0
-
-        # Leer información de imagen
-        image = (raw_row.get("image") or "").strip()
-        nombre_imagen = (raw_row.get("nombre_imagen") or "").strip()
-
-        bucket.setdefault((cat, val), []).append({
-            "idpregunta": qid,
-            "category": cat,
-            "value": val,
-            "question": question,
-            "choices": choices,
-            "answer": answer,
-            "image": nombre_imagen if image.lower() == "si" else "",
-        })
+class QuestionBuckets:
+    """Preguntas en memoria agrupadas por (categoría, valor)
+
+    Misma interfaz que ``bank_compiled.CompiledBank`` para que
+    ``build_sampled_board`` acepte cualquiera de los dos.
+    """
+
+    def __init__(self, questions: List[Dict[str, Any]]):
+        self._buckets: Dict[Tuple[str, int], List[dict]] = {}
+        for parsed in questions:
+            self._buckets.setdefault((parsed["category"], parsed["value"]), []).append(parsed)
+
+    def categories(self) -> List[str]:
+        return sorted({cat for (cat, _) in self._buckets})
+
+    def bucket_ids(self, category: str, value: int) -> List[int]:
+        return [q["idpregunta"] for q in self._buckets.get((category, value), ())]
+
+    def row(self, category: str, value: int, pos: int) -> Dict[str, Any]:
+        return self._buckets[(category, value)][pos]
+
+
+def build_sampled_board(
+    questions,
+    used_csv_path: str = "data/usadas.csv",
+    values_per_category=(100, 200, 300, 400, 500),
+    rng_seed: Optional[int] = None,
+    max_categories: Optional[int] = None,
+    include_categories: Optional[Iterable[str]] = None,
+    exclude_categories: Optional[Iterable[str]] = None,
+    category_weights: Optional[Dict[str, float]] = None,
+    page: int = 0,
+    page_size: int = MAX_BOARD_CATEGORIES,
+    question_weights: Optional[Dict[int, float]] = None,
+    selection_seed: Optional[int] = None,
+    bank_name: Optional[str] = None,
+) -> dict:
+    """Arma un tablero sorteando preguntas no usadas y las registra en usadas.csv
+
+    ``questions`` es una lista de preguntas normalizadas o un banco con la
+    interfaz de ``QuestionBuckets`` (p. ej. un ``CompiledBank``); solo se
+    leen completas las preguntas elegidas; si el banco ofrece
+    ``pick_weights`` (``bank_merge.MergedBank``) el sorteo de cada casilla
+    usa esos pesos. ``question_weights`` (idpregunta -> peso, 1 por
+    omisión) sesga el sorteo entre las preguntas no usadas, p. ej. con
+    ``OutcomeStore.sampler_weights``.
+
+    Las categorías se eligen con ``selection_seed`` (o ``rng_seed``): con la
+    misma semilla cada ``page`` sale de la misma selección, así que las
+    páginas no se enciman. El tablero paginado trae la semilla usada.
+
+    Las usadas son las de ``bank_name`` en usadas.csv (las de todos los
+    bancos si es None); un banco que ofrece ``used_ids`` las elige él mismo.
+    """
+    rng = random.Random(rng_seed)
+    if selection_seed is None:
+        selection_seed = rng_seed if rng_seed is not None else random.getrandbits(32)
+
+    bank = questions if hasattr(questions, "bucket_ids") else QuestionBuckets(questions)
+
+    if hasattr(bank, "used_ids"):
+        used_ids = bank.used_ids(_read_used_ledger(used_csv_path))
+    else:
+        used_ids = _read_used_ids(used_csv_path, bank_name)
 
     categories = {}
-    cats_in_csv = sorted({cat for (cat, _) in bucket.keys()})
+    cats_in_csv = bank.categories()
     used_rows_to_append = []
 
     if not cats_in_csv:
         raise ValueError("El archivo no contiene preguntas válidas")
 
-    for cat in cats_in_csv:
+    selected = select_categories(
+        cats_in_csv,
+        k=max_categories,
+        include=include_categories,
+        exclude=exclude_categories,
+        weights=category_weights,
+        rng=random.Random(selection_seed),
+    )
+    if not selected:
+        raise ValueError("Ninguna categoría coincide con la selección")
+
+    pages = paginate_categories(selected, page_size)
+    page = max(0, min(int(page), len(pages) - 1))
+
+    for cat in pages[page]:
         clues = []
         for val in values_per_category:
-            pool = bucket.get((cat, val), [])
-            fresh = [r for r in pool if r["idpregunta"] not in used_ids]
+            pool_ids = bank.bucket_ids(cat, val)
+            fresh = [pos for pos, qid in enumerate(pool_ids) if qid not in used_ids]
             
-            if fresh:
-                pick = random.choice(fresh)
-            elif pool:
-                pick = random.choice(pool)
+            weights = bank.pick_weights(cat, val, fresh) if fresh and hasattr(bank, "pick_weights") else None
+            if fresh and question_weights:
+                weights = [(weights[i] if weights else 1.0) * question_weights.get(pool_ids[pos], 1.0) for i, pos in enumerate(fresh)]
+            if fresh and weights:
+                pick = bank.row(cat, val, rng.choices(fresh, weights=weights)[0])
+            elif fresh:
+                pick = bank.row(cat, val, rng.choice(fresh))
+            elif pool_ids:
+                pick = bank.row(cat, val, rng.randrange(len(pool_ids)))
                 pick = {**pick, "reused": True}
             else:
                 pick = {
@@ -549,22 +1022,7 @@ def load_from_csv_sampled(
                     "unavailable": True
                 }
                 
-            clue_payload = {
-                "value": pick["value"],
-                "question": pick["question"],
-                "choices": pick["choices"],
-                "answer": pick["answer"],
-            }
-
-            # Agregar imagen si existe
-            if pick.get("image"):
-                clue_payload["image"] = pick["image"]
-
-            if pick.get("unavailable"):
-                clue_payload["unavailable"] = True
-            if pick.get("reused"):
-                clue_payload["reused"] = True
-
+            clue_payload = make_clue(pick)
             clues.append(clue_payload)
 
             already_used = pick.get("idpregunta") in used_ids
@@ -575,15 +1033,7 @@ def load_from_csv_sampled(
                 and any(pick["choices"])
                 and pick.get("idpregunta") is not None
             ):
-                used_rows_to_append.append({
-                    "idpregunta": pick["idpregunta"],
-                    "category": pick["category"],
-                    "value": pick["value"],
-                    "question": pick["question"],
-                    "choices": pick["choices"],
-                    "answer": pick["answer"],
-                    "image": pick.get("image", ""),
-                })
+                used_rows_to_append.append({"bank": bank_name, **pick})
                 used_ids.add(pick["idpregunta"])
                 
         categories[cat] = {"name": cat, "clues": clues}
@@ -591,14 +1041,162 @@ def load_from_csv_sampled(
     if used_rows_to_append:
         _append_used_rows(used_csv_path, used_rows_to_append)
 
-    return {"categories": [categories[c] for c in sorted(categories.keys())]}
+    board = {"categories": [categories[c] for c in sorted(categories.keys())]}
+    if len(pages) > 1:
+        board["page"] = page
+        board["page_count"] = len(pages)
+        board["selection_seed"] = selection_seed
+    return board
+
+
+def make_clue(pick: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte una pregunta del banco en la casilla que ve el tablero"""
+    clue_payload = {
+        "idpregunta": pick.get("idpregunta"),
+        "value": pick["value"],
+        "question": pick["question"],
+        "choices": pick["choices"],
+        "answer": pick["answer"],
+    }
+
+    # Agregar imagen si existe
+    if pick.get("image"):
+        clue_payload["image"] = pick["image"]
+        if pick.get("image_folder"):
+            clue_payload["image_folder"] = pick["image_folder"]  # Tableros de varios bancos
+
+    if pick.get("unavailable"):
+        clue_payload["unavailable"] = True
+    if pick.get("reused"):
+        clue_payload["reused"] = True
+
+    return clue_payload
+
+
+def _category_key(name: str) -> str:
+    return str(name).strip().casefold()
+
+
+def select_categories(
+    available: List[str],
+    k: Optional[int] = None,
+    include: Optional[Iterable[str]] = None,
+    exclude: Optional[Iterable[str]] = None,
+    weights: Optional[Dict[str, float]] = None,
+    rng: Optional[random.Random] = None,
+) -> List[str]:
+    """Elige las categorías del tablero
+
+    Las de ``include`` siempre entran (si existen en el banco) y las de
+    ``exclude`` nunca. Los lugares restantes hasta ``k`` se sortean; con
+    ``weights`` se usa muestreo ponderado sin reemplazo (Efraimidis-Spirakis).
+    Devuelve la lista ordenada alfabéticamente. ``rng`` es el generador del
+    sorteo (uno nuevo si no se da).
+    """
+    rng = rng or random.Random()
+    excluded = {_category_key(c) for c in (exclude or [])}
+    candidates = [c for c in available if _category_key(c) not in excluded]
+
+    by_key = {_category_key(c): c for c in candidates}
+    forced: List[str] = []
+    for name in include or []:
+        cat = by_key.get(_category_key(name))
+        if cat is not None and cat not in forced:
+            forced.append(cat)
+
+    rest = [c for c in candidates if c not in forced]
+    if k is None or k <= 0 or len(forced) + len(rest) <= k:
+        return sorted(forced + rest)
+
+    slots = max(0, k - len(forced))
+    if weights:
+        weight_by_key = {_category_key(name): w for name, w in weights.items()}
+        keyed = []
+        for cat in rest:
+            w = float(weight_by_key.get(_category_key(cat), 1.0))
+            if w > 0:
+                keyed.append((rng.random() ** (1.0 / w), cat))
+        keyed.sort(reverse=True)
+        sampled = [cat for _, cat in keyed[:slots]]
+    else:
+        sampled = rng.sample(rest, slots)
+
+    return sorted(forced[:k] + sampled)
+
+
+def paginate_categories(categories: List[str], page_size: int = MAX_BOARD_CATEGORIES) -> List[List[str]]:
+    """Divide las categorías en páginas de a lo más ``page_size`` columnas"""
+    if page_size is None or page_size <= 0:
+        page_size = MAX_BOARD_CATEGORIES
+    return [categories[i:i + page_size] for i in range(0, len(categories), page_size)] or [[]]
+
+
+def parse_question_row(raw_row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Convierte una fila normalizada del banco en pregunta; None si no es válida"""
+    try:
+        qid = int(str(raw_row.get("idpregunta", "")).strip())
+    except ValueError:
+        return None
+
+    cat = (raw_row.get("category") or "General").strip()
+    try:
+        val = int(float(str(raw_row.get("value", "0")).strip() or "0"))
+    except ValueError:
+        return None
+
+    question = (raw_row.get("question") or "").strip()
+    choices = [
+        (raw_row.get("choice_a") or "").strip(),
+        (raw_row.get("choice_b") or "").strip(),
+        (raw_row.get("choice_c") or "").strip(),
+        (raw_row.get("choice_d") or "").strip(),
+    ]
+
+    ans_raw = str(raw_row.get("answer", "")).strip().lower()
+    if ans_raw in ("a", "b", "c", "d"):
+        answer = "abcd".index(ans_raw)
+    else:
+        try:
+            answer = int(ans_raw)
+        except Exception:
+            answer = 0
+
+    # Leer información de imagen
+    image = (raw_row.get("image") or "").strip()
+    nombre_imagen = (raw_row.get("nombre_imagen") or "").strip()
+
+    return {
+        "idpregunta": qid,
+        "category": cat,
+        "value": val,
+        "question": question,
+        "choices": choices,
+        "answer": answer,
+        "image": nombre_imagen if image.lower() == "si" else "",
+    }
+
+
+def normalize_text(text: Any) -> str:
+    """Texto en minúsculas, sin acentos ni signos, con espacios simples
+
+    Sirve para comparar y buscar preguntas sin importar tildes ni "¿?".
+    """
+    decomposed = unicodedata.normalize("NFKD", str(text or "").casefold())
+    stripped = _COMBINING_RE.sub("", decomposed)
+    return " ".join(_NON_WORD_RE.sub(" ", stripped).split())
+
+
+_COMBINING_RE = re.compile("[\u0300-\u036f]+")
+_NON_WORD_RE = re.compile(r"[^\w]+")
 
 
 def _read_question_rows(path: str) -> Iterable[Dict[str, str]]:
-    """Lee el archivo de preguntas ya sea CSV o XLSX y normaliza claves."""
-    raw_rows: List[Dict[str, str]]
+    """Lee el archivo de preguntas ya sea CSV, XLSX o JSON y normaliza claves."""
+    raw_rows: Iterable[Dict[str, str]]
     if zipfile.is_zipfile(path):
         raw_rows = _read_xlsx_rows(path)
+    elif _is_json_bank(path):
+        raw_rows = _iter_json_rows(path)
     else:
         raw_rows = _read_csv_rows(path)
 
@@ -649,6 +1247,159 @@ COLUMN_ALIASES = {
 }
 
 
+JSON_LIST_KEYS = ("questions", "preguntas", "categories", "categorias", "categorías")
+JSON_CLUE_KEYS = ("clues", "questions", "preguntas")
+JSON_CHOICE_KEYS = ("choices", "opciones")
+
+
+def _is_json_bank(path: str) -> bool:
+    if str(path).lower().endswith(".json"):
+        return True
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip(b"\xef\xbb\xbf \t\r\n")
+    return head[:1] in (b"[", b"{")
+
+
+class _JsonStream:
+    """Lector incremental: decodifica un valor JSON a la vez sin cargar el archivo"""
+
+    _decoder = json.JSONDecoder()
+    _whitespace = re.compile(r"[ \t\r\n]*")
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int = JSON_CHUNK_SIZE) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Siguiente carácter significativo ("" al final del archivo)"""
+        while True:
+            self.pos = self._whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"JSON inválido: se esperaba '{char}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decodifica el siguiente valor completo"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Valor incompleto: leer más (en bloques crecientes para no repetir trabajo)
+                if not self._fill(max(JSON_CHUNK_SIZE, len(self.buf) - self.pos)):
+                    raise
+                continue
+            if end == len(self.buf) and self._fill():
+                continue  # Un número podría seguir en el siguiente bloque
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterable[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError("JSON inválido: se esperaba ',' o ']'")
+
+
+def _iter_json_rows(path: str) -> Iterable[Dict[str, str]]:
+    """Recorre un banco JSON pregunta por pregunta
+
+    El archivo puede ser una lista de preguntas, un objeto con la lista en
+    ``questions``/``preguntas``, o un tablero con ``categories`` (cada una con
+    ``name`` y ``clues``). Solo se tiene en memoria la pregunta o categoría
+    que se está leyendo.
+    """
+    with open(path, "r", encoding="utf-8-sig") as f:
+        stream = _JsonStream(f)
+        top = stream.peek()
+        if top == "[":
+            for item in stream.array_items():
+                yield from _json_item_rows(item)
+            return
+
+        stream.expect("{")
+        while stream.peek() not in ("}", ""):
+            key = stream.value()
+            stream.expect(":")
+            if str(key).lower() in JSON_LIST_KEYS and stream.peek() == "[":
+                for item in stream.array_items():
+                    yield from _json_item_rows(item)
+            else:
+                stream.value()
+            if stream.peek() == ",":
+                stream.pos += 1
+        stream.expect("}")
+
+
+def _json_item_rows(item: Any) -> Iterable[Dict[str, str]]:
+    """Una pregunta plana, o las casillas de una categoría del formato de tablero"""
+    if not isinstance(item, dict):
+        return
+    clues = next((item[k] for k in JSON_CLUE_KEYS if isinstance(item.get(k), list)), None)
+    if clues is None:
+        yield _json_question_row(item)
+        return
+    category = item.get("name") or item.get("category") or item.get("categoria") or ""
+    for clue in clues:
+        if isinstance(clue, dict):
+            yield _json_question_row(clue, category)
+
+
+def _json_question_row(item: Dict[str, Any], category: str = "") -> Dict[str, str]:
+    """Convierte una pregunta JSON a las columnas del CSV (``parse_question_row``)"""
+    row: Dict[str, str] = {"category": str(category)} if category else {}
+    for key, value in item.items():
+        key_norm = str(key).strip().lower()
+        if key_norm in JSON_CHOICE_KEYS and isinstance(value, list):
+            for letter, choice in zip("abcd", value):
+                row[f"choice_{letter}"] = "" if choice is None else str(choice)
+            continue
+        if isinstance(value, (dict, list)) or value is None:
+            continue
+        row[COLUMN_ALIASES.get(key_norm, key_norm)] = str(value)
+
+    # En JSON "image" suele ser directamente el nombre del archivo
+    image = row.get("image", "").strip()
+    if image and image.lower() not in ("si", "no") and not row.get("nombre_imagen"):
+        row["nombre_imagen"] = image
+        row["image"] = "si"
+
+    # Tableros JSON antiguos no traen id: uno estable a partir del texto
+    if not str(row.get("idpregunta", "")).strip():
+        key = f"{row.get('category', '')}\x1f{row.get('question', '')}".encode("utf-8")
+        row["idpregunta"] = str(int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big") & JSON_ID_MASK)
+    return row
+
+
+# Ids generados dentro del rango seguro de JavaScript y lejos de los ids de CSV
+JSON_ID_MASK = (1 << 53) - 1
+
+
 def _read_csv_rows(path: str) -> List[Dict[str, str]]:
     encodings_to_try = ["utf-8", "utf-8-sig", "latin-1", "cp1252"]
     last_error: Optional[UnicodeDecodeError] = None
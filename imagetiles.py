@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Imágenes por piezas: revelado progresivo de pistas y mosaico
+
+Al cargar un banco, las imágenes de las preguntas y el ``MOSAICO`` se cortan
+en piezas que se guardan en ``data/tiles/<id>/``. Una pista con imagen se
+abre con una sola pieza visible y el servidor revela las demás poco a poco
+(evento ``image_tiles``); el mosaico del tablero se pide pieza por pieza y
+el servidor solo entrega las de casillas contestadas. El navegador nunca
+recibe la imagen completa de algo que aún no se ha revelado.
+
+Cortar imágenes requiere Pillow (``pip install Pillow``); sin Pillow las
+imágenes se envían completas como antes.
+
+Uso (cortar de antemano las imágenes de una carpeta):
+    python imagetiles.py data/question [--grid 4x3]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+TILES_DIR = "data/tiles"
+TILE_META = "meta.json"
+MAX_TILESETS = 400  # Carpetas de piezas conservadas (las usadas más recientemente)
+
+CLUE_GRID = (4, 3)  # Columnas x filas para las imágenes de las pistas
+REVEAL_INTERVAL = 0.6  # Segundos entre piezas reveladas durante una pista
+TILE_QUALITY = 85
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
+MOSAIC_NAMES = ("MOSAICO.jpg", "MOSAICO.png")
+
+
+def pillow_available() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+def tileset_id(image_path: str, cols: int, rows: int) -> str:
+    """Identificador estable de (imagen, tamaño, fecha, cuadrícula)"""
+    stat = os.stat(image_path)
+    key = f"{os.path.realpath(image_path)}|{stat.st_size}|{stat.st_mtime_ns}|{cols}x{rows}"
+    return blake2b(key.encode("utf-8"), digest_size=10).hexdigest()
+
+
+class TileSet:
+    """Piezas de una imagen ya cortada"""
+
+    __slots__ = ("id", "source", "directory", "cols", "rows", "width", "height", "ext")
+
+    def __init__(self, tid: str, source: str, directory: Path, meta: Dict[str, Any]):
+        self.id = tid
+        self.source = source
+        self.directory = directory
+        self.cols = meta["cols"]
+        self.rows = meta["rows"]
+        self.width = meta["width"]
+        self.height = meta["height"]
+        self.ext = meta["ext"]
+
+    def filename(self, col: int, row: int) -> Optional[str]:
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return f"{col}_{row}{self.ext}"
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "cols": self.cols, "rows": self.rows, "width": self.width, "height": self.height}
+
+
+def cut_tiles(image_path: str, directory: Path, cols: int, rows: int) -> Dict[str, Any]:
+    """Corta la imagen en ``cols`` x ``rows`` piezas; ``meta.json`` se escribe al final"""
+    from PIL import Image
+
+    directory.mkdir(parents=True, exist_ok=True)
+    with Image.open(image_path) as img:
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            fmt, ext, options = "PNG", ".png", {"optimize": True}
+        else:
+            fmt, ext, options = "JPEG", ".jpg", {"quality": TILE_QUALITY}
+            img = img.convert("RGB")
+        width, height = img.size
+        for row in range(rows):
+            for col in range(cols):
+                box = (col * width // cols, row * height // rows, (col + 1) * width // cols, (row + 1) * height // rows)
+                img.crop(box).save(directory / f"{col}_{row}{ext}", fmt, **options)
+
+    meta = {"source": os.path.basename(image_path), "cols": cols, "rows": rows, "width": width, "height": height, "ext": ext}
+    with open(directory / TILE_META, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def reveal_order(cols: int, rows: int, seed: Any) -> List[Tuple[int, int]]:
+    """Orden de revelado: al azar, pero igual para la misma pista"""
+    tiles = [(col, row) for row in range(rows) for col in range(cols)]
+    random.Random(str(seed)).shuffle(tiles)
+    return tiles
+
+
+def find_mosaic(folder: str) -> Optional[str]:
+    for name in MOSAIC_NAMES:
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class TileCache:
+    """Piezas cortadas en disco e índice en memoria de las ya abiertas"""
+
+    def __init__(self, directory: str = TILES_DIR, enabled: Optional[bool] = None):
+        self.directory = Path(directory)
+        self.enabled = pillow_available() if enabled is None else enabled
+        self._sets: Dict[str, TileSet] = {}
+        self._sources: Set[str] = set()  # Imágenes que solo se entregan por piezas
+        self._lock = threading.Lock()
+
+    def tileset(self, image_path: str, cols: int, rows: int) -> Optional[TileSet]:
+        """Piezas de la imagen (cortándola si hace falta); None sin Pillow o si falla"""
+        if not self.enabled or cols < 1 or rows < 1 or not os.path.isfile(image_path):
+            return None
+        tid = tileset_id(image_path, cols, rows)
+        with self._lock:
+            cached = self._sets.get(tid)
+        if cached is not None:
+            return cached
+
+        directory = self.directory / tid
+        try:
+            with open(directory / TILE_META, encoding="utf-8") as f:
+                meta = json.load(f)
+            os.utime(directory)  # Marca de uso para la limpieza
+        except (OSError, ValueError):
+            try:
+                meta = cut_tiles(image_path, directory, cols, rows)
+            except Exception as e:
+                print(f"⚠️ No se pudo cortar {image_path} en piezas: {e}")
+                shutil.rmtree(directory, ignore_errors=True)
+                return None
+            self._prune()
+
+        tiles = TileSet(tid, image_path, directory, meta)
+        with self._lock:
+            self._sets[tid] = tiles
+            self._sources.add(os.path.realpath(image_path))
+        return tiles
+
+    def get(self, tid: str) -> Optional[TileSet]:
+        return self._sets.get(tid)
+
+    def ready(self, image_path: str, cols: int, rows: int) -> Optional[str]:
+        """Id de las piezas si ya están cortadas y abiertas (sin cortar nada)"""
+        if not self.enabled or cols < 1 or rows < 1 or not os.path.isfile(image_path):
+            return None
+        tid = tileset_id(image_path, cols, rows)
+        with self._lock:
+            return tid if tid in self._sets else None
+
+    def is_tiled(self, image_path: str) -> bool:
+        """True si la imagen ya solo debe entregarse por piezas"""
+        return os.path.realpath(image_path) in self._sources
+
+    def prepare(self, jobs: Iterable[Tuple[str, int, int]]) -> int:
+        """Corta de antemano (al cargar un banco) para que la primera pieza salga al instante"""
+        done = 0
+        for image_path, cols, rows in jobs:
+            if self.tileset(image_path, cols, rows) is not None:
+                done += 1
+        return done
+
+    def _prune(self):
+        try:
+            folders = sorted(
+                (p for p in self.directory.iterdir() if p.is_dir()),
+                key=lambda p: p.stat().st_mtime,
+                reverse=True,
+            )
+        except OSError:
+            return
+        active = {tiles.directory for tiles in self._sets.values()}
+        for old in folders[MAX_TILESETS:]:
+            if old not in active:
+                shutil.rmtree(old, ignore_errors=True)
+
+
+def bank_jobs(folder: Optional[str], data: Dict[str, Any], mosaic_grid: Optional[Tuple[int, int]],
+              root: str = "data") -> List[Tuple[str, int, int]]:
+    """Imágenes del tablero cargado (pistas y mosaico) con su cuadrícula
+
+    Una pista con ``image_folder`` (tableros de varios bancos) usa
+    ``root/<image_folder>`` en lugar de ``folder``.
+    """
+    jobs = []
+    seen = set()
+    for cat in data.get("categories", ()):
+        for clue in cat.get("clues", ()):
+            image = clue.get("image")
+            source = os.path.join(root, clue["image_folder"]) if clue.get("image_folder") else folder
+            if image and source and (source, image) not in seen:
+                seen.add((source, image))
+                jobs.append((os.path.join(source, image), *CLUE_GRID))
+    mosaic = find_mosaic(folder) if folder else None
+    if mosaic and mosaic_grid:
+        jobs.append((mosaic, *mosaic_grid))
+    return jobs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Corta en piezas las imágenes de una carpeta de banco")
+    parser.add_argument("folder")
+    parser.add_argument("--grid", default=f"{CLUE_GRID[0]}x{CLUE_GRID[1]}", help="Columnas x filas, p. ej. 4x3")
+    parser.add_argument("--tiles-dir", default=TILES_DIR)
+    args = parser.parse_args(argv)
+
+    if not pillow_available():
+        print("❌ Se necesita Pillow para cortar imágenes (pip install Pillow)")
+        return 1
+    cols, rows = (int(n) for n in args.grid.lower().split("x"))
+    cache = TileCache(args.tiles_dir)
+    images = sorted(p for p in Path(args.folder).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    for path in images:
+        tiles = cache.tileset(str(path), cols, rows)
+        status = f"{tiles.cols}x{tiles.rows} → {tiles.directory}" if tiles else "error"
+        print(f"🧩 {path.name}: {status}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -77,6 +77,23 @@ all_hiddenimports += [
     'itsdangerous',
     'markupsafe',
     'game_logic',
+    'bank_import',
+    'tournament',
+    'offload',
+    'bank_lint',
+    'bank_index',
+    'bank_compiled',
+    'bank_merge',
+    'outcomes',
+    'ratings',
+    'export',
+    'ratelimit',
+    'replay',
+    'transport',
+    'buzzgate',
+    'clocksync',
+    'pagecache',
+    'imagetiles',
     'app',
     'dns',
     'dns.resolver',
@@ -91,7 +108,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Paquetes que arrastran los hooks pero el servidor nunca usa
+    excludes=['tkinter', 'unittest', 'pydoc', 'doctest', 'IPython', 'matplotlib', 'numpy', 'pytest'],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -109,7 +127,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX obliga a descomprimir cada DLL en cada arranque (y dispara antivirus)
+    upx=False,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -125,7 +144,7 @@ coll = COLLECT(
     a.zipfiles,
     a.datas,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
     name='Painani',
 )
\ No newline at end of file
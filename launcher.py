@@ -3,13 +3,32 @@
 """
 Launcher para Web
 Abre automáticamente el navegador
+
+El puerto se abre antes de importar Flask/Socket.IO: en cuanto el socket
+está escuchando se abre el navegador, y su primera petición espera en la
+cola del socket mientras terminan las importaciones. Con ``--perfil`` (o
+``PAINANI_PERFIL=1``) se imprime cuánto tardó cada etapa del arranque y se
+guarda un perfil de las importaciones en ``data/arranque.txt``.
 """
+import time
+
+_T0 = time.perf_counter()
+
 import os
 import sys
-import time
+import socket
 import webbrowser
 import threading
-from pathlib import Path
+import multiprocessing
+
+# Los procesos de importación de bancos relanzan este ejecutable
+multiprocessing.freeze_support()
+
+HOST = '0.0.0.0'
+PORT = 5000
+URL = f'http://localhost:{PORT}'
+PROFILE_REPORT = os.path.join('data', 'arranque.txt')
+PROFILE_TOP = 40  # Funciones listadas en el perfil de importaciones
 
 # Asegurar que estamos en el directorio correcto
 if getattr(sys, 'frozen', False):
@@ -28,30 +47,165 @@ os.makedirs('static/css', exist_ok=True)
 os.makedirs('static/js', exist_ok=True)
 os.makedirs('templates', exist_ok=True)
 
-def open_browser():
-    """Abre el navegador después de que el servidor esté listo"""
-    time.sleep(2)  # Esperar a que el servidor inicie
-    webbrowser.open('http://localhost:5000')
-    print("\n✅ Navegador abierto en http://localhost:5000")
+
+class StartupTimer:
+    """Marcas de tiempo de cada etapa del arranque (desde que inicia el launcher)"""
+
+    def __init__(self, start):
+        self.start = start
+        self.marks = []
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.reported = False
+
+    def mark(self, name):
+        with self._lock:
+            if name in self._seen:
+                return
+            self._seen.add(name)
+            self.marks.append((name, time.perf_counter() - self.start))
+
+    def report(self):
+        lines = ["⏱️  Arranque de Painani:"]
+        previous = 0.0
+        for name, elapsed in sorted(self.marks, key=lambda m: m[1]):
+            lines.append(f"   {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:7.1f})  {name}")
+            previous = elapsed
+        return "\n".join(lines)
+
+
+timer = StartupTimer(_T0)
+
+
+def bind_listener(host=HOST, port=PORT):
+    """Abre el socket del servidor; desde aquí el navegador ya puede conectarse"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if os.name != 'nt':
+        # En Windows SO_REUSEADDR permitiría dos servidores en el mismo puerto
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(128)
+    return listener
+
+
+def wait_until_listening(port=PORT, timeout=30.0):
+    """Espera a que el puerto acepte conexiones (solo si no se pudo abrir antes)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+
+def open_browser(ready=None):
+    """Abre el navegador en cuanto el servidor escucha"""
+    if ready is not None and not ready():
+        print(f"⚠️  El servidor no respondió; abre {URL} manualmente")
+        return
+    timer.mark("navegador solicitado")
+    webbrowser.open(URL)
+    print(f"\n✅ Navegador abierto en {URL}")
     print("⚠️  NO CIERRES ESTA VENTANA mientras juegas")
     print("🛑 Para salir: Presiona Ctrl+C aquí o cierra esta ventana\n")
 
-# Iniciar navegador en un hilo separado
-threading.Thread(target=open_browser, daemon=True).start()
-
-# Importar y ejecutar la aplicación
-from app import app, socketio
-import game_logic
-
-print("\n" + "="*60)
-print("🎮 PAINANI DEL CONOCIMIENTO - ESCUELA SUPERIOR DE GUERRA")
-print("="*60)
-print("🚀 Iniciando servidor...")
-print("📍 URL: http://localhost:5000")
-print("="*60 + "\n")
-
-try:
-    socketio.run(app, host='0.0.0.0', port=5000, debug=False)
-except KeyboardInterrupt:
-    print("\n\n👋 Cerrando Painani. ¡Hasta pronto!")
-    sys.exit(0)
\ No newline at end of file
+
+def track_first_requests(flask_app, profile):
+    """Marca la primera carga de la página y la primera conexión Socket.IO"""
+    inner = flask_app.wsgi_app
+
+    def wsgi_app(environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == '/':
+            timer.mark("página servida")
+        elif path.startswith('/socket.io'):
+            timer.mark("tablero conectado (Socket.IO)")
+            if profile and not timer.reported:
+                timer.reported = True
+                print(timer.report())
+        return inner(environ, start_response)
+
+    flask_app.wsgi_app = wsgi_app
+
+
+def import_app(profile):
+    """Importa el servidor (la parte lenta del arranque), con perfil opcional"""
+    if not profile:
+        from app import app, socketio, start_buzzer_gateway
+        start_buzzer_gateway()
+        return app, socketio
+
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    from app import app, socketio, start_buzzer_gateway
+    profiler.disable()
+    start_buzzer_gateway()
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+    try:
+        with open(PROFILE_REPORT, 'w', encoding='utf-8') as f:
+            f.write(out.getvalue())
+        print(f"📝 Perfil de importaciones guardado en {PROFILE_REPORT}")
+    except OSError:
+        pass
+    return app, socketio
+
+
+def serve(app, socketio, listener):
+    """Atiende en el socket ya abierto (eventlet) o arranca el servidor normal"""
+    if listener is not None and socketio.async_mode == 'eventlet':
+        import eventlet.wsgi
+        from eventlet.greenio import GreenSocket
+
+        eventlet.wsgi.server(GreenSocket(listener), app, log_output=False)
+        return
+
+    if listener is not None:
+        listener.close()
+    socketio.run(app, host=HOST, port=PORT, debug=False)
+
+
+def main():
+    profile = '--perfil' in sys.argv or os.environ.get('PAINANI_PERFIL') == '1'
+
+    try:
+        listener = bind_listener()
+    except OSError as e:
+        print(f"⚠️  No se pudo abrir el puerto {PORT} de antemano ({e})")
+        listener = None
+
+    if listener is not None:
+        timer.mark("puerto escuchando")
+        threading.Thread(target=open_browser, daemon=True).start()
+    else:
+        threading.Thread(target=open_browser, args=(wait_until_listening,), daemon=True).start()
+
+    # Importar y ejecutar la aplicación
+    app, socketio = import_app(profile)
+    timer.mark("servidor importado")
+    track_first_requests(app, profile)
+
+    print("\n" + "="*60)
+    print("🎮 PAINANI DEL CONOCIMIENTO - ESCUELA SUPERIOR DE GUERRA")
+    print("="*60)
+    print("🚀 Iniciando servidor...")
+    print(f"📍 URL: {URL}")
+    print("="*60 + "\n")
+
+    try:
+        serve(app, socketio, listener)
+    except KeyboardInterrupt:
+        print("\n\n👋 Cerrando Painani. ¡Hasta pronto!")
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
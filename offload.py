@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ejecución fuera del bucle del servidor
+
+El servidor atiende a todos los clientes desde un solo hub de eventlet; una
+lectura de disco o un XLSX grande ahí congela los timbres. ``Offloader``
+manda ese trabajo a un grupo de hilos (E/S) o de procesos (CPU) y espera el
+resultado cediendo el control con la función ``sleep`` del servidor
+(``socketio.sleep``), de modo que los demás eventos siguen atendiéndose.
+La latencia de timbres durante una carga se mide con ``offload_bench.py``.
+"""
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+IO_WORKERS = 4
+CPU_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Espera inicial y máxima entre consultas a un Future (segundos)
+POLL_MIN = 0.001
+POLL_MAX = 0.02
+
+
+class Offloader:
+    """Grupos de hilos y procesos compartidos por el servidor"""
+
+    def __init__(
+        self,
+        sleep: Callable[[float], Any] = time.sleep,
+        io_workers: int = IO_WORKERS,
+        cpu_workers: int = CPU_WORKERS,
+    ):
+        self.sleep = sleep
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes = None  # ProcessPoolExecutor, creado (e importado) al primer uso
+
+    # ---------------------
+    # Envío de trabajo
+    # ---------------------
+
+    def submit_io(self, fn: Callable, *args, **kwargs) -> Future:
+        """Trabajo de disco o red en un hilo"""
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="painani-io")
+        return self._threads.submit(fn, *args, **kwargs)
+
+    def submit_cpu(self, fn: Callable, *args, **kwargs) -> Future:
+        """Trabajo de CPU en un proceso (``fn`` y sus argumentos deben ser serializables)"""
+        if self._processes is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._processes = ProcessPoolExecutor(max_workers=self.cpu_workers)
+        return self._processes.submit(fn, *args, **kwargs)
+
+    # ---------------------
+    # Espera cooperativa
+    # ---------------------
+
+    def wait(self, future: Future) -> Any:
+        """Espera el resultado cediendo el control al servidor entre consultas"""
+        delay = POLL_MIN
+        while not future.done():
+            self.sleep(delay)
+            delay = min(delay * 2, POLL_MAX)
+        return future.result()
+
+    def as_completed(self, futures: Iterable[Future]) -> Iterator[Future]:
+        """Como ``concurrent.futures.as_completed`` pero sin bloquear el hub"""
+        pending = list(futures)
+        delay = POLL_MIN
+        while pending:
+            finished = [f for f in pending if f.done()]
+            if not finished:
+                self.sleep(delay)
+                delay = min(delay * 2, POLL_MAX)
+                continue
+            delay = POLL_MIN
+            for future in finished:
+                pending.remove(future)
+                yield future
+
+    def run_io(self, fn: Callable, *args, **kwargs) -> Any:
+        return self.wait(self.submit_io(fn, *args, **kwargs))
+
+    def run_cpu(self, fn: Callable, *args, **kwargs) -> Any:
+        return self.wait(self.submit_cpu(fn, *args, **kwargs))
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False)
+            self._processes = None
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Latencia de timbres mientras se carga un banco grande
+
+Compara cargar un banco en frío (compilación incluida) dentro del bucle y
+con ``Offloader``; mientras tanto un cliente toca un timbre cada 5 ms y se
+mide cuánto tarda en contestarse. Todo lo que escribe la prueba (banco,
+``compiled/`` y usadas) queda en un directorio temporal que se borra al
+terminar; no toca ``data/``.
+
+Uso:
+    python offload_bench.py [--rows 200000] [--max-ms 50] [--json]
+"""
+import argparse
+import csv
+import json
+import os
+import select
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import game_logic
+from bank_compiled import compile_bank, sample_compiled_board
+from offload import Offloader
+
+BENCH_ROWS = 200000
+PRESS_INTERVAL = 0.005  # Un timbre cada 5 ms
+MAX_LATENCY_MS = 50.0  # Máximo aceptado con la carga fuera del bucle
+IDLE_SECONDS = 0.5
+PRESS = struct.Struct("!d")
+
+
+class BuzzerHub:
+    """Bucle de un solo hilo que atiende timbres, como el hub de eventlet
+
+    ``sleep`` sirve como la función de espera de ``Offloader``: mientras
+    espera, contesta cada pulsación que llega por el socket (pasando por
+    ``GameState.buzzer_press``). Un cliente en otro hilo pulsa cada
+    ``PRESS_INTERVAL`` y mide la ida y vuelta.
+    """
+
+    def __init__(self):
+        self.server, self.client = socket.socketpair()
+        self.state = game_logic.GameState()
+        self.state.data = game_logic.SAMPLE_DATA
+        self.state.open_question(0, 0)
+        self.latencies: List[float] = []
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._buffer = b""
+
+    def sleep(self, delay: float):
+        deadline = time.perf_counter() + delay
+        while True:
+            remaining = deadline - time.perf_counter()
+            ready, _, _ = select.select([self.server], [], [], max(0.0, remaining))
+            if ready:
+                self._serve()
+            if remaining <= 0:
+                return
+
+    def _serve(self):
+        self._buffer += self.server.recv(65536)
+        count = len(self._buffer) // PRESS.size
+        for idx in range(count):
+            self.state.buzzer_press(idx % self.state.player_count)
+        if count:
+            reply, self._buffer = self._buffer[:count * PRESS.size], self._buffer[count * PRESS.size:]
+            self.server.sendall(reply)
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._press, daemon=True),
+                         threading.Thread(target=self._receive, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> List[float]:
+        self._stop.set()
+        self.sleep(0.05)  # Contesta lo que quedó en camino
+        self.client.shutdown(socket.SHUT_WR)
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self.server.close()
+        self.client.close()
+        return self.latencies
+
+    def _press(self):
+        while not self._stop.is_set():
+            self.client.sendall(PRESS.pack(time.perf_counter()))
+            time.sleep(PRESS_INTERVAL)
+
+    def _receive(self):
+        pending = b""
+        while True:
+            try:
+                chunk = self.client.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            now = time.perf_counter()
+            pending += chunk
+            while len(pending) >= PRESS.size:
+                (sent,) = PRESS.unpack_from(pending)
+                pending = pending[PRESS.size:]
+                self.latencies.append((now - sent) * 1000.0)
+
+
+def write_bench_bank(path: str, rows: int):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["idpregunta", "category", "value", "question", "choice_a", "choice_b", "choice_c", "choice_d", "answer"])
+        for i in range(rows):
+            writer.writerow([i + 1, f"Categoría {i % 60}", (i % 5 + 1) * 100,
+                             f"Pregunta de prueba número {i} sobre el tema {i % 977}", "A", "B", "C", "D", "a"])
+
+
+def _latency_summary(latencies: List[float]) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"presses": 0}
+    return {
+        "presses": len(ordered),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def cold_load(bank_path: str, compiled_dir: str, used_csv_path: str) -> Dict[str, Any]:
+    """Compila el banco en ``compiled_dir`` (vacío) y sortea un tablero, como la primera carga"""
+    compiled_path = compile_bank(bank_path, compiled_dir)
+    return sample_compiled_board(compiled_path, used_csv_path=used_csv_path)
+
+
+def measure_load_latency(bank_path: str, workdir: str, offloaded: bool) -> Dict[str, Any]:
+    """Latencia de timbres mientras se carga el banco en frío dentro o fuera del bucle
+
+    ``workdir`` recibe el ``compiled/`` y las usadas de esta medición; debe
+    ser un directorio de la prueba, nunca ``data/``.
+    """
+    label = "offload" if offloaded else "inline"
+    compiled_dir = tempfile.mkdtemp(prefix=f"compiled-{label}-", dir=workdir)
+    used_csv_path = os.path.join(workdir, f"usadas_{label}.csv")
+
+    hub = BuzzerHub()
+    offloader = Offloader(sleep=hub.sleep, cpu_workers=1)
+    if offloaded:
+        offloader.run_cpu(int)  # El proceso ya existe, como tras la primera carga del servidor
+    hub.start()
+    hub.sleep(0.05)
+    started = time.perf_counter()
+    if offloaded:
+        offloader.run_cpu(cold_load, bank_path, compiled_dir, used_csv_path)
+    else:
+        cold_load(bank_path, compiled_dir, used_csv_path)
+    elapsed = time.perf_counter() - started
+    latencies = hub.stop()
+    offloader.shutdown()
+    return {"load_s": round(elapsed, 3), **_latency_summary(latencies)}
+
+
+def measure_idle_latency(seconds: float = IDLE_SECONDS) -> Dict[str, Any]:
+    hub = BuzzerHub()
+    hub.start()
+    hub.sleep(seconds)
+    return _latency_summary(hub.stop())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Latencia de timbres mientras se carga un banco grande")
+    parser.add_argument("--rows", type=int, default=BENCH_ROWS)
+    parser.add_argument("--max-ms", type=float, default=MAX_LATENCY_MS, help="Latencia máxima aceptada con la carga fuera del bucle")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="painani-offload-")
+    try:
+        bank_path = os.path.join(workdir, "banco.csv")
+        write_bench_bank(bank_path, args.rows)
+        results = {
+            "rows": args.rows,
+            "idle": measure_idle_latency(),
+            "inline": measure_load_latency(bank_path, workdir, offloaded=False),
+            "offloaded": measure_load_latency(bank_path, workdir, offloaded=True),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["max_ms"] = args.max_ms
+    results["ok"] = results["offloaded"].get("max_ms", float("inf")) <= args.max_ms
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(f"Banco de {args.rows:,} filas, un timbre cada {PRESS_INTERVAL * 1000:g} ms")
+        for name, label in (("idle", "sin carga"), ("inline", "carga en el bucle"), ("offloaded", "carga con Offloader")):
+            r = results[name]
+            load = f" · carga {r['load_s']} s" if "load_s" in r else ""
+            print(f"{label:>20}: p50 {r.get('p50_ms')} ms · p99 {r.get('p99_ms')} ms · máx {r.get('max_ms')} ms ({r['presses']} timbres){load}")
+        status = "✅" if results["ok"] else "❌"
+        print(f"{status} Máximo con Offloader: {results['offloaded'].get('max_ms')} ms (límite {args.max_ms:g} ms)")
+    return 0 if results["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
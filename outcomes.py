@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro de resultados por pregunta y análisis de dificultad
+
+Cada intento (acierto, error, tiempo agotado o pregunta cancelada) se agrega
+a columnas ``array`` en memoria y a un archivo binario por columna en
+``data/outcomes/``. Los reportes recorren las columnas con ``zip``/``Counter``
+y ``itertools.compress``, sin crear un diccionario por fila, de modo que meses
+de historial se resumen en décimas de segundo.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import compress, repeat
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+OUTCOMES_DIR = "data/outcomes"
+
+RESULTS = ("correct", "incorrect", "timeout", "skipped")
+RESULT_CODES = {name: code for code, name in enumerate(RESULTS)}
+CORRECT, INCORRECT, TIMEOUT, SKIPPED = range(len(RESULTS))
+SHOWN = len(RESULTS)  # Posición extra en ``question_stats``
+
+NO_QUESTION = -1  # Casillas sin id (datos de ejemplo o JSON)
+
+# Nombre de columna -> código de tipo de ``array``
+COLUMNS = (
+    ("ts", "d"),          # time.time() del intento
+    ("bank", "I"),        # id de texto del banco
+    ("question", "q"),    # idpregunta
+    ("category", "I"),    # id de texto de la categoría
+    ("value", "i"),
+    ("team", "b"),        # -1 si se canceló sin intento
+    ("result", "B"),
+    ("buzz_ms", "i"),     # -1 si no hubo timbre
+    ("rebounds", "B"),    # equipos que ya habían fallado
+)
+
+# Columnas que usan los reportes (las demás no se copian)
+REPORT_COLUMNS = ("question", "value", "team", "result", "buzz_ms", "rebounds")
+
+EXPORT_BATCH_ROWS = 8192  # Filas copiadas a la vez al exportar
+
+# Peso mínimo en el muestreo: ni la pregunta más difícil queda fuera del todo
+MIN_SAMPLER_WEIGHT = 0.1
+
+
+def _byte_mask(*codes: int) -> bytes:
+    """Tabla para ``bytes.translate``: 1 en los bytes ``codes``, 0 en el resto
+
+    Traducir una columna de bytes con ella da una máscara para ``compress``
+    sin recorrer la columna en Python.
+    """
+    table = bytearray(256)
+    for code in codes:
+        table[code] = 1
+    return bytes(table)
+
+
+_ZERO_MASK = _byte_mask(0)
+_SIGNED_NONNEGATIVE_MASK = _byte_mask(*range(128))  # Columna "b": 0..127 sí, -1 (255) no
+_RESULT_MASKS = [_byte_mask(code) for code in range(len(RESULTS))]
+
+
+class OutcomeStore:
+    """Historial columnar de resultados, solo de agregado
+
+    El historial se lee de disco la primera vez que se usa, no al crear el
+    objeto, para no retrasar el arranque del servidor.
+    """
+
+    def __init__(self, directory: Optional[str] = OUTCOMES_DIR):
+        self.directory = Path(directory) if directory else None
+        self.columns: Dict[str, array] = {name: array(code) for name, code in COLUMNS}
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._flushed_rows = 0
+        self._flushed_strings = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Un solo flush escribiendo a la vez
+        self._loaded = self.directory is None
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.columns["ts"])
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    # ---------------------
+    # Persistencia
+    # ---------------------
+
+    def _load(self):
+        strings_path = self.directory / "strings.txt"
+        if strings_path.exists():
+            with open(strings_path, encoding="utf-8") as f:
+                self.strings = f.read().split("\n")[:-1]
+            self._string_ids = {s: i for i, s in enumerate(self.strings)}
+            self._flushed_strings = len(self.strings)
+
+        for name, code in COLUMNS:
+            path = self.directory / f"{name}.bin"
+            if not path.exists():
+                continue
+            column = self.columns[name]
+            column.frombytes(path.read_bytes()[: path.stat().st_size // column.itemsize * column.itemsize])
+
+        # Una escritura interrumpida puede dejar columnas de distinto largo
+        rows = min(len(c) for c in self.columns.values())
+        for column in self.columns.values():
+            del column[rows:]
+        self._flushed_rows = rows
+        for name, _ in COLUMNS:
+            path = self.directory / f"{name}.bin"
+            if path.exists() and path.stat().st_size != rows * self.columns[name].itemsize:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * self.columns[name].itemsize)
+
+    def flush(self):
+        """Escribe en disco las filas pendientes (pensado para un hilo de E/S)
+
+        Varios flush pueden llegar a la vez desde el grupo de hilos; el
+        candado de escritura los atiende de uno en uno para que las columnas
+        se agreguen en orden y sigan alineadas.
+        """
+        if self.directory is None:
+            return
+        self._ensure_loaded()
+        with self._write_lock:
+            with self._lock:
+                start, stop = self._flushed_rows, len(self.columns["ts"])
+                new_strings = self.strings[self._flushed_strings:]
+                tails = {name: column[start:stop] for name, column in self.columns.items()}
+                self._flushed_rows = stop
+                self._flushed_strings = len(self.strings)
+            if not new_strings and start == stop:
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if new_strings:
+                with open(self.directory / "strings.txt", "a", encoding="utf-8") as f:
+                    f.write("".join(s + "\n" for s in new_strings))
+            for name, tail in tails.items():
+                with open(self.directory / f"{name}.bin", "ab") as f:
+                    tail.tofile(f)
+
+    # ---------------------
+    # Registro
+    # ---------------------
+
+    def _intern(self, text: str) -> int:
+        text = str(text).replace("\n", " ")
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def record(self, outcome: Dict[str, Any], bank: Optional[str] = None):
+        """Agrega un intento tal como lo reporta ``GameState.outcome_listener``"""
+        question_id = outcome.get("question_id")
+        self._ensure_loaded()
+        with self._lock:
+            cols = self.columns
+            cols["ts"].append(outcome.get("ts") or time.time())
+            cols["bank"].append(self._intern(bank or ""))
+            cols["question"].append(NO_QUESTION if question_id is None else int(question_id))
+            cols["category"].append(self._intern(outcome.get("category", "")))
+            cols["value"].append(int(outcome.get("value", 0)))
+            cols["team"].append(max(-1, min(127, int(outcome.get("team", -1)))))
+            cols["result"].append(RESULT_CODES[outcome["result"]])
+            cols["buzz_ms"].append(max(-1, int(outcome.get("buzz_ms", -1))))
+            cols["rebounds"].append(min(255, int(outcome.get("rebounds", 0))))
+
+    def iter_rows(
+        self,
+        since: Optional[float] = None,
+        bank: Optional[str] = None,
+        batch: int = EXPORT_BATCH_ROWS,
+    ) -> Iterator[tuple]:
+        """Filas en el orden de ``COLUMNS`` con banco y categoría como texto
+
+        Se copian ``batch`` filas a la vez, así que exportar todo el historial
+        no duplica las columnas en memoria.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            start = bisect_left(self.columns["ts"], since) if since else 0
+            stop = len(self.columns["ts"])
+            bank_id = self._string_ids.get(bank, -1) if bank is not None else None
+        names = [name for name, _ in COLUMNS]
+        for pos in range(start, stop, batch):
+            with self._lock:
+                part = [self.columns[name][pos:min(pos + batch, stop)] for name in names]
+                strings = self.strings
+            bank_col, category_col = part[1], part[3]
+            part[1] = map(strings.__getitem__, bank_col)
+            part[3] = map(strings.__getitem__, category_col)
+            rows = zip(*part)
+            if bank_id is not None:
+                rows = compress(rows, map(bank_id.__eq__, bank_col))
+            yield from rows
+
+    # ---------------------
+    # Reportes
+    # ---------------------
+
+    def _snapshot(self, since: Optional[float] = None, bank: Optional[str] = None) -> Dict[str, Any]:
+        """Copia de las columnas de reporte desde ``since``, solo del banco pedido"""
+        self._ensure_loaded()
+        with self._lock:
+            start = bisect_left(self.columns["ts"], since) if since else 0
+            cols = {name: self.columns[name][start:] for name in REPORT_COLUMNS}
+            banks = self.columns["bank"][start:] if bank is not None else None
+            bank_id = self._string_ids.get(bank) if bank is not None else None
+        if bank is not None:
+            if bank_id is None:
+                cols = {name: array(column.typecode) for name, column in cols.items()}
+            else:
+                mask = bytes(map(bank_id.__eq__, banks))
+                cols = {name: array(column.typecode, compress(column, mask)) for name, column in cols.items()}
+        return cols
+
+    def difficulty_by_value(self, since: Optional[float] = None, bank: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Dificultad empírica por valor de casilla
+
+        ``correct_rate`` es la fracción de preguntas mostradas que alguien
+        acertó; ``first_try_rate`` la de primeros intentos acertados.
+        """
+        cols = self._snapshot(since, bank)
+        tiers = sorted(set(cols["value"]))[:255]  # El byte 255 queda para "otros"
+        if not tiers:
+            return []
+        # Cada valor pasa a un byte (su posición en ``tiers``) y se cuenta con bytes.count
+        tier_of = {value: pos for pos, value in enumerate(tiers)}
+        tier_bytes = bytes(map(tier_of.get, cols["value"], repeat(255)))
+        result_bytes = cols["result"].tobytes()
+        by_result = [bytes(compress(tier_bytes, result_bytes.translate(m))) for m in _RESULT_MASKS]
+
+        # Cada vez que se muestra una pregunta hay exactamente un evento sin rebote
+        opening = cols["rebounds"].tobytes().translate(_ZERO_MASK)
+        first_tiers = bytes(compress(tier_bytes, opening))
+        first_results = bytes(compress(result_bytes, opening))
+        first_by_result = [bytes(compress(first_tiers, first_results.translate(m))) for m in _RESULT_MASKS]
+
+        # Solo los intentos de un equipo (team >= 0) pueden tener tiempo de timbre
+        attempted = cols["team"].tobytes().translate(_SIGNED_NONNEGATIVE_MASK)
+        attempt_tiers = bytes(compress(tier_bytes, attempted))
+        attempt_buzz = array("i", compress(cols["buzz_ms"], attempted))
+        no_buzz_tiers = bytes(compress(attempt_tiers, map((-1).__eq__, attempt_buzz)))
+
+        report = []
+        for pos, value in enumerate(tiers):
+            counts = [column.count(pos) for column in by_result]
+            first_counts = [column.count(pos) for column in first_by_result]
+            attempts = counts[CORRECT] + counts[INCORRECT] + counts[TIMEOUT]
+            shown = sum(first_counts)
+            first_try = shown - first_counts[SKIPPED]
+
+            # Cada -1 (sin timbre) resta uno a la suma
+            missing = no_buzz_tiers.count(pos)
+            in_tier = attempt_tiers.translate(_byte_mask(pos))
+            buzz_count = in_tier.count(1) - missing
+            buzz_total = sum(compress(attempt_buzz, in_tier)) + missing
+
+            report.append({
+                "value": value,
+                "shown": shown,
+                "attempts": attempts,
+                **{name: counts[code] for code, name in enumerate(RESULTS)},
+                "correct_rate": round(counts[CORRECT] / shown, 3) if shown else None,
+                "first_try_rate": round(first_counts[CORRECT] / first_try, 3) if first_try else None,
+                "avg_buzz_ms": round(buzz_total / buzz_count) if buzz_count else None,
+            })
+        return report
+
+    def question_stats(self, since: Optional[float] = None, bank: Optional[str] = None) -> Dict[int, List[int]]:
+        """Conteos por pregunta: ``{idpregunta: [aciertos, errores, tiempos, cancelaciones, mostradas]}``"""
+        cols = self._snapshot(since, bank)
+        questions = cols["question"]
+        result_bytes = cols["result"].tobytes()
+        opening = cols["rebounds"].tobytes().translate(_ZERO_MASK)
+        counters = [Counter(compress(questions, result_bytes.translate(m))) for m in _RESULT_MASKS]
+        counters.append(Counter(compress(questions, opening)))
+
+        stats: Dict[int, List[int]] = {}
+        for qid in set().union(*counters):
+            if qid != NO_QUESTION:
+                stats[qid] = [counter[qid] for counter in counters]
+        return stats
+
+    def unanswered_questions(
+        self,
+        since: Optional[float] = None,
+        bank: Optional[str] = None,
+        min_attempts: int = 1,
+    ) -> List[Dict[str, Any]]:
+        """Preguntas mostradas que nadie acertó, de la más intentada a la menos"""
+        result = []
+        for qid, counts in self.question_stats(since, bank).items():
+            attempts = counts[INCORRECT] + counts[TIMEOUT]
+            if counts[CORRECT] == 0 and attempts + counts[SKIPPED] >= max(1, min_attempts):
+                result.append({
+                    "idpregunta": qid,
+                    "shown": counts[SHOWN],
+                    "attempts": attempts,
+                    **{name: counts[code] for code, name in enumerate(RESULTS) if code != CORRECT},
+                })
+        result.sort(key=lambda q: (-q["attempts"], -q["skipped"], q["idpregunta"]))
+        return result
+
+    def sampler_weights(self, since: Optional[float] = None, bank: Optional[str] = None) -> Dict[int, float]:
+        """Pesos para ``build_sampled_board``: baja la probabilidad de lo que nadie contesta
+
+        El peso es la tasa de acierto suavizada ``(aciertos + 1) / (mostradas + 2)``
+        escalada para que una pregunta sin historial valga 1.
+        """
+        weights = {}
+        for qid, counts in self.question_stats(since, bank).items():
+            rate = (counts[CORRECT] + 1) / (counts[SHOWN] + 2)
+            weights[qid] = max(MIN_SAMPLER_WEIGHT, round(2 * rate, 3))
+        return weights
+
+    def summary(self, since: Optional[float] = None, bank: Optional[str] = None) -> Dict[str, Any]:
+        """Reporte combinado para ``/api/analytics``"""
+        started = time.perf_counter()
+        by_value = self.difficulty_by_value(since, bank)
+        unanswered = self.unanswered_questions(since, bank)
+        return {
+            "rows": len(self),
+            "by_value": by_value,
+            "unanswered": unanswered[:100],
+            "unanswered_count": len(unanswered),
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
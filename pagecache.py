@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Primera pintura del tablero desde el servidor
+
+La página principal ya trae el tablero y los puntajes en el HTML, más el
+estado en JSON para que ``game.js`` conecte los eventos sin pedir
+``/api/board`` ni ``/api/images-folder``. La página renderizada se guarda
+por versión del estado (``GameState.version``): recargar el proyector sin
+cambios en el juego no vuelve a renderizar, y el navegador recibe un 304
+gracias a la ETag. Lo que cambia la página sin ser una transición del juego
+(ocultar respuestas, piezas del mosaico ya cortadas) va aparte en la llave,
+ver ``page_key``.
+"""
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+PAGE_CACHE_SIZE = 8  # Juego principal y algunas partidas de torneo
+
+UNAVAILABLE_PREFIX = "(Sin pregunta disponible"
+
+
+def board_rows(categories: List[Dict[str, Any]]) -> List[int]:
+    """Filas que se muestran (igual que ``computeBoardLayout`` en game.js)
+
+    Se omiten las filas sin ninguna pregunta disponible; si no queda
+    ninguna, se muestran todas.
+    """
+    max_clues = max((len(cat.get("clues") or ()) for cat in categories), default=0)
+    rows = []
+    for row in range(max_clues):
+        for cat in categories:
+            clues = cat.get("clues") or ()
+            if row >= len(clues) or clues[row].get("unavailable"):
+                continue
+            text = clues[row].get("question")
+            text = text.strip() if isinstance(text, str) else ""
+            if text and not text.startswith(UNAVAILABLE_PREFIX):
+                rows.append(row)
+                break
+    return rows or list(range(max_clues))
+
+
+def board_view(board: Dict[str, Any]) -> Dict[str, Any]:
+    """Encabezados y celdas del tablero listos para la plantilla"""
+    categories = board.get("categories") or []
+    tile_status = board.get("tile_status") or {}
+    used = {tuple(pair) for pair in board.get("used") or ()}
+    rows = board_rows(categories)
+
+    cells = []
+    for display_row, row in enumerate(rows):
+        for cat_idx, cat in enumerate(categories):
+            clues = cat.get("clues") or ()
+            cell = {"cat_idx": cat_idx, "clue_idx": row, "display_row": display_row}
+            if row < len(clues):
+                clue = clues[row]
+                status = tile_status.get(f"{cat_idx},{row}")
+                cell["value"] = clue.get("value") or (row + 1) * 100
+                if status == "correct":
+                    cell["state"] = "correct"
+                elif status == "used" or (cat_idx, row) in used or clue.get("unavailable"):
+                    cell["state"] = "used"
+                else:
+                    cell["state"] = ""
+            else:
+                cell["value"] = None
+                cell["state"] = "used"
+            cells.append(cell)
+
+    return {
+        "headers": [cat.get("name") or "Categoría" for cat in categories],
+        "cols": len(categories),
+        "rows": len(rows),
+        "cells": cells,
+    }
+
+
+def page_key(room: Hashable, state: Any, mosaic: Optional[str] = None) -> Tuple:
+    """Llave de la página renderizada de ``state``
+
+    ``version`` solo sube con las transiciones; ``hide_answers`` se cambia
+    directo y las piezas del mosaico (``mosaic``, su id o None si todavía no
+    están) se cortan en un hilo aparte, así que cada uno entra en la llave.
+    """
+    return (room, state.version, state.images_folder, state.hide_answers, mosaic)
+
+
+class PageCache:
+    """Páginas renderizadas por llave, las más recientes primero"""
+
+    def __init__(self, size: int = PAGE_CACHE_SIZE):
+        self.size = size
+        self._pages: "OrderedDict[Hashable, Tuple[str, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> Tuple[str, str]:
+        """(html, etag) de la llave; ``render`` solo se llama si no estaba"""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+        html = render()
+        page = (html, f"{zlib.crc32(repr(key).encode('utf-8')):08x}-{len(html)}")
+        with self._lock:
+            self.misses += 1
+            self._pages[key] = page
+            while len(self._pages) > self.size:
+                self._pages.popitem(last=False)
+        return page
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pages": len(self._pages), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Límite de eventos por conexión
+
+Los equipos suelen aporrear su tecla de timbre; cada evento repetido pasaba
+por la lógica del juego y regresaba un ``error``. ``InputLimiter`` va antes
+de los manejadores de Socket.IO: cada conexión tiene una cubeta de fichas
+por evento (y por equipo, porque en una sola pantalla todos comparten la
+conexión) y los eventos idénticos dentro de una ventana corta se descartan.
+Descartar cuesta una búsqueda en un diccionario y unas restas; no se responde
+nada y solo se incrementa un contador.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Evento -> (fichas por segundo, ráfaga máxima, ventana de duplicados en segundos)
+# adjust_score, undo y redo no descartan duplicados: el moderador puede repetirlos a propósito
+EVENT_LIMITS: Dict[str, Tuple[float, float, float]] = {
+    "buzzer_press": (4.0, 2.0, 0.25),
+    "submit_answer": (4.0, 3.0, 0.5),
+    "open_question": (4.0, 3.0, 0.5),
+    "moderator_correct": (4.0, 3.0, 0.5),
+    "moderator_incorrect": (4.0, 3.0, 0.5),
+    "cancel_question": (4.0, 3.0, 0.5),
+    "timeout": (4.0, 3.0, 0.5),
+    "adjust_score": (10.0, 10.0, 0.0),
+    "set_score": (10.0, 10.0, 0.5),
+    "swap_tile": (2.0, 3.0, 0.5),
+    "undo": (5.0, 5.0, 0.0),
+    "redo": (5.0, 5.0, 0.0),
+    "clock_pong": (10.0, 8.0, 0.0),
+}
+
+# Campos del evento que separan cubetas (un equipo no gasta las fichas de otro)
+PER_PLAYER_FIELD = "player"
+
+# Campos que cambian en cada envío y no cuentan para detectar duplicados
+# (``client_ts`` es la hora del cliente en ``buzzer_press``, ver clocksync.py)
+VOLATILE_FIELDS = frozenset({"client_ts"})
+
+DROP_RATE = "rate"
+DROP_DUPLICATE = "duplicate"
+DROP_SHED = "shed"  # Sin sentido en el estado actual (p. ej. timbre con turno ya tomado)
+
+
+def payload_key(data: Any) -> Hashable:
+    """Llave comparable del contenido del evento (solo valores simples, sin ``VOLATILE_FIELDS``)"""
+    if not isinstance(data, dict):
+        return data if isinstance(data, (str, int, float, bool, type(None))) else repr(data)
+    return tuple(sorted(
+        (k, v) for k, v in data.items()
+        if k not in VOLATILE_FIELDS and isinstance(v, (str, int, float, bool, type(None)))
+    ))
+
+
+class TokenBucket:
+    """Cubeta de fichas: ``rate`` por segundo hasta ``burst``"""
+
+    __slots__ = ("tokens", "updated", "last_key", "last_at")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+        self.last_key: Hashable = None
+        self.last_at = float("-inf")
+
+    def take(self, rate: float, burst: float, now: float) -> bool:
+        tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if tokens < 1.0:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - 1.0
+        return True
+
+
+class InputLimiter:
+    """Cubetas por (conexión, evento, equipo) y contadores de lo descartado"""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[float, float, float]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limits = dict(EVENT_LIMITS if limits is None else limits)
+        self.clock = clock
+        self._buckets: Dict[Hashable, Dict[Tuple[str, Any], TokenBucket]] = {}
+        self.accepted: Counter = Counter()
+        self.dropped: Counter = Counter()  # (evento, motivo) -> cantidad
+        self._lock = threading.Lock()
+
+    def allow(self, sid: Hashable, event: str, data: Any = None) -> bool:
+        """True si el evento debe procesarse; si no, solo cuenta el descarte"""
+        limit = self.limits.get(event)
+        if limit is None:
+            return True
+        rate, burst, window = limit
+        player = data.get(PER_PLAYER_FIELD) if isinstance(data, dict) else None
+        now = self.clock()
+
+        with self._lock:
+            buckets = self._buckets.get(sid)
+            if buckets is None:
+                buckets = self._buckets[sid] = {}
+            bucket = buckets.get((event, player))
+            if bucket is None:
+                bucket = buckets[(event, player)] = TokenBucket(burst, now)
+
+            if window:
+                key = payload_key(data)
+                if key == bucket.last_key and now - bucket.last_at < window:
+                    self.dropped[(event, DROP_DUPLICATE)] += 1
+                    return False
+            if not bucket.take(rate, burst, now):
+                self.dropped[(event, DROP_RATE)] += 1
+                return False
+            if window:
+                bucket.last_key, bucket.last_at = key, now
+            self.accepted[event] += 1
+            return True
+
+    def shed(self, event: str):
+        """Cuenta un evento que el manejador descartó sin responder"""
+        with self._lock:
+            self.dropped[(event, DROP_SHED)] += 1
+
+    def forget(self, sid: Hashable):
+        """Libera las cubetas de una conexión cerrada"""
+        with self._lock:
+            self._buckets.pop(sid, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            events = set(self.accepted) | {event for event, _ in self.dropped}
+            by_event = {
+                event: {
+                    "accepted": self.accepted[event],
+                    **{reason: self.dropped[(event, reason)] for reason in (DROP_RATE, DROP_DUPLICATE, DROP_SHED)},
+                }
+                for event in sorted(events)
+            }
+            return {
+                "connections": len(self._buckets),
+                "dropped": sum(self.dropped.values()),
+                "events": by_event,
+            }
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rating de equipos entre partidas (Elo multijugador)
+
+Cada partida se descompone en enfrentamientos por pares: el equipo con más
+puntos "gana" a cada uno de los que quedaron debajo (empate si igualan). El
+rating se actualiza al terminar cada partida y el historial completo se
+guarda en ``data/ratings.jsonl`` para poder recalcularlo de una vez.
+
+El recálculo aplana el historial en columnas ``array`` de pares (equipo A,
+equipo B, resultado) y las recorre por periodos: dentro de un periodo todos
+los esperados se calculan con los ratings del inicio, como en Glicko, así
+que cada periodo es una sola pasada sobre las columnas.
+"""
+import json
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from tournament import group_sizes
+
+RATINGS_PATH = "data/ratings.jsonl"
+DEFAULT_RATING = 1500.0
+K_FACTOR = 32.0
+ELO_SCALE = 400.0
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    """Probabilidad de ganar según la diferencia de rating"""
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / ELO_SCALE))
+
+
+def seeded_groups(teams_by_rating: Sequence[str], teams_per_match: int = 2) -> List[List[str]]:
+    """Reparte en serpentina: con partidas de 2 queda 1 vs N, 2 vs N-1, ...
+
+    Hay tantas partidas como en ``tournament.group_sizes``, así ninguna
+    pasa de ``teams_per_match`` equipos.
+    """
+    teams_per_match = max(2, int(teams_per_match))
+    group_count = max(1, len(group_sizes(len(teams_by_rating), teams_per_match)))
+    groups: List[List[str]] = [[] for _ in range(group_count)]
+    for idx, team in enumerate(teams_by_rating):
+        lap, pos = divmod(idx, group_count)
+        groups[pos if lap % 2 == 0 else group_count - 1 - pos].append(team)
+    return groups
+
+
+class RatingEngine:
+    """Ratings por equipo con historial de partidas persistente
+
+    El historial se lee y recalcula al primer uso, no al arrancar el servidor.
+    """
+
+    def __init__(self, path: Optional[str] = RATINGS_PATH, k_factor: float = K_FACTOR):
+        self.path = Path(path) if path else None
+        self.k_factor = k_factor
+        self.ratings: Dict[str, float] = {}
+        self.played: Dict[str, int] = {}
+        self.history: List[Dict[str, Any]] = []
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Un solo flush escribiendo a la vez
+        self._loaded = self.path is None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path.exists():
+            self._load()
+            self.recompute()
+
+    # ---------------------
+    # Persistencia
+    # ---------------------
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Línea cortada por un cierre inesperado
+                if len(entry.get("teams", ())) >= 2 and len(entry["teams"]) == len(entry.get("scores", ())):
+                    self.history.append(entry)
+
+    def flush(self):
+        """Agrega al archivo las partidas pendientes (pensado para un hilo de E/S)
+
+        El candado de escritura atiende de uno en uno los flush que llegan a
+        la vez desde el grupo de hilos, así las partidas quedan en orden.
+        """
+        if self.path is None:
+            return
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in pending))
+
+    # ---------------------
+    # Actualización incremental
+    # ---------------------
+
+    def rating(self, team: str) -> float:
+        self._ensure_loaded()
+        return self.ratings.get(team, DEFAULT_RATING)
+
+    def record_match(self, teams: Sequence[str], scores: Sequence[int], ts: Optional[float] = None) -> Dict[str, Any]:
+        """Registra una partida terminada y actualiza los ratings de sus equipos"""
+        self._ensure_loaded()
+        names = [str(t).strip() for t in teams]
+        if len(names) < 2 or len(names) != len(scores):
+            return {"error": "Se necesitan al menos dos equipos con su puntaje"}
+        if len(set(names)) != len(names) or not all(names):
+            return {"error": "Hay equipos repetidos o sin nombre"}
+        try:
+            points = [int(s) for s in scores]
+        except (TypeError, ValueError):
+            return {"error": "Puntaje inválido"}
+
+        entry = {"ts": ts or time.time(), "teams": names, "scores": points}
+        before = {team: self.rating(team) for team in names}
+        deltas = self._match_deltas(names, points, before)
+        for team in names:
+            self.ratings[team] = before[team] + deltas[team]
+            self.played[team] = self.played.get(team, 0) + 1
+
+        with self._lock:
+            self.history.append(entry)
+            self._pending.append(entry)
+
+        return {
+            "success": True,
+            "changes": [
+                {"team": team, "rating": round(self.ratings[team], 1), "delta": round(deltas[team], 1)}
+                for team in names
+            ],
+        }
+
+    def _match_deltas(self, teams: List[str], scores: List[int], ratings: Dict[str, float]) -> Dict[str, float]:
+        """Cambio de rating de cada equipo: suma de (real - esperado) por par"""
+        k = self.k_factor / (len(teams) - 1)
+        deltas = dict.fromkeys(teams, 0.0)
+        for i, a in enumerate(teams):
+            for j in range(i + 1, len(teams)):
+                b = teams[j]
+                actual = 1.0 if scores[i] > scores[j] else 0.0 if scores[i] < scores[j] else 0.5
+                change = k * (actual - expected_score(ratings[a], ratings[b]))
+                deltas[a] += change
+                deltas[b] -= change
+        return deltas
+
+    # ---------------------
+    # Recálculo por lotes
+    # ---------------------
+
+    def recompute(self, period_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Recalcula todos los ratings desde el historial
+
+        Sin ``period_seconds`` cada partida es su propio periodo y el resultado
+        coincide con la actualización incremental. Con un periodo (p. ej. una
+        semana) los esperados de todas las partidas del periodo usan los
+        ratings de su inicio.
+        """
+        self._ensure_loaded()
+        started = time.perf_counter()
+        with self._lock:
+            history = list(self.history)
+
+        team_ids: Dict[str, int] = {}
+        played: List[int] = []
+        pair_a, pair_b = array("I"), array("I")
+        pair_actual, pair_k = array("d"), array("d")
+        period_ends = array("I")  # Índice final de pares por periodo
+        period_start = None
+
+        for entry in sorted(history, key=lambda e: e["ts"]):
+            if period_seconds is None or period_start is None or entry["ts"] - period_start >= period_seconds:
+                if len(pair_a):
+                    period_ends.append(len(pair_a))
+                period_start = entry["ts"]
+            ids = []
+            for team in entry["teams"]:
+                team_id = team_ids.get(team)
+                if team_id is None:
+                    team_id = team_ids[team] = len(played)
+                    played.append(0)
+                played[team_id] += 1
+                ids.append(team_id)
+            scores = entry["scores"]
+            k = self.k_factor / (len(ids) - 1)
+            for i in range(len(ids)):
+                for j in range(i + 1, len(ids)):
+                    pair_a.append(ids[i])
+                    pair_b.append(ids[j])
+                    pair_actual.append(1.0 if scores[i] > scores[j] else 0.0 if scores[i] < scores[j] else 0.5)
+                    pair_k.append(k)
+        if not period_ends or period_ends[-1] != len(pair_a):
+            period_ends.append(len(pair_a))
+
+        ratings = [DEFAULT_RATING] * len(played)
+        deltas = [0.0] * len(played)
+        start = 0
+        for stop in period_ends:
+            a_ids, b_ids = pair_a[start:stop], pair_b[start:stop]
+            for a, b, actual, k in zip(a_ids, b_ids, pair_actual[start:stop], pair_k[start:stop]):
+                change = k * (actual - 1.0 / (1.0 + 10.0 ** ((ratings[b] - ratings[a]) / ELO_SCALE)))
+                deltas[a] += change
+                deltas[b] -= change
+            for team_id in set(a_ids) | set(b_ids):
+                ratings[team_id] += deltas[team_id]
+                deltas[team_id] = 0.0
+            start = stop
+
+        names = list(team_ids)
+        self.ratings = dict(zip(names, ratings))
+        self.played = dict(zip(names, played))
+        return {
+            "success": True,
+            "matches": len(history),
+            "pairs": len(pair_a),
+            "teams": len(names),
+            "elapsed": round(time.perf_counter() - started, 4),
+        }
+
+    # ---------------------
+    # Consultas
+    # ---------------------
+
+    def standings(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        order = sorted(self.ratings, key=lambda t: (-self.ratings[t], t))
+        if limit is not None:
+            order = order[:limit]
+        return [
+            {"rank": idx + 1, "team": team, "rating": round(self.ratings[team], 1), "played": self.played.get(team, 0)}
+            for idx, team in enumerate(order)
+        ]
+
+    def seeded_matchups(self, teams: Sequence[str], teams_per_match: int = 2) -> List[List[str]]:
+        """Partidas de la siguiente ronda sembradas por rating (equipos nuevos al final)"""
+        order = sorted(teams, key=lambda t: (-self.rating(t), t))
+        return seeded_groups(order, teams_per_match)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Grabación y reproducción determinista de partidas
+
+``EventRecorder`` se engancha a ``GameState.event_listener`` y guarda cada
+transición (carga de tablero, abrir, timbre, respuesta, tiempo agotado,
+ajustes de puntaje...) con un resumen del estado resultante en
+``data/recordings/<partida>-<fecha>.jsonl``. ``replay_recording`` aplica esos
+eventos a un ``GameState`` nuevo, sin red ni Socket.IO, comprueba que cada
+resumen coincida y mide transiciones por segundo y memoria por transición.
+
+Uso (sin archivos se genera una partida sintética determinista):
+    python replay.py [data/recordings/main-*.jsonl ...] [--repeat 50] [--json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import game_logic
+
+RECORDINGS_DIR = "data/recordings"
+MAX_RECORDINGS = 50  # Se conservan las más recientes
+REPLAY_REPEAT = 50
+
+# Transiciones que se pueden reproducir (métodos de GameState más "load")
+REPLAYABLE = {
+    "load", "reset_game", "open_question", "buzzer_press", "submit_answer",
+    "moderator_correct", "moderator_incorrect", "replace_clue", "cancel_question",
+    "timeout", "adjust_score", "set_score", "set_player_count", "undo", "redo",
+}
+
+
+def _header(key: str, state: game_logic.GameState) -> Dict[str, Any]:
+    """Estado inicial de una grabación: tablero, equipos y puntajes"""
+    return {
+        "key": key,
+        "started": time.time(),
+        "board": state.data,
+        "player_count": state.player_count,
+        "scores": state.player_scores,
+        "fingerprint": state.fingerprint(),
+    }
+
+
+class EventRecorder:
+    """Graba las transiciones de uno o varios ``GameState`` (uno por partida)
+
+    Cada carga de tablero empieza una grabación nueva. Si la primera
+    transición no es una carga (p. ej. el tablero de ejemplo con el que
+    arranca el servidor), el encabezado es el estado tomado al engancharse,
+    porque el oyente recibe el estado ya modificado. Las líneas se juntan en
+    memoria y ``flush`` las agrega a disco (pensado para un hilo de E/S).
+    """
+
+    def __init__(self, directory: Optional[str] = RECORDINGS_DIR, max_files: int = MAX_RECORDINGS):
+        self.directory = Path(directory) if directory else None
+        self.max_files = max_files
+        self._paths: Dict[str, Path] = {}
+        self._started: Dict[str, float] = {}
+        self._pending: List[Tuple[Path, str]] = []
+        self._sequence = 0
+        self._memory: Dict[str, List[Any]] = {}  # Sin directorio: grabaciones en memoria
+        self._baselines: Dict[str, Dict[str, Any]] = {}  # Encabezado tomado al engancharse
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Un solo flush escribiendo a la vez
+
+    def attach(self, state: game_logic.GameState, key: str = "main"):
+        state.event_listener = self.listener(key, state)
+
+    def listener(self, key: str, state: Optional[game_logic.GameState] = None):
+        """Función para ``GameState.event_listener`` que graba bajo ``key``
+
+        Con ``state`` se toma en ese momento el estado inicial de la
+        grabación, por si la primera transición no es una carga de tablero.
+        """
+        if state is not None:
+            with self._lock:
+                self._baselines[key] = _header(key, state)
+
+        def on_event(state: game_logic.GameState, name: str, args: tuple):
+            self.record(key, state, name, args)
+        return on_event
+
+    def record(self, key: str, state: game_logic.GameState, name: str, args: tuple):
+        with self._lock:
+            if name == "load" or key not in self._started:
+                self._start(key, state, name)
+            if name == "load":
+                return  # El tablero ya va en el encabezado
+            line = [round(time.monotonic() - self._started[key], 4), name, list(args), state.fingerprint()]
+            self._write(key, line)
+
+    def _start(self, key: str, state: game_logic.GameState, name: str):
+        self._started[key] = time.monotonic()
+        header = _header(key, state)
+        baseline = self._baselines.pop(key, None)
+        if baseline is not None and name != "load":
+            # ``state`` ya tiene aplicada la transición ``name``
+            header = {**baseline, "started": header["started"]}
+        if self.directory is None:
+            self._memory[key] = [header]
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        safe_key = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in key)
+        self._sequence += 1
+        path = self.directory / f"{safe_key}-{stamp}-{self._sequence:03d}.jsonl"
+        self._paths[key] = path
+        self._pending.append((path, json.dumps(header, ensure_ascii=False)))
+
+    def _write(self, key: str, line: List[Any]):
+        if self.directory is None:
+            self._memory[key].append(line)
+        else:
+            self._pending.append((self._paths[key], json.dumps(line, ensure_ascii=False)))
+
+    def recording(self, key: str = "main") -> Tuple[Dict[str, Any], List[List[Any]]]:
+        """Grabación en memoria (solo sin directorio)"""
+        header, *events = self._memory[key]
+        return header, events
+
+    def flush(self):
+        """Agrega a disco las líneas pendientes"""
+        if self.directory is None:
+            return
+        # Los flush llegan a la vez desde el grupo de hilos: de uno en uno para
+        # que el encabezado y las líneas queden en orden
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            by_path: Dict[Path, List[str]] = {}
+            for path, line in pending:
+                by_path.setdefault(path, []).append(line)
+            new_files = False
+            for path, lines in by_path.items():
+                new_files = new_files or not path.exists()
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            if new_files:
+                self._prune()
+
+    def _prune(self):
+        files = sorted(self.directory.glob("*.jsonl"), key=lambda p: p.stat().st_mtime, reverse=True)
+        active = set(self._paths.values())
+        for old in files[self.max_files:]:
+            if old not in active:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+
+
+def load_recording(path: str) -> Tuple[Dict[str, Any], List[List[Any]]]:
+    """Encabezado y eventos de un archivo de grabación"""
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        events = []
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                break  # Línea cortada por un cierre inesperado
+    return header, events
+
+
+# ---------------------
+# Reproducción
+# ---------------------
+
+def initial_state(header: Dict[str, Any]) -> game_logic.GameState:
+    state = game_logic.GameState()
+    state.data = header["board"]
+    state.set_player_count(header["player_count"])
+    for idx, score in enumerate(header.get("scores", ())):
+        state.set_score(idx, score)
+    state.clear_history()  # Armar el estado inicial no es algo que se pueda deshacer
+    return state
+
+
+def apply_event(state: game_logic.GameState, name: str, args: List[Any]):
+    if name not in REPLAYABLE:
+        raise ValueError(f"Evento no reproducible: {name}")
+    if name == "load":
+        state.data = args[0]
+        return None
+    return getattr(state, name)(*args)
+
+
+class _NullWriter(io.TextIOBase):
+    """Descarta los mensajes de depuración de ``GameState`` durante la reproducción"""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def verify_recording(header: Dict[str, Any], events: List[List[Any]]) -> Dict[str, Any]:
+    """Reproduce una vez comparando el resumen del estado tras cada evento"""
+    state = initial_state(header)
+    if state.fingerprint() != header.get("fingerprint", state.fingerprint()):
+        return {"ok": False, "diverged_at": -1, "error": "El estado inicial no coincide"}
+    for idx, (_, name, args, expected) in enumerate(events):
+        apply_event(state, name, args)
+        if state.fingerprint() != expected:
+            return {"ok": False, "diverged_at": idx, "event": name, "args": args}
+    return {"ok": True, "events": len(events), "scores": state.player_scores}
+
+
+def replay_recording(header: Dict[str, Any], events: List[List[Any]], repeat: int = REPLAY_REPEAT) -> Dict[str, Any]:
+    """Verifica la grabación y mide el costo de las transiciones de ``GameState``"""
+    with contextlib.redirect_stdout(_NullWriter()):
+        return _replay(header, events, repeat)
+
+
+def _replay(header: Dict[str, Any], events: List[List[Any]], repeat: int) -> Dict[str, Any]:
+    check = verify_recording(header, events)
+    if not check["ok"]:
+        return {"error": "La reproducción no coincide con la grabación", **check}
+
+    # Velocidad: solo transiciones, el estado inicial se arma fuera del cronómetro
+    calls = [(name, args) for _, name, args, _ in events]
+    elapsed = 0.0
+    for _ in range(max(1, repeat)):
+        state = initial_state(header)
+        started = time.perf_counter()
+        for name, args in calls:
+            apply_event(state, name, args)
+        elapsed += time.perf_counter() - started
+    transitions = len(calls) * max(1, repeat)
+
+    # Memoria: pico de bytes asignados durante cada transición (una pasada con tracemalloc)
+    state = initial_state(header)
+    peak_total = 0
+    tracemalloc.start()
+    try:
+        for name, args in calls:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            apply_event(state, name, args)
+            peak_total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "success": True,
+        "events": len(calls),
+        "transitions": transitions,
+        "elapsed": round(elapsed, 4),
+        "transitions_per_second": round(transitions / elapsed) if elapsed else None,
+        "us_per_transition": round(elapsed / transitions * 1e6, 3) if transitions else None,
+        "bytes_per_transition": round(peak_total / len(calls), 1) if calls else None,
+        "scores": check["scores"],
+    }
+
+
+def synthetic_recording(seed: int = 0, questions: int = 25, teams: int = 5) -> Tuple[Dict[str, Any], List[List[Any]]]:
+    """Partida completa generada con una semilla: la misma semilla da la misma partida"""
+    rng = random.Random(seed)
+    board = {
+        "categories": [
+            {
+                "name": f"Categoría {c + 1}",
+                "clues": [
+                    {"value": 100 * (v + 1), "question": f"Pregunta {c}-{v}", "choices": ["A", "B", "C", "D"], "answer": rng.randrange(4)}
+                    for v in range(5)
+                ],
+            }
+            for c in range((questions + 4) // 5)
+        ]
+    }
+    recorder = EventRecorder(directory=None)
+    state = game_logic.GameState()
+    recorder.attach(state, "synthetic")
+    state.data = board
+    state.set_player_count(teams)
+
+    tiles = [(c, v) for c in range(len(board["categories"])) for v in range(5)][:questions]
+    rng.shuffle(tiles)
+    with contextlib.redirect_stdout(_NullWriter()):
+        _play(state, rng, tiles, teams)
+    return recorder.recording("synthetic")
+
+
+def _play(state: game_logic.GameState, rng: random.Random, tiles: List[Tuple[int, int]], teams: int):
+    for cat_idx, clue_idx in tiles:
+        state.open_question(cat_idx, clue_idx)
+        while state.current_question is not None:
+            roll = rng.random()
+            if roll < 0.05:
+                state.cancel_question()
+                break
+            remaining = [p for p in range(teams) if p not in state.tried_players]
+            state.buzzer_press(rng.choice(remaining))
+            state.buzzer_press(rng.choice(remaining))  # Llega tarde y se rechaza
+            if roll < 0.15:
+                state.timeout()
+            else:
+                state.submit_answer(state.current_buzzer, rng.randrange(4))
+        if rng.random() < 0.1:
+            state.adjust_score(rng.randrange(teams), rng.choice((-100, 100)))
+        if rng.random() < 0.05:
+            state.undo()  # El moderador se equivocó de equipo...
+            if rng.random() < 0.5:
+                state.redo()  # ...o no
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reproduce partidas grabadas y mide GameState")
+    parser.add_argument("recordings", nargs="*", help="Archivos .jsonl de data/recordings")
+    parser.add_argument("--repeat", type=int, default=REPLAY_REPEAT)
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de la partida sintética")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    if args.recordings:
+        runs = [(path, load_recording(path)) for path in args.recordings]
+    else:
+        runs = [(f"sintética (semilla {args.seed})", synthetic_recording(args.seed))]
+
+    results = {}
+    failed = False
+    for name, (header, events) in runs:
+        result = replay_recording(header, events, args.repeat)
+        results[name] = result
+        failed = failed or "error" in result
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for name, r in results.items():
+            if "error" in r:
+                print(f"❌ {name}: {r['error']} (evento {r.get('diverged_at')})")
+                continue
+            print(
+                f"✅ {name}: {r['events']} eventos · {r['transitions_per_second']:,} transiciones/s · "
+                f"{r['us_per_transition']} µs · {r['bytes_per_transition']} B por transición"
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,7 +13,8 @@ const gameState = {
     timerInterval: null,
     contextMenuPlayer: null,
     playerCount: 5,
-    scores: []
+    scores: [],
+    boardVersion: null
 };
 
 // Ocultar splash screen después de 10 segundos
@@ -26,9 +27,53 @@ window.addEventListener('load', () => {
     }, 10000); // 10 segundos
 });
 
-// Conexión WebSocket
+// Conexión WebSocket (JSON o MessagePack, según el cliente que cargó la página)
+const socketTransport = window.PAINANI_TRANSPORT || 'json';
 const socket = io();
 
+// Si el servidor cambió de serialización desde que se cargó la página,
+// los paquetes no se pueden leer: recargar trae el cliente correcto
+socket.on('connect_error', () => {
+    fetch('/api/transport')
+        .then(r => r.json())
+        .then(data => {
+            if (data.transport && data.transport !== socketTransport) {
+                window.location.reload();
+            }
+        })
+        .catch(() => {});
+});
+
+// Partida de torneo (la URL incluye ?match=R1M1)
+const matchId = new URLSearchParams(window.location.search).get('match');
+
+function emitGame(event, payload = {}) {
+    if (matchId) {
+        payload.match = matchId;
+    }
+    socket.emit(event, payload);
+}
+
+function apiUrl(path) {
+    return matchId ? `${path}?match=${encodeURIComponent(matchId)}` : path;
+}
+
+// Reloj del cliente para sincronizar timbres (el servidor estima el desfase con clock_ping)
+function clientClock() {
+    return performance.timeOrigin + performance.now();
+}
+
+socket.on('clock_ping', (data) => {
+    socket.emit('clock_pong', { id: data.id, client: clientClock() });
+});
+
+socket.on('connect', () => {
+    console.log(`🔌 Conectado (${socketTransport})`);
+    if (matchId) {
+        socket.emit('join_match', { match: matchId });
+    }
+});
+
 // Elementos del DOM
 const elements = {
     board: document.getElementById('board'),
@@ -62,6 +107,7 @@ const mosaic = (() => {
     const state = {
         enabled: false,
         imageUrl: null,
+        tileBase: null,
         totalPieces: 0,
         revealedPieces: 0,
         grid: { rows: 0, cols: 0 },
@@ -76,6 +122,7 @@ const mosaic = (() => {
     function resetState() {
         state.enabled = false;
         state.imageUrl = null;
+        state.tileBase = null;
         state.totalPieces = 0;
         state.revealedPieces = 0;
         state.revealedPiecesSet = new Set();
@@ -160,9 +207,16 @@ const mosaic = (() => {
 
         cell.classList.add('mosaic-visible');
         cell.style.background = 'none';
-        cell.style.backgroundImage = `url('${state.imageUrl}')`;
-        cell.style.backgroundPosition = `${posX}% ${posY}%`;
-        cell.style.backgroundSize = `${sizeW}% ${sizeH}%`;
+        if (state.tileBase) {
+            // Pieza servida por el servidor (solo existe si la casilla ya se jugó)
+            cell.style.backgroundImage = `url('${apiUrl(`${state.tileBase}/${catIdx}/${normalizedRow}`)}')`;
+            cell.style.backgroundPosition = 'center';
+            cell.style.backgroundSize = '100% 100%';
+        } else {
+            cell.style.backgroundImage = `url('${state.imageUrl}')`;
+            cell.style.backgroundPosition = `${posX}% ${posY}%`;
+            cell.style.backgroundSize = `${sizeW}% ${sizeH}%`;
+        }
         cell.style.backgroundRepeat = 'no-repeat';
         cell.style.color = 'transparent';
 
@@ -294,7 +348,7 @@ const mosaic = (() => {
     }
 
     function setup() {
-        return fetch('/api/board')
+        return fetch(apiUrl('/api/board'))
             .then(r => r.json())
             .then(data => {
                 const categories = data.categories || [];
@@ -345,14 +399,38 @@ const mosaic = (() => {
         testImg.src = mosaicUrl;
     }
 
+    function syncRevealed(tileStatus) {
+        // Tras deshacer/rehacer: las piezas visibles son las casillas correctas
+        state.revealedPiecesSet = new Set();
+        Object.entries(tileStatus || {}).forEach(([key, status]) => {
+            if (status === 'correct') {
+                state.revealedPiecesSet.add(key.replace(',', '-'));
+            }
+        });
+        recalculateProgress();
+        applyToBoard();
+    }
+
+    function initializeTiles(tiles) {
+        // Mosaico cortado en el servidor: nunca se descarga la imagen completa
+        resetState();
+        state.enabled = true;
+        state.tileBase = `/api/tiles/${tiles.id}`;
+        state.imageUrl = state.tileBase;
+        console.log('🎨 Mosaico por piezas:', tiles.cols, 'x', tiles.rows);
+        setup();
+    }
+
     return {
         state,
         initialize,
+        initializeTiles,
         revealPiece,
         applyToBoard,
         updateLayout,
         getDisplayRowIndex,
-        recalculateProgress
+        recalculateProgress,
+        syncRevealed
     };
 })();
 
@@ -379,25 +457,37 @@ const sounds = {
 // ===========================
 
 socket.on('connected', (data) => {
+    if (matchId && !data.match) {
+        return;  // Se espera el estado de la partida tras join_match
+    }
     console.log('📊 Estado inicial recibido');
+    setStatus('Selecciona una casilla para abrir una pregunta', 'info');
+    if (data.board.version !== undefined && data.board.version === gameState.boardVersion) {
+        return;  // La página ya trae este estado (primera pintura del servidor)
+    }
     if (data.game_state && typeof data.game_state.player_count === 'number') {
         gameState.playerCount = data.game_state.player_count;
     }
 
     renderBoard(data.board);
     updateScores(data.board.scores);
-    setStatus('Selecciona una casilla para abrir una pregunta', 'info');
+    initializeMosaic(data.images_folder, data.mosaic_tiles);
+});
 
-    // Inicializar mosaico
-    fetch('/api/images-folder')
+function initializeMosaic(imagesFolder, mosaicTiles) {
+    if (imagesFolder !== undefined) {
+        if (mosaicTiles) {
+            mosaic.initializeTiles(mosaicTiles);
+        } else if (imagesFolder) {
+            mosaic.initialize(imagesFolder);
+        }
+        return;
+    }
+    fetch(apiUrl('/api/images-folder'))
         .then(r => r.json())
-        .then(result => {
-            if (result.images_folder) {
-                mosaic.initialize(result.images_folder);
-            }
-        })
+        .then(result => initializeMosaic(result.images_folder || null, result.mosaic_tiles))
         .catch(err => console.log('No hay carpeta de imágenes'));
-});
+}
 
 // ===========================
 // EVENTOS DEL SERVIDOR
@@ -525,7 +615,7 @@ socket.on('close_question', () => {
     updateControlsMode();
     
     // Recargar tablero
-    fetch('/api/board')
+    fetch(apiUrl('/api/board'))
         .then(r => r.json())
         .then(data => renderBoard(data));
 });
@@ -545,14 +635,71 @@ socket.on('game_reset', (data) => {
     clearChoiceSelection();
     
     // Reinicializar mosaico
-    fetch('/api/images-folder')
-        .then(r => r.json())
-        .then(result => {
-            if (result.images_folder) {
-                mosaic.initialize(result.images_folder);
-            }
-        })
-        .catch(err => console.log('No hay carpeta de imágenes'));
+    initializeMosaic();
+});
+
+socket.on('tile_swapped', (data) => {
+    console.log('🔄 Casilla cambiada:', data.cat_idx, data.clue_idx);
+    renderBoard(data.board);
+    setStatus('Pregunta cambiada', 'info');
+});
+
+socket.on('state_restored', (data) => {
+    console.log('↶ Estado restaurado:', data);
+    const state = data.game_state || {};
+    const scores = state.scores || [];
+
+    stopTimer();
+    stopAllSounds();
+    if (state.player_count && state.player_count !== gameState.playerCount) {
+        gameState.playerCount = state.player_count;
+        renderPlayers(scores);
+    }
+    renderBoard(data.board);
+    updateScores(scores);
+    mosaic.syncRevealed(data.board.tile_status);
+
+    gameState.currentQuestion = data.question;
+    gameState.currentBuzzer = (typeof state.current_buzzer === 'number') ? state.current_buzzer : null;
+    gameState.triedPlayers = new Set(state.tried_players || []);
+    gameState.selectedAnswer = -1;
+    gameState.answerPending = false;
+    clearChoiceSelection();
+
+    if (data.question) {
+        showQuestionPanel(data.question);
+        enableBuzzers(true);
+        refreshBuzzerState();
+        enableChoices(gameState.currentBuzzer !== null && !gameState.hideAnswers);
+    } else {
+        closeQuestionPanel();
+        gameState.currentQuestion = null;
+        enableBuzzers(false);
+    }
+    updateControlsMode();
+    const label = data.action === 'redo' ? 'Acción rehecha' : 'Acción deshecha';
+    setStatus(`${label} (${data.undo_steps} por deshacer, ${data.redo_steps} por rehacer)`, 'info');
+});
+
+socket.on('import_progress', (data) => {
+    const stages = { receiving: 'Recibiendo', extracting: 'Extrayendo', validating: 'Validando' };
+    const label = stages[data.stage] || 'Importando';
+    const detail = data.stage === 'validating' ? ` ${data.done}/${data.total}` : '';
+    setStatus(`${label} bancos...${detail}`, 'info');
+});
+
+socket.on('import_done', (data) => {
+    if (!data.success) {
+        setStatus(data.error || 'Error al importar bancos', 'incorrect');
+        return;
+    }
+    const banks = data.banks || [];
+    const withIssues = banks.filter(b => (b.errors || []).length || (b.missing_images || []).length);
+    console.log('📦 Importación terminada:', banks);
+    setStatus(
+        `Importados ${banks.length} bancos` + (withIssues.length ? ` (${withIssues.length} con advertencias)` : ''),
+        withIssues.length ? 'info' : 'correct'
+    );
 });
 
 socket.on('hide_answers_toggled', (data) => {
@@ -623,6 +770,10 @@ function renderBoard(data) {
                     cell.classList.add('used');
                 } else {
                     cell.onclick = () => openQuestion(catIdx, row);
+                    cell.oncontextmenu = (event) => {
+                        event.preventDefault();
+                        swapTile(catIdx, row);
+                    };
                 }
             } else {
                 cell.textContent = '—';
@@ -655,6 +806,8 @@ function renderBoard(data) {
         document.head.appendChild(style);
     }
 
+    gameState.boardVersion = data.version;
+
     // Asegurar que estamos en modo tablero
     gameState.currentQuestion = null;
     updateControlsMode();
@@ -668,6 +821,34 @@ function renderBoard(data) {
     }
 }
 
+function hydrateBoard(data) {
+    // El servidor ya dibujó el tablero (templates/index.html): solo se conectan los eventos
+    const categories = data.categories || [];
+    const layout = computeBoardLayout(categories);
+    const cells = elements.board.querySelectorAll('.board-cell.clue');
+    if (cells.length === 0 || cells.length !== layout.rowOrder.length * layout.cols) {
+        renderBoard(data);
+        return;
+    }
+
+    cells.forEach(cell => {
+        if (cell.classList.contains('used') || cell.classList.contains('correct')) return;
+        const catIdx = parseInt(cell.dataset.catIdx, 10);
+        const row = parseInt(cell.dataset.clueIdx, 10);
+        cell.onclick = () => openQuestion(catIdx, row);
+        cell.oncontextmenu = (event) => {
+            event.preventDefault();
+            swapTile(catIdx, row);
+        };
+    });
+
+    gameState.boardVersion = data.version;
+    gameState.currentQuestion = null;
+    updateControlsMode();
+    mosaic.updateLayout(layout);
+    mosaic.applyToBoard();
+}
+
 function computeBoardLayout(categories) {
     const cols = categories.length;
     const maxClues = Math.max(...categories.map(c => c.clues?.length || 0), 0);
@@ -704,6 +885,51 @@ function computeBoardLayout(categories) {
 // PANEL DE PREGUNTA
 // ===========================
 
+function buildTiledImage(tiles) {
+    // Imagen por piezas: el servidor solo entrega las que ya reveló
+    const grid = document.createElement('div');
+    grid.id = 'question-image';
+    grid.className = 'image-tiles';
+    grid.dataset.tileset = tiles.id;
+    grid.style.gridTemplateColumns = `repeat(${tiles.cols}, 1fr)`;
+    grid.style.aspectRatio = `${tiles.width} / ${tiles.height}`;
+
+    for (let row = 0; row < tiles.rows; row++) {
+        for (let col = 0; col < tiles.cols; col++) {
+            const piece = document.createElement('div');
+            piece.className = 'image-tile';
+            piece.dataset.col = col;
+            piece.dataset.row = row;
+            grid.appendChild(piece);
+        }
+    }
+    revealTiles(grid, tiles.revealed || []);
+    return grid;
+}
+
+function revealTiles(grid, tiles) {
+    tiles.forEach(([col, row]) => {
+        const piece = grid.querySelector(`.image-tile[data-col="${col}"][data-row="${row}"]`);
+        if (!piece || piece.classList.contains('revealed')) return;
+        const img = document.createElement('img');
+        img.src = apiUrl(`/api/tiles/${grid.dataset.tileset}/${col}/${row}`);
+        img.alt = '';
+        piece.appendChild(img);
+        piece.classList.add('revealed');
+    });
+}
+
+socket.on('image_tiles', (data) => {
+    const tiles = gameState.currentQuestion?.tiles;
+    if (tiles && tiles.id === data.id) {
+        tiles.revealed = (tiles.revealed || []).concat(data.tiles);
+    }
+    const grid = document.querySelector(`#question-image.image-tiles[data-tileset="${data.id}"]`);
+    if (grid) {
+        revealTiles(grid, data.tiles);
+    }
+});
+
 function clearChoiceSelection() {
     document.querySelectorAll('.choice-option').forEach(option => {
         option.classList.remove('selected');
@@ -755,7 +981,12 @@ function showQuestionPanel(question) {
     contentWrapper.appendChild(choicesWrapper);
     
     // Manejar imagen si existe (se agrega DESPUÉS para que aparezca a la derecha)
-    if (hasImage) {
+    if (hasImage && question.tiles) {
+        const imageContainer = document.createElement('div');
+        imageContainer.id = 'question-image-container';
+        imageContainer.appendChild(buildTiledImage(question.tiles));
+        contentWrapper.appendChild(imageContainer);
+    } else if (hasImage) {
         const imageContainer = document.createElement('div');
         imageContainer.id = 'question-image-container';
         
@@ -920,12 +1151,24 @@ function enableChoices(enable) {
 // ACCIONES DEL JUEGO
 // ===========================
 
+function swapTile(catIdx, clueIdx, questionId) {
+    // Clic derecho en una casilla: cambiarla por otra de la misma categoría y valor
+    if (gameState.currentQuestion) return;
+    if (!questionId && !confirm('¿Cambiar esta pregunta por otra de la misma categoría y valor?')) return;
+    const payload = { cat_idx: catIdx, clue_idx: clueIdx };
+    if (questionId) {
+        payload.question_id = questionId;
+    }
+    emitGame('swap_tile', payload);
+}
+
 function openQuestion(catIdx, clueIdx) {
     console.log('🎯 Abriendo pregunta:', catIdx, clueIdx);
-    socket.emit('open_question', { cat_idx: catIdx, clue_idx: clueIdx });
+    emitGame('open_question', { cat_idx: catIdx, clue_idx: clueIdx });
 }
 
 function pressBuzzer(playerIdx) {
+    const pressedAt = clientClock();
     if (playerIdx < 0 || playerIdx >= gameState.playerCount) {
         return;
     }
@@ -936,7 +1179,7 @@ function pressBuzzer(playerIdx) {
     }
 
     console.log('🔔 Presionando buzzer:', playerIdx);
-    socket.emit('buzzer_press', { player: playerIdx });
+    emitGame('buzzer_press', { player: playerIdx, client_ts: pressedAt });
 }
 
 function submitAnswer() {
@@ -964,7 +1207,7 @@ function submitAnswer() {
 
     gameState.answerPending = true;
 
-    socket.emit('submit_answer', {
+    emitGame('submit_answer', {
         player: gameState.currentBuzzer,
         answer: gameState.selectedAnswer
     });
@@ -977,7 +1220,7 @@ function moderatorCorrect() {
     }
     
     console.log('✅ Moderador: Correcto');
-    socket.emit('moderator_correct', { player: gameState.currentBuzzer });
+    emitGame('moderator_correct', { player: gameState.currentBuzzer });
 }
 
 function moderatorIncorrect() {
@@ -987,18 +1230,26 @@ function moderatorIncorrect() {
     }
     
     console.log('❌ Moderador: Incorrecto');
-    socket.emit('moderator_incorrect', { player: gameState.currentBuzzer });
+    emitGame('moderator_incorrect', { player: gameState.currentBuzzer });
 }
 
 function cancelQuestion() {
     console.log('🚫 Cancelando pregunta');
-    socket.emit('cancel_question');
+    emitGame('cancel_question');
     stopAllSounds();
 }
 
+function undoAction() {
+    emitGame('undo');
+}
+
+function redoAction() {
+    emitGame('redo');
+}
+
 function toggleHideAnswers() {
     gameState.hideAnswers = elements.hideAnswersCheckbox.checked;
-    socket.emit('toggle_hide_answers', { hide: gameState.hideAnswers });
+    emitGame('toggle_hide_answers', { hide: gameState.hideAnswers });
     
     // Si hay una pregunta abierta, actualizar vista
     if (gameState.currentQuestion) {
@@ -1028,6 +1279,11 @@ function handleFileSelection(event) {
     console.log('📁 Archivo seleccionado:', file.name);
     setStatus(`Cargando ${file.name}...`, 'info');
 
+    if (file.name.toLowerCase().endsWith('.zip')) {
+        importBankArchive(file, input);
+        return;
+    }
+
     const formData = new FormData();
     formData.append('file', file);
 
@@ -1056,6 +1312,38 @@ function handleFileSelection(event) {
         });
 }
 
+function importBankArchive(file, input, replace = false) {
+    // El ZIP va como cuerpo de la petición para que el servidor lo guarde conforme llega;
+    // el avance y el resultado llegan por los eventos import_progress / import_done
+    fetch('/api/import-banks' + (replace ? '?replace=1' : ''), {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/zip' },
+        body: file
+    })
+        .then(async (response) => {
+            const data = await response.json().catch(() => ({}));
+            if (response.status === 409 && !replace) {
+                const list = (data.conflicts || []).slice(0, 10).join('\n');
+                if (confirm(`El ZIP reemplazaría ${data.conflict_count} archivos existentes:\n${list}\n\n¿Reemplazarlos?`)) {
+                    importBankArchive(file, input, true);
+                } else {
+                    setStatus('Importación cancelada', 'info');
+                }
+                return;
+            }
+            if (!response.ok || !data.success) {
+                throw new Error(data.error || 'Error al importar bancos');
+            }
+        })
+        .catch((err) => {
+            console.error('Error al importar bancos:', err);
+            setStatus(err.message || 'Error al importar bancos', 'incorrect');
+        })
+        .finally(() => {
+            input.value = '';
+        });
+}
+
 function loadData() {
     if (elements.fileInput) {
         elements.fileInput.click();
@@ -1144,7 +1432,7 @@ function startTimer(seconds) {
                     submitAnswer();
                 } else {
                     console.log('⏰ Tiempo agotado sin respuesta seleccionada. Notificando timeout.');
-                    socket.emit('timeout');
+                    emitGame('timeout');
                 }
             }
         }
@@ -1208,7 +1496,7 @@ function handleTeamCountChange(event) {
     const value = parseInt(event.target.value, 10);
     if (Number.isNaN(value) || value === gameState.playerCount) return;
 
-    socket.emit('set_team_count', { count: value });
+    emitGame('set_team_count', { count: value });
 }
 
 function renderPlayers(scores = []) {
@@ -1504,7 +1792,7 @@ function adjustScore(player, delta) {
     if (playerIdx === null || playerIdx < 0 || playerIdx >= gameState.playerCount) return;
     
     console.log(`💰 Ajustando puntaje: Jugador ${playerIdx + 1}, Delta: ${delta}`);
-    socket.emit('adjust_score', { player: playerIdx, delta });
+    emitGame('adjust_score', { player: playerIdx, delta });
     
     // Feedback visual
     showScoreAdjustFeedback(playerIdx, delta);
@@ -1526,7 +1814,7 @@ function adjustScoreByQuestionValue(player, multiplier) {
     const delta = value * multiplier;
     console.log(`💰 Ajustando por valor de pregunta: ${value} x ${multiplier} = ${delta}`);
     
-    socket.emit('adjust_score', { player: playerIdx, delta });
+    emitGame('adjust_score', { player: playerIdx, delta });
     showScoreAdjustFeedback(playerIdx, delta);
     
     // Cerrar menú
@@ -1544,7 +1832,7 @@ function editScore() {
     const newScore = prompt(`Nuevo puntaje para Equipo ${playerIdx + 1}:`, currentScore);
     
     if (newScore !== null && !isNaN(newScore)) {
-        socket.emit('set_score', { player: playerIdx, score: parseInt(newScore) });
+        emitGame('set_score', { player: playerIdx, score: parseInt(newScore) });
         showScoreAdjustFeedback(playerIdx, parseInt(newScore) - currentScore);
     }
 }
@@ -1558,7 +1846,7 @@ function resetPlayerScore() {
     
     if (confirm(`¿Reiniciar puntaje del Equipo ${playerIdx + 1} a 0?`)) {
         const currentScore = parseInt(document.querySelectorAll('.score')[playerIdx].textContent) || 0;
-        socket.emit('set_score', { player: playerIdx, score: 0 });
+        emitGame('set_score', { player: playerIdx, score: 0 });
         showScoreAdjustFeedback(playerIdx, -currentScore);
     }
 }
@@ -1567,7 +1855,7 @@ function quickAdjust(playerIdx, delta) {
     if (playerIdx < 0 || playerIdx >= gameState.playerCount) return;
     
     console.log(`⚡ Ajuste rápido: Jugador ${playerIdx + 1}, Delta: ${delta}`);
-    socket.emit('adjust_score', { player: playerIdx, delta });
+    emitGame('adjust_score', { player: playerIdx, delta });
     showScoreAdjustFeedback(playerIdx, delta);
 }
 
@@ -1799,6 +2087,20 @@ function stopAllSounds() {
 // ===========================
 
 document.addEventListener('keydown', (e) => {
+    // Ctrl+Z deshace, Ctrl+Y (o Ctrl+Shift+Z) rehace
+    if ((e.ctrlKey || e.metaKey) && !e.altKey) {
+        const key = e.key.toLowerCase();
+        if (key === 'z' || key === 'y') {
+            e.preventDefault();
+            if (key === 'y' || e.shiftKey) {
+                redoAction();
+            } else {
+                undoAction();
+            }
+        }
+        return;
+    }
+
     // Números 1-9 y 0 para buzzers
     if (e.key >= '1' && e.key <= '9') {
         const playerIdx = parseInt(e.key, 10) - 1;
@@ -1849,21 +2151,34 @@ function triggerBuzzerShortcut(playerIdx) {
 // INICIALIZACIÓN AL CARGAR
 // ===========================
 
-window.addEventListener('load', () => {
-    console.log('🎮 Painani Web iniciado');
-    
-    // Cargar tablero inicial
-    fetch('/api/board')
-        .then(r => r.json())
-        .then(data => {
-            if (typeof data.player_count === 'number') {
-                gameState.playerCount = data.player_count;
-            }
-            renderBoard(data);
-            updateScores(data.scores);
-        })
-        .catch(err => console.error('Error cargando tablero:', err));
-});
+const initialState = window.PAINANI_INITIAL;
+
+if (initialState) {
+    // Tablero y puntajes vienen en la página: sin esperar a Socket.IO ni a /api/board
+    console.log('🎮 Painani Web iniciado (tablero del servidor)');
+    const scores = initialState.board.scores || [];
+    gameState.playerCount = initialState.board.player_count || scores.length || gameState.playerCount;
+    hydrateBoard(initialState.board);
+    renderPlayers(scores);
+    updateScores(scores);
+    initializeMosaic(initialState.images_folder, initialState.mosaic_tiles);
+} else {
+    window.addEventListener('load', () => {
+        console.log('🎮 Painani Web iniciado');
+
+        // Cargar tablero inicial
+        fetch(apiUrl('/api/board'))
+            .then(r => r.json())
+            .then(data => {
+                if (typeof data.player_count === 'number') {
+                    gameState.playerCount = data.player_count;
+                }
+                renderBoard(data);
+                updateScores(data.scores);
+            })
+            .catch(err => console.error('Error cargando tablero:', err));
+    });
+}
 
 // Prevenir cierre accidental
 window.addEventListener('beforeunload', (e) => {
@@ -0,0 +1,32 @@
+import clocksync
+
+
+def _sample(sync, sid, sent_s, rtt_ms, offset_ms=0.0):
+    payload = sync.ping(sid, sent_s)
+    at_client = sent_s * 1000.0 + rtt_ms / 2 + offset_ms
+    sync.pong(sid, {"id": payload["id"], "client": at_client}, sent_s + rtt_ms / 1000.0)
+
+
+def test_held_pong_does_not_widen_the_bound():
+    sync = clocksync.ClockSync()
+    for n in range(4):
+        _sample(sync, "a", 10.0 + n, 10.0)
+    _sample(sync, "a", 20.0, 4900.0)  # Pong retenido casi hasta PING_TIMEOUT
+
+    client = sync._clients["a"]
+    assert client.rtt == 10.0
+    assert all(rtt == 10.0 for rtt, _ in client.samples)
+
+    arrival = 100.0
+    backdated = arrival * 1000.0 - 2000.0
+    assert sync.correct("a", backdated, arrival) == (arrival, clocksync.PRESS_OUT_OF_BOUNDS)
+
+
+def test_press_within_min_rtt_and_margin_is_corrected():
+    sync = clocksync.ClockSync()
+    _sample(sync, "a", 10.0, 10.0, offset_ms=5000.0)
+
+    arrival = 100.0
+    pressed, how = sync.correct("a", arrival * 1000.0 - 30.0 + 5000.0, arrival)
+    assert how == clocksync.PRESS_CORRECTED
+    assert abs(pressed - (arrival - 0.030)) < 1e-9
@@ -0,0 +1,36 @@
+import game_logic
+import pagecache
+
+
+def test_hide_answers_changes_page_key():
+    state = game_logic.GameState()
+    before = pagecache.page_key("main", state)
+
+    state.hide_answers = True  # toggle_hide_answers no pasa por una transición
+
+    assert state.version == before[1]
+    assert pagecache.page_key("main", state) != before
+
+
+def test_mosaic_tiles_change_page_key():
+    state = game_logic.GameState()
+    assert pagecache.page_key("main", state, None) != pagecache.page_key("main", state, "abc123")
+
+
+def test_cached_page_is_rendered_again_for_new_key():
+    state = game_logic.GameState()
+    cache = pagecache.PageCache()
+    renders = []
+
+    def render():
+        renders.append(state.hide_answers)
+        return f"<html>{state.hide_answers}</html>"
+
+    html, etag = cache.get(pagecache.page_key("main", state), render)
+    assert cache.get(pagecache.page_key("main", state), render) == (html, etag)
+
+    state.hide_answers = True
+    new_html, new_etag = cache.get(pagecache.page_key("main", state), render)
+    assert renders == [False, True]
+    assert new_html == "<html>True</html>"
+    assert new_etag != etag
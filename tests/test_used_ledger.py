@@ -0,0 +1,52 @@
+import csv
+
+import bank_merge
+import game_logic
+from bank_compiled import compile_bank, sample_compiled_board
+
+
+def _write_bank(path, tag):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["idpregunta", "category", "value", "question", "choice_a", "choice_b", "choice_c", "choice_d", "answer"])
+        for n, value in enumerate((100, 200, 300, 400, 500), start=1):
+            writer.writerow([n, "Historia", value, f"{tag} pregunta {n}", "a", "b", "c", "d", "a"])
+
+
+def _board_ids(board):
+    return [clue["idpregunta"] for cat in board["categories"] for clue in cat["clues"]]
+
+
+def test_single_and_merged_loads_share_used_questions(tmp_path):
+    bank_a, bank_b = tmp_path / "a.csv", tmp_path / "b.csv"
+    _write_bank(bank_a, "A")
+    _write_bank(bank_b, "B")
+    used = str(tmp_path / "usadas.csv")
+    compiled_dir = str(tmp_path / "compiled")
+
+    # Banco "a" solo: sus cinco preguntas quedan usadas
+    sample_compiled_board(compile_bank(str(bank_a), compiled_dir), used_csv_path=used, bank_name="a")
+
+    specs = bank_merge.parse_bank_specs([str(bank_a), str(bank_b)])
+    with bank_merge.open_merged_bank(specs, compiled_dir) as merged:
+        board = game_logic.build_sampled_board(merged, used_csv_path=used)
+    b_ids = {bank_merge.merged_question_id("b", n) for n in range(1, 6)}
+    assert set(_board_ids(board)) == b_ids
+
+    # Lo que sorteó el tablero combinado cuenta al cargar "b" solo
+    assert game_logic._read_used_ids(used, "b") == {1, 2, 3, 4, 5}
+    again = sample_compiled_board(compile_bank(str(bank_b), compiled_dir), used_csv_path=used, bank_name="b")
+    assert all(clue.get("reused") for cat in again["categories"] for clue in cat["clues"])
+
+
+def test_old_ledger_gains_bank_column(tmp_path):
+    used = tmp_path / "usadas.csv"
+    used.write_text("idpregunta,category,value,question,choice_a,choice_b,choice_c,choice_d,answer,image\n"
+                    "7,Historia,100,Vieja,a,b,c,d,0,\n", encoding="utf-8")
+
+    game_logic._append_used_rows(str(used), [{"idpregunta": 8, "bank": "a", "question": "Nueva"}])
+
+    rows = list(csv.DictReader(used.open(encoding="utf-8")))
+    assert [(r["idpregunta"], r["banco"]) for r in rows] == [("7", ""), ("8", "a")]
+    assert game_logic._read_used_ids(str(used), "a") == {7, 8}
+    assert game_logic._read_used_ids(str(used), "b") == {7}
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo torneo - Rondas suizas o eliminatorias con partidas simultáneas
+y tabla de posiciones incremental
+"""
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+import game_logic
+
+TOURNAMENT_FORMATS = ("swiss", "bracket")
+MAX_TEAMS_PER_MATCH = 10  # Equipos que admite un GameState
+
+
+def group_sizes(team_count: int, teams_per_match: int) -> List[int]:
+    """Tamaños de las partidas de una ronda, repartidos lo más parejo posible
+
+    Ninguna pasa de ``teams_per_match``, salvo con partidas de 2 y un número
+    impar de equipos: el que sobra juega en una partida de 3.
+    """
+    if team_count < 2:
+        return [team_count] if team_count else []
+    count = -(-team_count // teams_per_match)
+    if team_count // count < 2:
+        count -= 1
+    base, extra = divmod(team_count, count)
+    return [base + 1] * extra + [base] * (count - extra)
+
+
+class Leaderboard:
+    """Tabla de posiciones ordenada que se actualiza por equipo
+
+    Cada cambio de puntaje localiza la entrada anterior por búsqueda binaria y
+    reinserta la nueva clave, sin reordenar a todos los equipos.
+    """
+
+    def __init__(self):
+        self._order: List[Tuple[int, int, str]] = []  # (-puntos, -marcador, equipo)
+        self._entries: Dict[str, List[int]] = {}  # equipo -> [puntos, marcador, partidas]
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, team: str) -> bool:
+        return team in self._entries
+
+    @staticmethod
+    def _key(team: str, entry: List[int]) -> Tuple[int, int, str]:
+        return (-entry[0], -entry[1], team)
+
+    def add_team(self, team: str):
+        """Registra un equipo con cero puntos"""
+        if team in self._entries:
+            return
+        entry = [0, 0, 0]
+        self._entries[team] = entry
+        insort(self._order, self._key(team, entry))
+
+    def update(self, team: str, points: int = 0, score: int = 0, played: int = 0) -> int:
+        """Suma puntos de torneo y/o marcador a un equipo y devuelve su nueva posición"""
+        if team not in self._entries:
+            self.add_team(team)
+        entry = self._entries[team]
+        old_key = self._key(team, entry)
+        del self._order[bisect_left(self._order, old_key)]
+        entry[0] += points
+        entry[1] += score
+        entry[2] += played
+        new_key = self._key(team, entry)
+        insort(self._order, new_key)
+        return bisect_left(self._order, new_key) + 1
+
+    def rank(self, team: str) -> Optional[int]:
+        """Posición (1 = primero) de un equipo"""
+        entry = self._entries.get(team)
+        if entry is None:
+            return None
+        return bisect_left(self._order, self._key(team, entry)) + 1
+
+    def entry(self, team: str) -> Dict[str, Any]:
+        points, score, played = self._entries[team]
+        return {"team": team, "rank": self.rank(team), "points": points, "score": score, "played": played}
+
+    def standings(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lista ordenada de posiciones (opcionalmente solo las primeras)"""
+        order = self._order if limit is None else self._order[:limit]
+        result = []
+        for idx, (_, _, team) in enumerate(order):
+            points, score, played = self._entries[team]
+            result.append({"team": team, "rank": idx + 1, "points": points, "score": score, "played": played})
+        return result
+
+    def teams_in_order(self) -> List[str]:
+        return [team for _, _, team in self._order]
+
+
+class Match:
+    """Una partida del torneo con su propio estado de juego"""
+
+    __slots__ = ("match_id", "round_number", "teams", "game", "finished", "placements", "_last_scores")
+
+    def __init__(
+        self,
+        match_id: str,
+        round_number: int,
+        teams: List[str],
+        board: Dict[str, Any],
+        outcome_listener: Optional[Callable[[Dict[str, Any]], None]] = None,
+        event_listener: Optional[Callable[[game_logic.GameState, str, tuple], None]] = None,
+        images_folder: Optional[str] = None,
+    ):
+        self.match_id = match_id
+        self.round_number = round_number
+        self.teams = list(teams)
+        self.game = game_logic.GameState()
+        self.game.outcome_listener = outcome_listener
+        self.game.event_listener = event_listener
+        self.game.images_folder = images_folder
+        self.game.data = board
+        self.game.set_player_count(len(teams))
+        self.game.clear_history()  # La partida empieza sin nada que deshacer
+        self.finished = False
+        self.placements: List[str] = []
+        self._last_scores = [0] * len(teams)
+
+    def take_score_deltas(self) -> List[Tuple[str, int]]:
+        """Diferencias de marcador desde la última consulta"""
+        scores = self.game.player_scores
+        deltas = []
+        for idx, team in enumerate(self.teams):
+            delta = scores[idx] - self._last_scores[idx]
+            if delta:
+                deltas.append((team, delta))
+                self._last_scores[idx] = scores[idx]
+        return deltas
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "match_id": self.match_id,
+            "round": self.round_number,
+            "teams": self.teams,
+            "scores": self.game.player_scores,
+            "finished": self.finished,
+            "placements": self.placements,
+        }
+
+
+class Tournament:
+    """Organiza rondas de partidas simultáneas y mantiene la tabla de posiciones
+
+    La primera ronda se juega con ``board``; si hay ``board_factory``, cada
+    ronda siguiente sortea un tablero nuevo para que los equipos que avanzan
+    no repitan preguntas.
+    """
+
+    def __init__(
+        self,
+        teams: List[str],
+        board: Dict[str, Any],
+        tournament_format: str = "swiss",
+        teams_per_match: int = 2,
+        rounds: Optional[int] = None,
+        advance_per_match: int = 1,
+        outcome_listener: Optional[Callable[[Dict[str, Any]], None]] = None,
+        event_listener_factory: Optional[Callable[[str], Callable[..., None]]] = None,
+        images_folder: Optional[str] = None,
+        board_factory: Optional[Callable[[], Dict[str, Any]]] = None,
+    ):
+        names = [str(t).strip() for t in teams if str(t).strip()]
+        if len(set(names)) != len(names):
+            raise ValueError("Hay equipos repetidos")
+        if tournament_format not in TOURNAMENT_FORMATS:
+            raise ValueError("Formato de torneo inválido")
+        teams_per_match = max(2, min(MAX_TEAMS_PER_MATCH, int(teams_per_match)))
+        if len(names) < teams_per_match:
+            raise ValueError("No hay suficientes equipos para una partida")
+
+        self.teams = names
+        self.board = board
+        self.images_folder = images_folder
+        self.board_factory = board_factory
+        self.format = tournament_format
+        self.teams_per_match = teams_per_match
+        self.advance_per_match = max(1, min(teams_per_match - 1, int(advance_per_match)))
+        self.rounds = rounds
+        self.outcome_listener = outcome_listener
+        self.event_listener_factory = event_listener_factory  # match_id -> oyente de transiciones
+        self.round_number = 0
+        self.matches: Dict[str, Match] = {}
+        self.current_round: List[str] = []
+        self.alive: List[str] = list(names)
+        self.leaderboard = Leaderboard()
+        self._met: Dict[str, set] = {t: set() for t in names}
+
+        for team in names:
+            self.leaderboard.add_team(team)
+
+    # ---------------------
+    # Rondas
+    # ---------------------
+
+    @property
+    def finished(self) -> bool:
+        if self.format == "bracket":
+            return len(self.alive) < 2 and self.round_complete()
+        return self.rounds is not None and self.round_number >= self.rounds and self.round_complete()
+
+    def round_complete(self) -> bool:
+        return all(self.matches[mid].finished for mid in self.current_round)
+
+    def start_round(self, groups: Optional[List[List[str]]] = None) -> Dict[str, Any]:
+        """Genera las partidas de la siguiente ronda
+
+        ``groups`` permite fijar los enfrentamientos (p. ej. sembrados por
+        rating); deben incluir exactamente a los equipos que siguen en juego,
+        en partidas de a lo más ``teams_per_match`` equipos.
+        """
+        if not self.round_complete():
+            return {"error": "La ronda actual tiene partidas sin terminar"}
+        if self.finished:
+            return {"error": "El torneo ya terminó"}
+
+        if groups is not None:
+            groups = [[str(t) for t in group] for group in groups if group]
+            expected = self.alive if self.format == "bracket" else self.teams
+            flat = [team for group in groups for team in group]
+            if sorted(flat) != sorted(expected) or any(len(group) < 2 for group in groups):
+                return {"error": "Los grupos no coinciden con los equipos en juego"}
+            if any(len(group) > self._max_group() for group in groups):
+                return {"error": f"Cada partida admite a lo más {self._max_group()} equipos"}
+        elif self.format == "bracket":
+            groups = self._chunk(self.alive)
+        else:
+            groups = self._swiss_groups()
+
+        if self.round_number > 0 and self.board_factory is not None:
+            try:
+                self.board = self.board_factory()
+            except ValueError as e:
+                return {"error": f"No se pudo sortear el tablero de la ronda: {e}"}
+
+        self.round_number += 1
+        self.current_round = []
+        for idx, group in enumerate(groups):
+            match_id = f"R{self.round_number}M{idx + 1}"
+            event_listener = self.event_listener_factory(match_id) if self.event_listener_factory else None
+            self.matches[match_id] = Match(
+                match_id, self.round_number, group, self.board, self.outcome_listener, event_listener,
+                self.images_folder,
+            )
+            self.current_round.append(match_id)
+            for team in group:
+                self._met[team].update(t for t in group if t != team)
+
+        return {"success": True, "round": self.round_number, "matches": [self.matches[m].to_dict() for m in self.current_round]}
+
+    def _max_group(self) -> int:
+        """Equipos por partida como máximo (3 con partidas de 2 y equipos impares)"""
+        return 3 if self.teams_per_match == 2 else self.teams_per_match
+
+    def _chunk(self, teams: List[str]) -> List[List[str]]:
+        """Divide en grupos consecutivos de tamaños parejos (ver ``group_sizes``)"""
+        groups = []
+        start = 0
+        for size in group_sizes(len(teams), self.teams_per_match):
+            groups.append(teams[start:start + size])
+            start += size
+        return groups
+
+    def _swiss_groups(self) -> List[List[str]]:
+        """Agrupa equipos de posiciones cercanas evitando revanchas cuando es posible"""
+        pending = self.leaderboard.teams_in_order()
+        groups: List[List[str]] = []
+        for size in group_sizes(len(pending), self.teams_per_match):
+            group = [pending.pop(0)]
+            while len(group) < size:
+                pick = next(
+                    (t for t in pending if not any(t in self._met[g] for g in group)),
+                    pending[0],
+                )
+                pending.remove(pick)
+                group.append(pick)
+            groups.append(group)
+        return groups
+
+    # ---------------------
+    # Partidas
+    # ---------------------
+
+    def get_match(self, match_id: Any) -> Optional[Match]:
+        return self.matches.get(str(match_id)) if match_id is not None else None
+
+    def record_scores(self, match_id: str) -> List[Dict[str, Any]]:
+        """Propaga a la tabla los cambios de marcador de una partida
+
+        Devuelve solo las entradas que cambiaron para enviarlas al tablero en vivo.
+        """
+        match = self.get_match(match_id)
+        if match is None:
+            return []
+        changed = []
+        for team, delta in match.take_score_deltas():
+            self.leaderboard.update(team, score=delta)
+            changed.append(team)
+        return [self.leaderboard.entry(team) for team in changed]
+
+    def finish_match(self, match_id: str) -> Dict[str, Any]:
+        """Cierra una partida y asigna puntos de torneo según la posición final"""
+        match = self.get_match(match_id)
+        if match is None:
+            return {"error": "Partida no encontrada"}
+        if match.finished:
+            return {"error": "La partida ya terminó"}
+
+        self.record_scores(match_id)
+        match.game.flush_outcomes()
+        scores = match.game.player_scores
+        ranked = sorted(range(len(match.teams)), key=lambda i: (-scores[i], match.teams[i]))
+        match.placements = [match.teams[i] for i in ranked]
+        match.finished = True
+
+        size = len(match.placements)
+        for place, team in enumerate(match.placements):
+            self.leaderboard.update(team, points=size - 1 - place, played=1)
+
+        if self.format == "bracket":
+            eliminated = set(match.placements[self.advance_per_match:])
+            self.alive = [t for t in self.alive if t not in eliminated]
+
+        return {
+            "success": True,
+            "match": match.to_dict(),
+            "changes": [self.leaderboard.entry(team) for team in match.placements],
+        }
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "format": self.format,
+            "round": self.round_number,
+            "rounds": self.rounds,
+            "teams_per_match": self.teams_per_match,
+            "finished": self.finished,
+            "matches": [self.matches[m].to_dict() for m in self.current_round],
+            "leaderboard": self.leaderboard.standings(limit),
+        }
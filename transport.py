@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serialización de los eventos de Socket.IO (JSON o MessagePack)
+
+Con MessagePack cada evento viaja como un marco binario, más corto y sin
+convertir números a texto. El modo se elige al arrancar con la variable
+``PAINANI_TRANSPORTE`` (``json`` o ``msgpack``). JSON es el modo por omisión:
+un cliente con el paquete JSON (una página en caché, el tablero del torneo,
+herramientas externas) no puede hablar con un servidor MessagePack, así que
+MessagePack solo se usa si se pide y el paquete ``msgpack`` está instalado.
+Las páginas cargan el cliente de Socket.IO con el mismo analizador que usa
+el servidor.
+
+Uso (comparación de tamaño y costo con los eventos del juego):
+    python transport.py [--rounds 20000]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+TRANSPORT_ENV = "PAINANI_TRANSPORTE"
+TRANSPORTS = ("json", "msgpack")
+
+# Cliente de Socket.IO para cada modo (el de MessagePack trae su analizador)
+CLIENT_SCRIPTS = {
+    "json": "https://cdn.socket.io/4.5.4/socket.io.min.js",
+    "msgpack": "https://cdn.socket.io/4.5.4/socket.io.msgpack.min.js",
+}
+
+EVENT_PACKET = 2  # Tipo EVENT del protocolo de Socket.IO
+BENCHMARK_ROUNDS = 20000
+
+
+def msgpack_available() -> bool:
+    return importlib.util.find_spec("msgpack") is not None
+
+
+def choose_transport(requested: Optional[str] = None) -> str:
+    """Modo efectivo: MessagePack solo si se pide y se puede, JSON si no"""
+    mode = (requested or os.environ.get(TRANSPORT_ENV) or "json").strip().lower()
+    if mode != "msgpack":
+        if mode not in TRANSPORTS:
+            print(f"⚠️  {TRANSPORT_ENV}={mode!r} no es un modo conocido; se usa JSON")
+        return "json"
+    if msgpack_available():
+        return "msgpack"
+    print("⚠️  msgpack no está instalado; se usa JSON")
+    return "json"
+
+
+def socketio_options(transport: str) -> Dict[str, Any]:
+    """Argumentos extra para ``SocketIO(...)``"""
+    return {"serializer": "msgpack"} if transport == "msgpack" else {}
+
+
+# ---------------------
+# Comparación
+# ---------------------
+
+def sample_events() -> List[Tuple[str, Any]]:
+    """Eventos frecuentes del juego con contenido realista"""
+    import game_logic
+
+    state = game_logic.GameState()
+    state.data = game_logic.SAMPLE_DATA
+    question = state.open_question(0, 0)
+    return [
+        ("buzzer_press", {"player": 3}),
+        ("buzzer_activated", {"success": True, "player": 3, "message": "Equipo 4 tiene el turno"}),
+        ("start_timer", {"seconds": game_logic.TIME_LIMIT_SECONDS}),
+        ("scores_update", {"scores": [1200, -300, 800, 0, 2500]}),
+        ("question_opened", question),
+        ("game_reset", state.get_board_state()),
+    ]
+
+
+def _json_frame(event: str, payload: Any) -> bytes:
+    # Igual que python-socketio: tipo de paquete seguido del arreglo compacto
+    return (str(EVENT_PACKET) + json.dumps([event, payload], separators=(",", ":"))).encode("utf-8")
+
+
+def benchmark(rounds: int = BENCHMARK_ROUNDS) -> List[Dict[str, Any]]:
+    """Bytes por marco y microsegundos por codificación/decodificación en cada modo"""
+    msgpack = None
+    if msgpack_available():
+        import msgpack
+
+    results = []
+    for event, payload in sample_events():
+        entry: Dict[str, Any] = {"event": event}
+
+        frame = _json_frame(event, payload)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            _json_frame(event, payload)
+        entry["json_bytes"] = len(frame)
+        entry["json_encode_us"] = (time.perf_counter() - started) / rounds * 1e6
+        started = time.perf_counter()
+        for _ in range(rounds):
+            json.loads(frame[1:])
+        entry["json_decode_us"] = (time.perf_counter() - started) / rounds * 1e6
+
+        if msgpack is not None:
+            packet = {"type": EVENT_PACKET, "data": [event, payload], "nsp": "/"}
+            frame = msgpack.packb(packet)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                msgpack.packb(packet)
+            entry["msgpack_bytes"] = len(frame)
+            entry["msgpack_encode_us"] = (time.perf_counter() - started) / rounds * 1e6
+            started = time.perf_counter()
+            for _ in range(rounds):
+                msgpack.unpackb(frame)
+            entry["msgpack_decode_us"] = (time.perf_counter() - started) / rounds * 1e6
+        results.append(entry)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara JSON y MessagePack con los eventos del juego")
+    parser.add_argument("--rounds", type=int, default=BENCHMARK_ROUNDS)
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.rounds)
+    has_msgpack = "msgpack_bytes" in results[0]
+    print(f"{'evento':<18} {'JSON B':>8} {'cod µs':>7} {'dec µs':>7}" + (
+        f" {'MsgPack B':>10} {'cod µs':>7} {'dec µs':>7}" if has_msgpack else ""))
+    for r in results:
+        line = f"{r['event']:<18} {r['json_bytes']:>8} {r['json_encode_us']:>7.2f} {r['json_decode_us']:>7.2f}"
+        if has_msgpack:
+            line += f" {r['msgpack_bytes']:>10} {r['msgpack_encode_us']:>7.2f} {r['msgpack_decode_us']:>7.2f}"
+        print(line)
+    if not has_msgpack:
+        print("ℹ️  Instala msgpack para comparar (pip install msgpack)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())